@@ -7,6 +7,7 @@ from flask_cors import CORS
 from flask_migrate import Migrate
 from app.docs.swagger import swaggerui_blueprint, create_swagger_spec
 from config import config  # Import the config dictionary
+from app.utils import sqlite_functions  # noqa: F401 - registers SQL math functions on SQLite connections
 
 db = SQLAlchemy()
 bcrypt = Bcrypt()
@@ -123,6 +124,10 @@ def create_app(config_name=None):
     except ImportError as e:
         print(f"[WARN] Payments routes import failed: {e}")
         
+    # Register maintenance CLI commands
+    from app.commands import register_commands
+    register_commands(app)
+        
     # Add health check endpoint
     @app.route('/health')
     def health_check():
@@ -0,0 +1,130 @@
+"""
+Flask CLI commands for maintenance jobs
+Run them with the Flask CLI, for example:
+    flask --app run backfill-geohash --batch-size 500
+"""
+import click
+from flask.cli import with_appcontext
+from app import db
+from app.models.provider_profile import ProviderProfile
+
+
+@click.command('backfill-geohash')
+@click.option('--batch-size', default=500, show_default=True, help='Rows updated per transaction')
+@with_appcontext
+def backfill_geohash(batch_size):
+    """Populate the geohash columns of existing provider profiles"""
+    last_id = 0
+    updated = 0
+    while True:
+        # Walk the table by primary key so each batch is an index range scan
+        batch = ProviderProfile.query.filter(ProviderProfile.id > last_id)\
+            .order_by(ProviderProfile.id)\
+            .limit(batch_size).all()
+        if not batch:
+            break
+
+        for provider in batch:
+            provider.refresh_geohashes()
+        db.session.commit()
+
+        last_id = batch[-1].id
+        updated += len(batch)
+        click.echo(f'Updated {updated} provider profiles')
+
+    click.echo(f'[OK] Geohash backfill complete ({updated} rows)')
+
+
+@click.command('prune-geocode-cache')
+@with_appcontext
+def prune_geocode_cache():
+    """Delete expired rows from the geocode_cache table"""
+    from app.utils.geocode_cache import prune_expired
+    click.echo(f'[OK] Removed {prune_expired()} expired geocode cache entries')
+
+
+@click.command('geocode-bookings')
+@click.option('--batch-size', default=1000, show_default=True, help='Addresses geocoded per batch')
+@click.option('--workers', default=None, type=int, help='Concurrent lookups (default GEOCODE_MAX_WORKERS)')
+@with_appcontext
+def geocode_bookings(batch_size, workers):
+    """Geocode every distinct booking address into the geocode cache"""
+    from app.models.booking import Booking
+    from app.utils.geo_service import geocode_addresses
+
+    addresses = [row[0] for row in db.session.query(Booking.address).filter(Booking.address.isnot(None)).distinct()]
+    resolved = 0
+    for start in range(0, len(addresses), batch_size):
+        results = geocode_addresses(addresses[start:start + batch_size], max_workers=workers)
+        resolved += sum(1 for coords in results.values() if coords)
+        click.echo(f'Geocoded {min(start + batch_size, len(addresses))}/{len(addresses)} addresses')
+
+    click.echo(f'[OK] {resolved} of {len(addresses)} booking addresses resolved')
+
+
+@click.command('repair-rating-aggregates')
+@with_appcontext
+def repair_rating_aggregates():
+    """Recompute every provider's rating sum, count and histogram from reviews"""
+    updated = ProviderProfile.recompute_rating_aggregates()
+    db.session.commit()
+    click.echo(f'[OK] Rating aggregates rebuilt for {updated} provider profiles')
+
+
+@click.command('index-advisor')
+@with_appcontext
+def index_advisor():
+    """Report hot query shapes that the database answers with a full table scan"""
+    from app.utils.index_advisor import UnsupportedDatabase, analyze_query_shapes
+
+    try:
+        findings = analyze_query_shapes()
+    except UnsupportedDatabase as e:
+        raise click.ClickException(str(e))
+    flagged = 0
+    for finding in findings:
+        if finding['sequential_scans']:
+            flagged += 1
+            click.echo(f"[SCAN] {finding['query']}: {', '.join(finding['sequential_scans'])}")
+        else:
+            click.echo(f"[OK]   {finding['query']}")
+
+    if flagged:
+        click.echo(f'{flagged} of {len(findings)} query shapes scan a whole table')
+    else:
+        click.echo(f'[OK] All {len(findings)} query shapes use an index')
+
+
+@click.command('rebuild-search-index')
+@with_appcontext
+def rebuild_search_index():
+    """Rebuild the provider full-text search index from profiles and users"""
+    from app.utils.provider_search import rebuild_index
+
+    backend = rebuild_index()
+    db.session.commit()
+    if backend:
+        click.echo(f'[OK] Provider search index rebuilt ({backend})')
+    else:
+        click.echo('[WARN] No full-text index on this database, search uses ILIKE')
+
+
+@click.command('rollup-daily-stats')
+@click.option('--full', is_flag=True, help='Rebuild the whole rollup instead of only new and changed days')
+@with_appcontext
+def rollup_daily_stats(full):
+    """Roll up completed days into daily_stats and hourly_stats for the admin statistics"""
+    from app.utils.daily_stats import roll_up
+
+    click.echo(f'[OK] {roll_up(full=full)} days rolled up')
+
+
+def register_commands(app):
+    """Attach the maintenance commands to the Flask CLI"""
+    app.cli.add_command(backfill_geohash)
+    app.cli.add_command(prune_geocode_cache)
+    app.cli.add_command(geocode_bookings)
+    app.cli.add_command(repair_rating_aggregates)
+    app.cli.add_command(index_advisor)
+    app.cli.add_command(rebuild_search_index)
+    app.cli.add_command(rollup_daily_stats)
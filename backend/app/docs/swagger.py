@@ -3,8 +3,10 @@ Swagger/OpenAPI documentation for JobLink API
 This file creates automatic API documentation that developers can use
 to understand all available endpoints, parameters, and responses
 """
-from flask import jsonify
+import json
+from datetime import datetime
 from flask_swagger_ui import get_swaggerui_blueprint
+from app.utils.http_cache import conditional_json, make_etag
 
 # Swagger UI configuration
 # These URLs define where the Swagger UI will be accessible and where it gets its specification
@@ -23,6 +25,9 @@ swaggerui_blueprint = get_swaggerui_blueprint(
     }
 )
 
+# ETag and Last-Modified of the served spec, computed on first request
+_spec_validators = {}
+
 def create_swagger_spec(app):
     """
     Create OpenAPI specification for the JobLink API
@@ -521,7 +526,10 @@ def create_swagger_spec(app):
                                 }
                             }
                         },
-                        "responses": {"201": {"description": "Booking created successfully"}}
+                        "responses": {
+                            "201": {"description": "Booking created successfully"},
+                            "409": {"description": "Conflict - The provider is already booked for part of this time"}
+                        }
                     }
                 },
                 
@@ -765,7 +773,13 @@ def create_swagger_spec(app):
             ]
         }
         
-        return jsonify(swagger_spec)
+        # The spec only changes with a deploy: hash it once per process and
+        # let clients revalidate with If-None-Match
+        if 'etag' not in _spec_validators:
+            _spec_validators['etag'] = make_etag(json.dumps(swagger_spec, sort_keys=True))
+            _spec_validators['last_modified'] = datetime.utcnow().replace(microsecond=0)
+        return conditional_json(_spec_validators['etag'], lambda: swagger_spec, max_age=3600,
+                                last_modified=_spec_validators['last_modified'])
 
 # You can add more functions here to generate dynamic documentation
 # based on your actual route definitions if needed
\ No newline at end of file
@@ -4,6 +4,20 @@ from .provider_profile import ProviderProfile
 from .booking import Booking, BookingStatus
 from .reviews import Review
 from .payment import Payment, PaymentStatus
+from .geocode_cache import GeocodeCacheEntry
+from .cache_version import CacheVersion
+from .daily_stats import DailyStat, HourlyStat, DailyStatsDirtyDay
+
+# Registers the provider full-text index DDL and its sync listener,
+# and the trigram indexes used by fuzzy search on PostgreSQL
+from app.utils import provider_search  # noqa: E402,F401
+from app.utils import fuzzy_search  # noqa: E402,F401
+# Bumps the category catalogue version on category writes
+from app.utils import category_cache  # noqa: E402,F401
+# Marks rolled-up statistics days dirty when their rows change
+from app.utils import daily_stats  # noqa: E402,F401
+# Keeps bookings.ends_at in sync with scheduled_date and duration_hours
+from app.utils import availability  # noqa: E402,F401
 
 __all__ = [
     'User', 'RoleEnum', 
@@ -11,5 +25,8 @@ __all__ = [
     'ProviderProfile', 
     'Booking', 'BookingStatus',
     'Review', 
-    'Payment', 'PaymentStatus'
+    'Payment', 'PaymentStatus',
+    'GeocodeCacheEntry',
+    'CacheVersion',
+    'DailyStat', 'HourlyStat', 'DailyStatsDirtyDay'
 ]
\ No newline at end of file
@@ -12,6 +12,16 @@ class BookingStatus(enum.Enum):
 
 class Booking(db.Model):
     __tablename__ = 'bookings'  # Table for service appointments
+    __table_args__ = (
+        # Keyset pagination, newest first: admin listing, a client's and a provider's bookings
+        db.Index('ix_bookings_created_id', 'created_at', 'id'),
+        db.Index('ix_bookings_client_created_id', 'client_id', 'created_at', 'id'),
+        db.Index('ix_bookings_provider_created_id', 'provider_id', 'created_at', 'id'),
+        # A provider's active bookings in a time window (availability and overlap checks)
+        db.Index('ix_bookings_provider_status_scheduled', 'provider_id', 'status', 'scheduled_date'),
+        # Time range overlap checks (app/utils/availability.py)
+        db.Index('ix_bookings_provider_scheduled_ends', 'provider_id', 'scheduled_date', 'ends_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     # Client who booked the service - references User model
@@ -26,6 +36,8 @@ class Booking(db.Model):
     scheduled_date = db.Column(db.DateTime, nullable=False)
     # How long the service will take (in hours)
     duration_hours = db.Column(db.Integer, nullable=False)
+    # scheduled_date + duration_hours, set on every insert/update (see app/utils/availability.py)
+    ends_at = db.Column(db.DateTime, nullable=False)
     # Total cost (hourly_rate * duration_hours)
     total_amount = db.Column(db.Numeric(10, 2), nullable=False)
     # Current status of the booking
@@ -40,6 +52,11 @@ class Booking(db.Model):
     
     # RELATIONSHIPS
     
+    # Many-to-one: The client who booked and the provider user doing the work
+    # Both point at the users table, so foreign_keys tells SQLAlchemy which column to use
+    client = db.relationship('User', foreign_keys=[client_id])
+    provider = db.relationship('User', foreign_keys=[provider_id])
+    
     # One-to-one: Each booking can have one review
     # 'uselist=False' makes this a single object, not a list
     # 'cascade' means if booking is deleted, review is automatically deleted
@@ -57,6 +74,7 @@ class Booking(db.Model):
             'service_category_id': self.service_category_id,
             'scheduled_date': self.scheduled_date.isoformat() if self.scheduled_date else None,
             'duration_hours': self.duration_hours,
+            'ends_at': self.ends_at.isoformat() if self.ends_at else None,
             'total_amount': float(self.total_amount) if self.total_amount else None,
             'status': self.status.value,  # Get string value from enum
             'special_requests': self.special_requests,
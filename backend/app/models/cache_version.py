@@ -0,0 +1,19 @@
+from app import db
+from datetime import datetime
+
+class CacheVersion(db.Model):
+    __tablename__ = 'cache_versions'  # Write counters that tell every worker when a cached dataset changed
+    
+    # Name of the cached dataset, e.g. 'service_categories'
+    name = db.Column(db.String(50), primary_key=True)
+    # Incremented in the same transaction as every write to the dataset
+    version = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # When the dataset last changed
+    updated_at = db.Column(db.DateTime, default=datetime.utcnow, onupdate=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'name': self.name,
+            'version': self.version,
+            'updated_at': self.updated_at.isoformat() if self.updated_at else None
+        }
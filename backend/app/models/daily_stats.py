@@ -0,0 +1,60 @@
+from app import db
+from datetime import datetime
+
+class DailyStat(db.Model):
+    __tablename__ = 'daily_stats'  # Per-day rollup of platform activity for admin statistics
+    
+    # UTC day the counted rows were created on
+    day = db.Column(db.Date, primary_key=True)
+    # What is counted: 'users', 'providers', 'bookings', 'reviews'
+    # ('_rolled' marks a day as rolled up, even when nothing happened on it)
+    metric = db.Column(db.String(30), primary_key=True)
+    # Breakdown within the metric: user role, booking status, '' when none
+    dimension = db.Column(db.String(30), primary_key=True, default='')
+    # Service category of the counted bookings/providers, 0 when not applicable
+    service_category_id = db.Column(db.Integer, primary_key=True, default=0)
+    # Number of rows, and the sum of their amount (booking total_amount)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    # When the day was last rolled up
+    rolled_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'day': self.day.isoformat() if self.day else None,
+            'metric': self.metric,
+            'dimension': self.dimension,
+            'service_category_id': self.service_category_id,
+            'count': self.count,
+            'amount': float(self.amount or 0)
+        }
+
+
+class HourlyStat(db.Model):
+    __tablename__ = 'hourly_stats'  # Same rollup per UTC hour, for hourly analytics
+    
+    # Start of the UTC hour the counted rows were created in
+    hour = db.Column(db.DateTime, primary_key=True)
+    metric = db.Column(db.String(30), primary_key=True)
+    dimension = db.Column(db.String(30), primary_key=True, default='')
+    service_category_id = db.Column(db.Integer, primary_key=True, default=0)
+    count = db.Column(db.Integer, nullable=False, default=0)
+    amount = db.Column(db.Numeric(14, 2), nullable=False, default=0)
+    rolled_at = db.Column(db.DateTime, default=datetime.utcnow)
+    
+    def to_dict(self):
+        return {
+            'hour': self.hour.isoformat() if self.hour else None,
+            'metric': self.metric,
+            'dimension': self.dimension,
+            'service_category_id': self.service_category_id,
+            'count': self.count,
+            'amount': float(self.amount or 0)
+        }
+
+
+class DailyStatsDirtyDay(db.Model):
+    __tablename__ = 'daily_stats_dirty_days'  # Rolled-up days whose source rows changed since
+    
+    day = db.Column(db.Date, primary_key=True)
+    marked_at = db.Column(db.DateTime, default=datetime.utcnow)
@@ -0,0 +1,23 @@
+from app import db
+from datetime import datetime
+
+class GeocodeCacheEntry(db.Model):
+    __tablename__ = 'geocode_cache'  # Persistent geocoding results shared by all workers
+    
+    # Normalized address (see app/utils/geocode_cache.normalize_address)
+    address_key = db.Column(db.String(255), primary_key=True)
+    # Coordinates - both NULL for a cached failed lookup (negative cache entry)
+    latitude = db.Column(db.Float)
+    longitude = db.Column(db.Float)
+    # When the entry was stored and when it stops being valid
+    created_at = db.Column(db.DateTime, default=datetime.utcnow)
+    expires_at = db.Column(db.DateTime, nullable=False, index=True)
+    
+    def to_dict(self):
+        return {
+            'address_key': self.address_key,
+            'latitude': self.latitude,
+            'longitude': self.longitude,
+            'created_at': self.created_at.isoformat() if self.created_at else None,
+            'expires_at': self.expires_at.isoformat() if self.expires_at else None
+        }
@@ -18,6 +18,8 @@ class Payment(db.Model):
     booking_id = db.Column(db.Integer, db.ForeignKey('bookings.id'), nullable=False, unique=True)
     # Amount paid
     amount = db.Column(db.Numeric(10, 2), nullable=False)
+    # CheckoutRequestID of the STK push, used to match the M-Pesa callback
+    mpesa_checkout_request_id = db.Column(db.String(100), unique=True, index=True)
     # M-Pesa transaction receipt number
     mpesa_receipt = db.Column(db.String(50))
     # Phone number used for payment
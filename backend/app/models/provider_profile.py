@@ -1,9 +1,19 @@
-from sqlalchemy import func
+from sqlalchemy import func, event, case, select, update
+from sqlalchemy.ext.hybrid import hybrid_property
 from app import db
+from app.utils import geohash
 from datetime import datetime
 
 class ProviderProfile(db.Model):
     __tablename__ = 'provider_profiles'  # Business profiles for service providers
+    __table_args__ = (
+        # Composite index used by the bounding-box prefilter of geo searches
+        db.Index('ix_provider_profiles_lat_lon', 'latitude', 'longitude'),
+        # Keyset pagination of provider listings, newest first
+        db.Index('ix_provider_profiles_created_id', 'created_at', 'id'),
+        # Available providers of a category (provider search filters)
+        db.Index('ix_provider_profiles_available_category', 'is_available', 'service_category_id'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     # Links to the User model - each provider profile belongs to one user
@@ -20,6 +30,22 @@ class ProviderProfile(db.Model):
     # Location coordinates for geo-search functionality
     latitude = db.Column(db.Float)
     longitude = db.Column(db.Float)
+    # Precomputed geohash cells used by spatial lookups (see app/utils/geohash.py)
+    # Kept in sync with latitude/longitude by the listeners at the bottom of this file
+    geohash_3 = db.Column(db.String(3), index=True)
+    geohash_4 = db.Column(db.String(4), index=True)
+    geohash_5 = db.Column(db.String(5), index=True)
+    geohash_6 = db.Column(db.String(6), index=True)
+    # Denormalized rating aggregates, maintained by apply_rating() in the same
+    # transaction as the review write and rebuilt by recompute_rating_aggregates()
+    rating_sum = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    # Per-star histogram: number of 1-star ... 5-star reviews
+    rating_1_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_2_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_3_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_4_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
+    rating_5_count = db.Column(db.Integer, nullable=False, default=0, server_default='0')
     # Whether provider is currently accepting new bookings
     is_available = db.Column(db.Boolean, default=True)
     # Years of experience in this field
@@ -51,20 +77,110 @@ class ProviderProfile(db.Model):
             'longitude': self.longitude,
             'is_available': self.is_available,
             'experience_years': self.experience_years,
+            'average_rating': self.average_rating,
+            'rating_count': self.rating_count or 0,
             'created_at': self.created_at.isoformat() if self.created_at else None
         }
+
+    @hybrid_property
+    def average_rating(self):
+        """Mean star rating, or None when the provider has no reviews"""
+        if not self.rating_count:
+            return None
+        return round(self.rating_sum / self.rating_count, 2)
+
+    @average_rating.expression
+    def average_rating(cls):
+        return case(
+            (cls.rating_count > 0, cls.rating_sum * 1.0 / cls.rating_count),
+            else_=None
+        )
+
+    def rating_breakdown(self):
+        """Histogram of star ratings keyed '1' ... '5'"""
+        return {str(stars): getattr(self, f'rating_{stars}_count') or 0 for stars in range(1, 6)}
+
+    def refresh_geohashes(self):
+        """Recompute the geohash cells from the current coordinates"""
+        if self.latitude is None or self.longitude is None:
+            cell = None
+        else:
+            cell = geohash.encode(float(self.latitude), float(self.longitude), max(geohash.PRECISIONS))
+        for precision in geohash.PRECISIONS:
+            setattr(self, f'geohash_{precision}', cell[:precision] if cell else None)
+
     @classmethod
     def rating_summary(cls, provider_id, session=None):
         """
-        Return aggregated rating stats for a provider:
-          { 'rating_count': int, 'rating_avg': float }
-        Uses a DB aggregate for performance. Safe to call from routes.
+        Return the rating stats of a provider (by user id):
+          { 'rating_count': int, 'rating_avg': float, 'breakdown': {'1': int, ... '5': int} }
+        Reads the denormalized columns, so reviews are never scanned.
+        """
+        session = session or db.session
+        provider = session.query(cls).filter(cls.user_id == provider_id).first()
+        if provider is None:
+            return {'rating_count': 0, 'rating_avg': 0.0, 'breakdown': {str(stars): 0 for stars in range(1, 6)}}
+        return {
+            'rating_count': provider.rating_count or 0,
+            'rating_avg': provider.average_rating or 0.0,
+            'breakdown': provider.rating_breakdown()
+        }
+
+    @classmethod
+    def apply_rating(cls, profile_id, rating, delta=1, session=None):
+        """
+        Add (delta=1) or remove (delta=-1) one review's rating from the aggregates
+        Issued as a single relative UPDATE so concurrent reviews cannot lose
+        increments; call it before committing the review itself.
         """
         session = session or db.session
-        # import here to avoid circular import at module load
-        from app.models.review import Review
-        row = session.query(
-            func.count(Review.id).label('rating_count'),
-            func.avg(Review.rating).label('rating_avg')
-        ).filter(Review.provider_id == provider_id).one()
-        return {'rating_count': int(row.rating_count or 0), 'rating_avg': float(row.rating_avg or 0.0)}
\ No newline at end of file
+        histogram_column = getattr(cls, f'rating_{int(rating)}_count')
+        session.execute(
+            update(cls)
+            .where(cls.id == profile_id)
+            .values({
+                cls.rating_sum: cls.rating_sum + delta * int(rating),
+                cls.rating_count: cls.rating_count + delta,
+                histogram_column: histogram_column + delta
+            })
+            .execution_options(synchronize_session='fetch')
+        )
+
+    @classmethod
+    def recompute_rating_aggregates(cls, profile_ids=None, session=None):
+        """
+        Rebuild the rating aggregates from the reviews table
+        One UPDATE with correlated subqueries covers every profile (or only
+        profile_ids), so it can repair drift after manual data fixes.
+        Returns the number of profiles updated.
+        """
+        from app.models.reviews import Review  # avoid circular import at module load
+
+        session = session or db.session
+
+        def aggregate(expression):
+            return func.coalesce(
+                select(expression).where(Review.provider_profile_id == cls.id).scalar_subquery(), 0
+            )
+
+        values = {
+            cls.rating_sum: aggregate(func.sum(Review.rating)),
+            cls.rating_count: aggregate(func.count(Review.id)),
+        }
+        for stars in range(1, 6):
+            values[getattr(cls, f'rating_{stars}_count')] = aggregate(
+                func.sum(case((Review.rating == stars, 1), else_=0))
+            )
+
+        statement = update(cls).values(values).execution_options(synchronize_session=False)
+        if profile_ids is not None:
+            statement = statement.where(cls.id.in_(profile_ids))
+        result = session.execute(statement)
+        return result.rowcount
+
+
+# Keep the spatial key up to date on every write, whichever route changed the coordinates
+@event.listens_for(ProviderProfile, 'before_insert')
+@event.listens_for(ProviderProfile, 'before_update')
+def _update_geohashes(mapper, connection, target):
+    target.refresh_geohashes()
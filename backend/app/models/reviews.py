@@ -1,8 +1,20 @@
+from sqlalchemy import event
+from sqlalchemy.orm import Session
 from app import db
 from datetime import datetime
 
 class Review(db.Model):
     __tablename__ = 'reviews'  # Table for customer reviews and ratings
+    __table_args__ = (
+        # Keyset pagination of a provider's reviews, newest first; on PostgreSQL the
+        # index also carries client_id and rating so the page scan skips the heap
+        db.Index('ix_reviews_provider_created_id', 'provider_id', 'created_at', 'id',
+                 postgresql_include=['client_id', 'rating']),
+        # Keyset pagination of the reviews a client wrote
+        db.Index('ix_reviews_client_created_id', 'client_id', 'created_at', 'id'),
+        # Reviews written in a time range (statistics of days not rolled up yet)
+        db.Index('ix_reviews_created_at', 'created_at'),
+    )
     
     id = db.Column(db.Integer, primary_key=True)
     # Each review is for one specific booking
@@ -13,7 +25,7 @@ class Review(db.Model):
     # Which provider (user) this review is about
     provider_id = db.Column(db.Integer, db.ForeignKey('users.id'), nullable=False)
     # Which provider profile this review is about
-    provider_profile_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), nullable=False)
+    provider_profile_id = db.Column(db.Integer, db.ForeignKey('provider_profiles.id'), nullable=False, index=True)
     # Rating from 1-5 stars
     rating = db.Column(db.Integer, nullable=False)
     # Optional text comment
@@ -21,6 +33,10 @@ class Review(db.Model):
     # When the review was written
     created_at = db.Column(db.DateTime, default=datetime.utcnow)
     
+    # RELATIONSHIPS
+    client = db.relationship('User', foreign_keys=[client_id], back_populates='reviews_written')
+    provider = db.relationship('User', foreign_keys=[provider_id])
+    
     def to_dict(self):
         return {
             'id': self.id,
@@ -31,4 +47,15 @@ class Review(db.Model):
             'rating': self.rating,
             'comment': self.comment,
             'created_at': self.created_at.isoformat() if self.created_at else None
-        }
\ No newline at end of file
+        }
+
+
+# Take deleted reviews out of their provider's rating aggregates, whichever
+# path removed them (a deleted booking or user cascades to its reviews)
+@event.listens_for(Session, 'before_flush')
+def _remove_deleted_ratings(session, flush_context, instances):
+    from app.models.provider_profile import ProviderProfile  # avoid circular import at module load
+
+    for obj in list(session.deleted):
+        if isinstance(obj, Review):
+            ProviderProfile.apply_rating(obj.provider_profile_id, obj.rating, -1, session=session)
@@ -12,6 +12,12 @@ class RoleEnum(enum.Enum):
 # Main User model class that represents the 'users' table in database
 class User(db.Model):
     __tablename__ = 'users'  # Explicitly set table name to 'users'
+    __table_args__ = (
+        # Keyset pagination of user listings, newest first
+        db.Index('ix_users_created_id', 'created_at', 'id'),
+        # Users of one role, newest first (admin and user listings, role counts)
+        db.Index('ix_users_role_created', 'role', 'created_at'),
+    )
     
     # Primary key - unique identifier for each user
     id = db.Column(db.Integer, primary_key=True)
@@ -34,6 +40,10 @@ class User(db.Model):
     
     # Relationships
     provider_profile = db.relationship('ProviderProfile', back_populates='user', uselist=False, cascade='all, delete-orphan')
+    # Reviews written as a client; deleted with the user (and taken out of the
+    # providers' rating aggregates by the listener in app/models/reviews.py)
+    reviews_written = db.relationship('Review', foreign_keys='Review.client_id', back_populates='client',
+                                      cascade='all, delete-orphan')
     
     # METHOD: Hash and store password securely
     def set_password(self, password):
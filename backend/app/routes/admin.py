@@ -1,15 +1,17 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from sqlalchemy import func, desc
-from datetime import datetime, timedelta
+from datetime import timedelta
 from app import db
 from app.models.user import User, RoleEnum
 from app.models.provider_profile import ProviderProfile
 from app.models.booking import Booking, BookingStatus
-from app.models.reviews import Review
-from app.models.payment import Payment, PaymentStatus
-from app.models.service_category import ServiceCategory
 from app.utils.auth import admin_required
+from app.utils.booking_queries import booking_query, serialize_booking, ADMIN_BOOKING_RELATIONS
+from app.utils.provider_queries import provider_query, serialize_providers, with_activity_counts
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils import analytics, daily_stats
+from app.utils.category_cache import get_category
 
 # Create blueprint
 admin_bp = Blueprint('admin', __name__)
@@ -20,21 +22,10 @@ admin_bp = Blueprint('admin', __name__)
 def get_dashboard_stats():
     """Get dashboard statistics for admin panel"""
     try:
-        # User statistics
-        user_stats = db.session.query(
-            User.role,
-            func.count(User.id).label('count')
-        ).group_by(User.role).all()
-        
-        user_stats_dict = {role.value: count for role, count in user_stats}
-        
-        # Booking statistics
-        booking_stats = db.session.query(
-            Booking.status,
-            func.count(Booking.id).label('count')
-        ).group_by(Booking.status).all()
-        
-        booking_stats_dict = {status.value: count for status, count in booking_stats}
+        # All-time totals from the daily rollup (see app/utils/daily_stats.py)
+        stats = daily_stats.collect()
+        user_stats_dict = stats.by_dimension('users')
+        booking_stats_dict = stats.by_dimension('bookings')
         
         return jsonify({
             'user_statistics': {
@@ -61,17 +52,10 @@ def get_dashboard_stats():
 def get_all_users():
     """Get all users with pagination"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        users = User.query.order_by(User.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        users, pagination = paginate(User.query, [User.created_at, User.id])
         
         user_list = []
-        for user in users.items:
+        for user in users:
             user_data = user.to_dict()
             if user.role == RoleEnum.PROVIDER and user.provider_profile:
                 user_data['provider_profile'] = user.provider_profile.to_dict()
@@ -79,14 +63,11 @@ def get_all_users():
         
         return jsonify({
             'users': user_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': users.total,
-                'pages': users.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch users', 'details': str(e)}), 500
 
@@ -163,40 +144,23 @@ def delete_user(user_id):
 def get_all_providers():
     """Get all providers with details (admin only)"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
+        # Booking and review counts are correlated subqueries evaluated per row of the page
+        query = with_activity_counts(provider_query())
+        providers, pagination = paginate(query, [ProviderProfile.created_at, ProviderProfile.id],
+                                         row_values=lambda row: [row[0].created_at, row[0].id])
         
-        providers = ProviderProfile.query.order_by(ProviderProfile.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        provider_list = []
-        for provider in providers.items:
-            provider_data = provider.to_dict()
-            provider_data['user'] = provider.user.to_dict() if provider.user else None
-            provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
-            
-            # Add booking and review counts
-            booking_count = Booking.query.filter_by(provider_id=provider.user_id).count()
-            review_count = Review.query.filter_by(provider_id=provider.user_id).count()
-            
+        provider_list = serialize_providers([row[0] for row in providers])
+        for provider_data, (_, booking_count, review_count) in zip(provider_list, providers):
             provider_data['booking_count'] = booking_count
             provider_data['review_count'] = review_count
-            
-            provider_list.append(provider_data)
         
         return jsonify({
             'providers': provider_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': providers.total,
-                'pages': providers.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch providers', 'details': str(e)}), 500
 
@@ -206,11 +170,9 @@ def get_all_providers():
 def get_all_bookings():
     """Get all bookings overview (admin only)"""
     try:
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
-        query = Booking.query
+        query = booking_query(ADMIN_BOOKING_RELATIONS)
         
         # Filter by status if provided
         if status:
@@ -219,30 +181,17 @@ def get_all_bookings():
             except ValueError:
                 return jsonify({'error': 'Invalid status'}), 400
         
-        bookings = query.order_by(Booking.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        bookings, pagination = paginate(query, [Booking.created_at, Booking.id])
         
-        booking_list = []
-        for booking in bookings.items:
-            booking_data = booking.to_dict()
-            booking_data['client'] = booking.client.to_dict() if booking.client else None
-            booking_data['provider_user'] = booking.provider.to_dict() if booking.provider else None
-            booking_data['service_category'] = booking.service_category.to_dict() if booking.service_category else None
-            booking_list.append(booking_data)
+        booking_list = [serialize_booking(booking, ADMIN_BOOKING_RELATIONS) for booking in bookings]
         
         return jsonify({
             'bookings': booking_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': bookings.total,
-                'pages': bookings.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch bookings', 'details': str(e)}), 500
 
@@ -252,39 +201,32 @@ def get_all_bookings():
 def get_admin_stats():
     """Get comprehensive admin statistics"""
     try:
-        # Basic counts
-        total_users = User.query.count()
-        total_providers = ProviderProfile.query.count()
-        total_bookings = Booking.query.count()
-        total_reviews = Review.query.count()
-        
-        # Revenue calculation (sum of completed bookings)
-        total_revenue = db.session.query(func.sum(Booking.total_amount)).filter(
-            Booking.status == BookingStatus.COMPLETED
-        ).scalar() or 0
-        
-        # Recent activity (last 30 days)
-        thirty_days_ago = datetime.utcnow() - timedelta(days=30)
-        
-        recent_users = User.query.filter(User.created_at >= thirty_days_ago).count()
-        recent_bookings = Booking.query.filter(Booking.created_at >= thirty_days_ago).count()
-        recent_reviews = Review.query.filter(Review.created_at >= thirty_days_ago).count()
-        
-        # Top service categories
-        top_categories = db.session.query(
-            ServiceCategory.name,
-            func.count(Booking.id).label('booking_count')
-        ).join(Booking).group_by(ServiceCategory.name).order_by(
-            desc('booking_count')
-        ).limit(5).all()
+        # Basic counts and revenue (sum of completed bookings) from the daily rollup
+        stats = daily_stats.collect()
+        
+        # Recent activity (last 30 days, today included)
+        today = daily_stats.utc_today()
+        recent = daily_stats.collect(start=today - timedelta(days=29), end=today)
+        recent_users = recent.count('users')
+        recent_bookings = recent.count('bookings')
+        recent_reviews = recent.count('reviews')
+        
+        # Top service categories (names from the category catalogue)
+        bookings_by_category = stats.by_category('bookings')
+        top_categories = []
+        for category_id, count in sorted(bookings_by_category.items(), key=lambda item: (-item[1], item[0])):
+            category = get_category(category_id)
+            if category and count:
+                top_categories.append((category['name'], count))
+        top_categories = top_categories[:5]
         
         return jsonify({
             'totals': {
-                'users': total_users,
-                'providers': total_providers,
-                'bookings': total_bookings,
-                'reviews': total_reviews,
-                'revenue': float(total_revenue)
+                'users': stats.count('users'),
+                'providers': stats.count('providers'),
+                'bookings': stats.count('bookings'),
+                'reviews': stats.count('reviews'),
+                'revenue': stats.amount('bookings', BookingStatus.COMPLETED.value)
             },
             'recent_activity': {
                 'new_users_30d': recent_users,
@@ -306,9 +248,10 @@ def get_admin_stats():
 def get_total_jobs():
     """Get total jobs analytics"""
     try:
-        total_jobs = Booking.query.count()
-        completed_jobs = Booking.query.filter_by(status=BookingStatus.COMPLETED).count()
-        pending_jobs = Booking.query.filter_by(status=BookingStatus.PENDING).count()
+        stats = daily_stats.collect()
+        total_jobs = stats.count('bookings')
+        completed_jobs = stats.count('bookings', BookingStatus.COMPLETED.value)
+        pending_jobs = stats.count('bookings', BookingStatus.PENDING.value)
         
         return jsonify({
             'total_jobs': total_jobs,
@@ -325,9 +268,10 @@ def get_total_jobs():
 def get_total_users_analytics():
     """Get total users analytics"""
     try:
-        total_users = User.query.count()
-        clients = User.query.filter_by(role=RoleEnum.CLIENT).count()
-        providers = User.query.filter_by(role=RoleEnum.PROVIDER).count()
+        stats = daily_stats.collect()
+        total_users = stats.count('users')
+        clients = stats.count('users', RoleEnum.CLIENT.value)
+        providers = stats.count('users', RoleEnum.PROVIDER.value)
         
         return jsonify({
             'total_users': total_users,
@@ -339,6 +283,59 @@ def get_total_users_analytics():
     except Exception as e:
         return jsonify({'error': 'Failed to fetch user analytics', 'details': str(e)}), 500
 
+def _analytics_response(fields, error):
+    """Time-bucketed analytics restricted to fields (None for all), see app/utils/analytics.py"""
+    try:
+        granularity, start, end, category_id = analytics.parse_range(request.args)
+        result = analytics.timeseries(start, end, granularity, category_id)
+        if fields is not None:
+            result = {
+                'points': [{'bucket': point['bucket'], **{field: point[field] for field in fields}}
+                           for point in result['points']],
+                'totals': {field: result['totals'][field] for field in fields}
+            }
+        
+        return jsonify({
+            'granularity': granularity,
+            'start': start.isoformat(),
+            'end': end.isoformat(),
+            'service_category_id': category_id,
+            **result
+        }), 200
+    except analytics.InvalidRange as e:
+        return jsonify({'error': str(e)}), 400
+    except Exception as e:
+        return jsonify({'error': error, 'details': str(e)}), 500
+
+@admin_bp.route('/analytics/timeseries', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_analytics_timeseries():
+    """Revenue, bookings per status, cancellations and new providers per hour/day/week/month"""
+    return _analytics_response(None, 'Failed to fetch analytics')
+
+@admin_bp.route('/analytics/revenue', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_revenue_analytics():
+    """Revenue of completed bookings per hour/day/week/month"""
+    return _analytics_response(('revenue',), 'Failed to fetch revenue analytics')
+
+@admin_bp.route('/analytics/bookings', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_booking_analytics():
+    """New bookings per status and cancellations per hour/day/week/month"""
+    return _analytics_response(('bookings', 'bookings_by_status', 'cancellations'),
+                               'Failed to fetch booking analytics')
+
+@admin_bp.route('/analytics/new-providers', methods=['GET'])
+@jwt_required()
+@admin_required
+def get_new_provider_analytics():
+    """New providers per hour/day/week/month"""
+    return _analytics_response(('new_providers',), 'Failed to fetch provider analytics')
+
 @admin_bp.route('/analytics/top-providers', methods=['GET'])
 @jwt_required()
 @admin_required
@@ -367,12 +364,10 @@ def get_top_providers():
             User.id,
             ProviderProfile.business_name,
             ProviderProfile.average_rating,
-            func.count(Review.id).label('review_count')
+            ProviderProfile.rating_count
         ).join(ProviderProfile, User.id == ProviderProfile.user_id)\
-         .outerjoin(Review, User.id == Review.provider_id)\
-         .filter(ProviderProfile.average_rating.isnot(None))\
-         .group_by(User.id, ProviderProfile.business_name, ProviderProfile.average_rating)\
-         .order_by(desc(ProviderProfile.average_rating))\
+         .filter(ProviderProfile.rating_count > 0)\
+         .order_by(desc(ProviderProfile.average_rating), desc(ProviderProfile.rating_count))\
          .limit(limit).all()
         
         return jsonify({
@@ -390,7 +385,7 @@ def get_top_providers():
                     'provider_id': provider_id,
                     'name': f'{first_name} {last_name}',
                     'business_name': business_name,
-                    'average_rating': float(average_rating) if average_rating else 0,
+                    'average_rating': round(float(average_rating), 2) if average_rating else 0,
                     'review_count': review_count
                 }
                 for first_name, last_name, provider_id, business_name, average_rating, review_count in top_by_rating
@@ -1,6 +1,7 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from datetime import datetime
+from sqlalchemy.orm import aliased
 from app import db
 from app.models.booking import Booking, BookingStatus
 from app.models.provider_profile import ProviderProfile
@@ -9,6 +10,12 @@ from app.models.user import User
 from app.models.payment import Payment, PaymentStatus
 from app.utils.auth import admin_required, provider_required, client_required
 from app.utils.email_service import send_booking_confirmation, send_booking_notification
+from app.utils.booking_queries import booking_query, serialize_booking, BOOKING_DETAIL_RELATIONS
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.category_cache import catalogue
+from app.utils.http_cache import conditional_json, latest, make_etag
+from app.utils.availability import SLOT_HOLDING_STATUSES, conflict_response, find_conflict, parse_duration
+from app.utils.availability import move_slot, reserve_slot, restore_slot
 
 bookings_bp = Blueprint('bookings', __name__)
 
@@ -53,8 +60,13 @@ def create_booking():
         if scheduled_date <= datetime.utcnow():
             return jsonify({'error': 'Booking date must be in the future'}), 400
         
+        try:
+            duration_hours = parse_duration(data['duration_hours'])
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
         # Calculate total amount
-        total_amount = provider.hourly_rate * data['duration_hours']
+        total_amount = provider.hourly_rate * duration_hours
         
         # Create booking
         booking = Booking(
@@ -63,13 +75,19 @@ def create_booking():
             provider_profile_id=provider.id,
             service_category_id=data['service_category_id'],
             scheduled_date=scheduled_date,
-            duration_hours=data['duration_hours'],
+            duration_hours=duration_hours,
             total_amount=total_amount,
             address=data['address'],
             special_requests=data.get('special_requests', '')
         )
         
-        db.session.add(booking)
+        # Check the slot and insert in one atomic step, so concurrent requests
+        # for an overlapping slot cannot both succeed
+        conflict = reserve_slot(booking)
+        if conflict:
+            body = conflict_response(conflict)
+            db.session.rollback()
+            return jsonify(body), 409
         db.session.commit()
         
         # Send email notifications
@@ -112,54 +130,37 @@ def get_bookings():
         current_user_id = get_jwt_identity()
         current_user = User.query.get(current_user_id)
         
-        # Pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
         status = request.args.get('status')
         
-        # Base query depends on user role
+        # Base query depends on user role, eager-loading everything we serialize
+        query = booking_query(BOOKING_DETAIL_RELATIONS)
         if current_user.role.value == 'admin':
             # Admin can see all bookings
-            query = Booking.query
+            pass
         elif current_user.role.value == 'provider':
             # Providers see their own bookings
-            query = Booking.query.filter_by(provider_id=current_user_id)
+            query = query.filter_by(provider_id=current_user_id)
         else:
             # Clients see their own bookings
-            query = Booking.query.filter_by(client_id=current_user_id)
+            query = query.filter_by(client_id=current_user_id)
         
         # Filter by status if provided
         if status:
             query = query.filter_by(status=BookingStatus(status))
         
-        # Execute query with pagination
-        bookings = query.order_by(Booking.created_at.desc()).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Execute query with pagination (newest first, page or cursor mode)
+        bookings, pagination = paginate(query, [Booking.created_at, Booking.id])
         
         # Get booking details with related information
-        booking_list = []
-        for booking in bookings.items:
-            booking_data = booking.to_dict()
-            booking_data['client'] = booking.client.to_dict() if booking.client else None
-            booking_data['provider_user'] = booking.provider.to_dict() if booking.provider else None
-            booking_data['provider_profile'] = booking.provider_profile.to_dict() if booking.provider_profile else None
-            booking_data['service_category'] = booking.service_category.to_dict() if booking.service_category else None
-            booking_data['payment'] = booking.payment.to_dict() if booking.payment else None
-            booking_list.append(booking_data)
+        booking_list = [serialize_booking(booking, BOOKING_DETAIL_RELATIONS) for booking in bookings]
         
         return jsonify({
             'bookings': booking_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': bookings.total,
-                'pages': bookings.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch bookings', 'details': str(e)}), 500
 
@@ -168,25 +169,38 @@ def get_bookings():
 def get_booking(booking_id):
     """Get specific booking by ID (with authorization)"""
     try:
-        current_user_id = get_jwt_identity()
+        current_user_id = int(get_jwt_identity())
         current_user = User.query.get(current_user_id)
         
-        booking = Booking.query.get_or_404(booking_id)
+        # Parties and validators in one lookup: the booking and every row it
+        # serializes, joined on their primary keys
+        client_user, provider_user = aliased(User), aliased(User)
+        row = db.session.query(
+            Booking.client_id, Booking.provider_id, Booking.updated_at,
+            client_user.updated_at, provider_user.updated_at,
+            ProviderProfile.updated_at, Payment.updated_at
+        ).join(client_user, client_user.id == Booking.client_id
+        ).join(provider_user, provider_user.id == Booking.provider_id
+        ).outerjoin(ProviderProfile, ProviderProfile.id == Booking.provider_profile_id
+        ).outerjoin(Payment, Payment.booking_id == Booking.id
+        ).filter(Booking.id == booking_id).first()
+        if not row:
+            return jsonify({'error': 'Booking not found'}), 404
         
         # Authorization check
+        client_id, provider_id, *versions = row
         if (current_user.role.value != 'admin' and 
-            booking.client_id != current_user_id and 
-            booking.provider_id != current_user_id):
+            client_id != current_user_id and 
+            provider_id != current_user_id):
             return jsonify({'error': 'Access denied'}), 403
         
-        booking_data = booking.to_dict()
-        booking_data['client'] = booking.client.to_dict() if booking.client else None
-        booking_data['provider_user'] = booking.provider.to_dict() if booking.provider else None
-        booking_data['provider_profile'] = booking.provider_profile.to_dict() if booking.provider_profile else None
-        booking_data['service_category'] = booking.service_category.to_dict() if booking.service_category else None
-        booking_data['payment'] = booking.payment.to_dict() if booking.payment else None
+        def build():
+            booking = booking_query(BOOKING_DETAIL_RELATIONS).filter_by(id=booking_id).first()
+            return {'booking': serialize_booking(booking, BOOKING_DETAIL_RELATIONS)}
         
-        return jsonify({'booking': booking_data}), 200
+        # Per-user data: private, revalidated on every use
+        etag = make_etag('booking', booking_id, *versions, catalogue().etag)
+        return conditional_json(etag, build, public=False, last_modified=latest(*versions))
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch booking', 'details': str(e)}), 500
@@ -230,8 +244,15 @@ def update_booking_status(booking_id):
             # Admin can set any status
             pass
         
-        # Update status
-        booking.status = new_status
+        # A cancelled (or completed) booking only gets its slot back if nobody took it meanwhile
+        if new_status in SLOT_HOLDING_STATUSES and booking.status not in SLOT_HOLDING_STATUSES:
+            conflict = restore_slot(booking, new_status)
+            if conflict:
+                body = conflict_response(conflict)
+                db.session.rollback()
+                return jsonify(body), 409
+        else:
+            booking.status = new_status
         db.session.commit()
         
         return jsonify({
@@ -261,19 +282,32 @@ def update_booking(booking_id):
             return jsonify({'error': 'Can only update pending bookings'}), 400
         
         # Update allowed fields
+        scheduled_date, duration_hours = booking.scheduled_date, booking.duration_hours
         if 'scheduled_date' in data:
             try:
                 scheduled_date = datetime.fromisoformat(data['scheduled_date'].replace('Z', '+00:00'))
                 if scheduled_date <= datetime.utcnow():
                     return jsonify({'error': 'Booking date must be in the future'}), 400
-                booking.scheduled_date = scheduled_date
             except ValueError:
                 return jsonify({'error': 'Invalid date format'}), 400
         
         if 'duration_hours' in data:
-            booking.duration_hours = data['duration_hours']
-            # Recalculate total amount
-            booking.total_amount = booking.provider_profile.hourly_rate * data['duration_hours']
+            try:
+                duration_hours = parse_duration(data['duration_hours'])
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+        
+        # A moved or longer booking must not overlap the provider's other bookings
+        if (scheduled_date, duration_hours) != (booking.scheduled_date, booking.duration_hours):
+            duration_changed = duration_hours != booking.duration_hours
+            conflict = move_slot(booking, scheduled_date, duration_hours)
+            if conflict:
+                body = conflict_response(conflict)
+                db.session.rollback()
+                return jsonify(body), 409
+            if duration_changed:
+                # Recalculate total amount
+                booking.total_amount = booking.provider_profile.hourly_rate * duration_hours
         
         if 'address' in data:
             booking.address = data['address']
@@ -310,13 +344,13 @@ def check_provider_availability():
         except ValueError:
             return jsonify({'error': 'Invalid date format. Use ISO format'}), 400
         
-        # Check for overlapping bookings
-        overlapping_booking = Booking.query.filter(
-            Booking.provider_id == current_user_id,
-            Booking.status.in_([BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS]),
-            Booking.scheduled_date <= check_date,
-            Booking.scheduled_date + db.func.make_interval(hours=Booking.duration_hours) >= check_date
-        ).first()
+        try:
+            duration_hours = parse_duration(duration_hours)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Check for bookings overlapping [check_date, check_date + duration_hours)
+        overlapping_booking = find_conflict(current_user_id, check_date, duration_hours)
         
         is_available = overlapping_booking is None
         
@@ -1,15 +1,37 @@
-from flask import Blueprint, request, jsonify
+import json
+from flask import Blueprint, Response, current_app, request, jsonify, stream_with_context
 from flask_jwt_extended import jwt_required
-from app.utils.geo_service import calculate_distance, get_coordinates_from_address
+from app.utils.auth import admin_required
+from app.utils.geo_service import calculate_distances, distance_matrix_rows, geocode_addresses, get_coordinates_from_address
+from app.utils.geocode_cache import geocode_cache
 
 geo_bp = Blueprint('geo', __name__)
 
 @geo_bp.route('/geocode', methods=['POST'])
 @jwt_required()
 def geocode_address():
-    """Convert address to coordinates"""
+    """
+    Convert address to coordinates
+    Single: {address} - Batch: {addresses: [...]} resolved concurrently
+    """
     try:
         data = request.get_json()
+        
+        if 'addresses' in data:
+            addresses = data['addresses']
+            if not isinstance(addresses, list) or not all(isinstance(a, str) for a in addresses):
+                return jsonify({'error': 'addresses must be a list of strings'}), 400
+            max_batch = current_app.config.get('GEOCODE_MAX_BATCH', 1000)
+            if len(addresses) > max_batch:
+                return jsonify({'error': f'At most {max_batch} addresses per request'}), 413
+            
+            results = geocode_addresses(addresses)
+            return jsonify({
+                'message': 'Batch geocoding complete',
+                'results': [{'address': a, 'coordinates': results[a]} for a in addresses],
+                'resolved': sum(1 for a in addresses if results[a])
+            }), 200
+        
         address = data.get('address')
         
         if not address:
@@ -29,30 +51,134 @@ def geocode_address():
     except Exception as e:
         return jsonify({'error': str(e)}), 500
 
+@geo_bp.route('/geocode/cache-stats', methods=['GET'])
+@jwt_required()
+@admin_required
+def geocode_cache_stats():
+    """Hit/miss counters of the geocode cache in this worker process"""
+    return jsonify({'geocode_cache': geocode_cache.get_stats()}), 200
+
+def _parse_points(points, field, allow_missing=False):
+    """
+    Validate a list of {lat, lon} objects and return [(lat, lon), ...]
+    allow_missing=True accepts null coordinates, returned as (None, None).
+    """
+    if not isinstance(points, list) or not points:
+        raise ValueError(f'{field} must be a non-empty list of {{lat, lon}} objects')
+    parsed = []
+    for point in points:
+        if not isinstance(point, dict) or 'lat' not in point or 'lon' not in point:
+            raise ValueError(f'{field} must be a non-empty list of {{lat, lon}} objects')
+        if allow_missing and (point['lat'] is None or point['lon'] is None):
+            parsed.append((None, None))
+            continue
+        try:
+            lat, lon = float(point['lat']), float(point['lon'])
+        except (TypeError, ValueError):
+            raise ValueError(f'{field} must be a non-empty list of {{lat, lon}} objects')
+        if not (-90 <= lat <= 90 and -180 <= lon <= 180):
+            raise ValueError(f'{field} contains coordinates out of range')
+        parsed.append((lat, lon))
+    return parsed
+
+def _parse_point(data, lat_field, lon_field):
+    """Validate one point given as two fields of the request body"""
+    if lat_field not in data or lon_field not in data:
+        raise ValueError(f'{lat_field} and {lon_field} are required')
+    try:
+        return _parse_points([{'lat': data[lat_field], 'lon': data[lon_field]}], f'{lat_field}/{lon_field}')[0]
+    except ValueError:
+        raise ValueError(f'{lat_field} and {lon_field} must be numeric coordinates within range')
+
 @geo_bp.route('/distance', methods=['POST'])
 @jwt_required()
 def calculate_distance_endpoint():
-    """Calculate distance between two points"""
+    """
+    Calculate distance between two points, or from one point to many
+    Single pair: {lat1, lon1, lat2, lon2}
+    Batch: {lat1, lon1, points: [{lat, lon}, ...]} - returns distances in input order
+    """
     try:
-        data = request.get_json()
+        data = request.get_json() or {}
+        
+        if 'points' in data:
+            try:
+                origin = _parse_point(data, 'lat1', 'lon1')
+                points = _parse_points(data['points'], 'points', allow_missing=True)
+            except ValueError as e:
+                return jsonify({'error': str(e)}), 400
+            
+            distances = calculate_distances(origin, [lat for lat, _ in points], [lon for _, lon in points])
+            
+            return jsonify({
+                'message': 'Distances calculated successfully',
+                'origin': {'lat': origin[0], 'lon': origin[1]},
+                'distances_km': [round(d, 2) if d == d else None for d in distances]  # NaN -> null
+            }), 200
         
-        required_fields = ['lat1', 'lon1', 'lat2', 'lon2']
-        if not all(field in data for field in required_fields):
-            return jsonify({'error': 'lat1, lon1, lat2, lon2 are required'}), 400
+        try:
+            point1 = _parse_point(data, 'lat1', 'lon1')
+            point2 = _parse_point(data, 'lat2', 'lon2')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
         
-        distance = calculate_distance(
-            data['lat1'], data['lon1'],
-            data['lat2'], data['lon2']
-        )
+        distance = calculate_distances(point1, [point2[0]], [point2[1]])[0]
         
         return jsonify({
             'message': 'Distance calculated successfully',
-            'distance_km': round(distance, 2) if distance else None,
+            'distance_km': round(float(distance), 2) if distance == distance else None,
             'coordinates': {
-                'point1': {'lat': data['lat1'], 'lon': data['lon1']},
-                'point2': {'lat': data['lat2'], 'lon': data['lon2']}
+                'point1': {'lat': point1[0], 'lon': point1[1]},
+                'point2': {'lat': point2[0], 'lon': point2[1]}
             }
         }), 200
         
     except Exception as e:
-        return jsonify({'error': str(e)}), 500
\ No newline at end of file
+        return jsonify({'error': str(e)}), 500
+
+@geo_bp.route('/distance-matrix', methods=['POST'])
+@jwt_required()
+def distance_matrix_endpoint():
+    """
+    Calculate distances from N origins to M destinations in one request
+    Body: {origins: [{lat, lon}, ...], destinations: [{lat, lon}, ...]}
+    distances_km[i][j] is the distance from origins[i] to destinations[j].
+    Large matrices are streamed row by row.
+    """
+    try:
+        data = request.get_json() or {}
+        
+        try:
+            origins = _parse_points(data.get('origins'), 'origins')
+            destinations = _parse_points(data.get('destinations'), 'destinations')
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        cells = len(origins) * len(destinations)
+        max_cells = current_app.config.get('GEO_MATRIX_MAX_CELLS', 250000)
+        if cells > max_cells:
+            return jsonify({
+                'error': 'Distance matrix too large',
+                'details': f'{len(origins)} x {len(destinations)} = {cells} cells, limit is {max_cells}'
+            }), 413
+        
+        rows = distance_matrix_rows(origins, destinations)
+        
+        if cells <= current_app.config.get('GEO_MATRIX_STREAM_THRESHOLD', 10000):
+            return jsonify({
+                'origins': len(origins),
+                'destinations': len(destinations),
+                'distances_km': list(rows)
+            }), 200
+        
+        def generate():
+            # Same JSON document as the small response, written one row at a time
+            yield f'{{"origins": {len(origins)}, "destinations": {len(destinations)}, "distances_km": ['
+            for index, row in enumerate(rows):
+                yield (',' if index else '') + json.dumps(row)
+            yield ']}'
+        
+        return Response(stream_with_context(generate()), mimetype='application/json')
+        
+    except Exception as e:
+        return jsonify({'error': str(e)}), 500
@@ -1,13 +1,20 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import or_
 from app import db
 from app.models.provider_profile import ProviderProfile
 from app.models.service_category import ServiceCategory
 from app.models.user import User, RoleEnum
 from app.utils.auth import admin_required, provider_required
+from app.utils.availability import free_slots, parse_calendar_request
+from app.utils.category_cache import catalogue, category_cache_max_age
 from app.utils.cloudinary_service import upload_image, delete_image
-from app.utils.geo_service import calculate_distance, get_coordinates_from_address
+from app.utils.geo_service import get_coordinates_from_address
+from app.utils.geo_search import find_nearby_providers, apply_distance_ordering, distance_column
+from app.utils.http_cache import conditional_json, latest, make_etag
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.provider_queries import provider_query, serialize_providers, serialize_provider
+from app.utils.provider_search import apply_search
+from app.utils.response_cache import cached_response
 
 providers_bp = Blueprint('providers', __name__)
 
@@ -63,13 +70,10 @@ def create_provider_profile():
         return jsonify({'error': 'Failed to create provider profile', 'details': str(e)}), 500
 
 @providers_bp.route('', methods=['GET'])
+@cached_response(lambda: ['providers', 'categories'])
 def get_providers():
     """Get all providers with filtering and pagination"""
     try:
-        # Pagination parameters
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
         # Filter parameters
         service_category_id = request.args.get('service_category_id', type=int)
         search_query = request.args.get('search', '')
@@ -83,22 +87,24 @@ def get_providers():
         max_distance = request.args.get('max_distance', 50, type=float)  # Default 50km
         address = request.args.get('address')
         
-        # Base query
-        query = ProviderProfile.query.filter_by(is_available=True)
+        # Get coordinates from address if provided
+        if address and not (user_lat and user_lon):
+            coords = get_coordinates_from_address(address)
+            if coords:
+                user_lat = coords['latitude']
+                user_lon = coords['longitude']
+        
+        # Base query (user and category are loaded with the page)
+        query = provider_query().filter_by(is_available=True)
         
         # Apply filters
         if service_category_id:
             query = query.filter_by(service_category_id=service_category_id)
         
+        # Full-text match (prefix terms) with a relevance score, see app/utils/provider_search.py
+        relevance = None
         if search_query:
-            query = query.join(User).filter(
-                or_(
-                    ProviderProfile.business_name.ilike(f'%{search_query}%'),
-                    ProviderProfile.description.ilike(f'%{search_query}%'),
-                    User.first_name.ilike(f'%{search_query}%'),
-                    User.last_name.ilike(f'%{search_query}%')
-                )
-            )
+            query, relevance = apply_search(query, search_query)
         
         if min_rate is not None:
             query = query.filter(ProviderProfile.hourly_rate >= min_rate)
@@ -109,68 +115,62 @@ def get_providers():
         if is_available is not None:
             query = query.filter(ProviderProfile.is_available == is_available)
         
-        # Execute query with pagination
-        providers = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        # Get coordinates from address if provided
-        if address and not (user_lat and user_lon):
-            coords = get_coordinates_from_address(address)
-            if coords:
-                user_lat = coords['latitude']
-                user_lon = coords['longitude']
+        # With a search location, distance filtering and ordering happen in the
+        # query itself so pagination counts and pages only matching providers
+        geo_search = bool(user_lat and user_lon)
+        if geo_search:
+            query = apply_distance_ordering(query, user_lat, user_lon, max_distance)
+        
+        # Execute query with pagination: nearest first with a location,
+        # best match first for a text search, otherwise newest first
+        if geo_search:
+            providers, pagination = paginate(query, [distance_column(user_lat, user_lon), ProviderProfile.id],
+                                             descending=False, row_values=lambda row: [row[1], row[0].id])
+        elif relevance is not None:
+            relevance = relevance.label('relevance')
+            providers, pagination = paginate(query.add_columns(relevance), [relevance, ProviderProfile.id],
+                                             row_values=lambda row: [row[1], row[0].id])
+            providers = [row[0] for row in providers]
+        else:
+            providers, pagination = paginate(query, [ProviderProfile.created_at, ProviderProfile.id])
         
         # Get provider details with user information and distance
-        provider_list = []
-        for provider in providers.items:
-            provider_data = provider.to_dict()
-            provider_data['user'] = provider.user.to_dict() if provider.user else None
-            provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
-            
-            # Calculate distance if coordinates available
-            if user_lat and user_lon and provider.latitude and provider.longitude:
-                distance = calculate_distance(user_lat, user_lon, provider.latitude, provider.longitude)
-                provider_data['distance_km'] = round(distance, 2) if distance else None
-                
-                # Filter by distance if specified
-                if max_distance and distance and distance > max_distance:
-                    continue
-            else:
-                provider_data['distance_km'] = None
-            
-            provider_list.append(provider_data)
-        
-        # Sort by distance if coordinates provided
-        if user_lat and user_lon:
-            provider_list.sort(key=lambda x: x['distance_km'] if x['distance_km'] is not None else float('inf'))
+        if geo_search:
+            provider_list = serialize_providers([row[0] for row in providers],
+                                                [row[1] for row in providers])
+        else:
+            provider_list = serialize_providers(providers, [None] * len(providers))
         
         return jsonify({
             'providers': provider_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': providers.total,
-                'pages': providers.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch providers', 'details': str(e)}), 500
 
 @providers_bp.route('/<int:provider_id>', methods=['GET'])
+@cached_response(lambda provider_id: [f'provider:{provider_id}', 'provider-details', 'categories'])
 def get_provider(provider_id):
     """Get specific provider by ID"""
     try:
-        provider = ProviderProfile.query.get_or_404(provider_id)
+        # Validators first: one primary-key lookup, no serialization on a 304
+        versions = db.session.query(ProviderProfile.updated_at, User.updated_at).join(
+            User, User.id == ProviderProfile.user_id
+        ).filter(ProviderProfile.id == provider_id).first()
+        if not versions:
+            return jsonify({'error': 'Provider not found'}), 404
         
-        provider_data = provider.to_dict()
-        provider_data['user'] = provider.user.to_dict() if provider.user else None
-        provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
+        profile_updated, user_updated = versions
+        etag = make_etag('provider', provider_id, profile_updated, user_updated, catalogue().etag)
         
-        return jsonify({'provider': provider_data}), 200
+        def build():
+            provider = provider_query().filter_by(id=provider_id).first()
+            return {'provider': serialize_provider(provider)}
+        
+        return conditional_json(etag, build, max_age=30, last_modified=latest(profile_updated, user_updated))
         
     except Exception as e:
         return jsonify({'error': 'Failed to fetch provider', 'details': str(e)}), 500
@@ -182,14 +182,12 @@ def get_my_provider_profile():
     """Get current user's provider profile"""
     try:
         current_user_id = get_jwt_identity()
-        provider = ProviderProfile.query.filter_by(user_id=current_user_id).first()
+        provider = provider_query().filter_by(user_id=current_user_id).first()
         
         if not provider:
             return jsonify({'error': 'Provider profile not found'}), 404
         
-        provider_data = provider.to_dict()
-        provider_data['user'] = provider.user.to_dict() if provider.user else None
-        provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
+        provider_data = serialize_provider(provider)
         
         return jsonify({'provider': provider_data}), 200
         
@@ -233,9 +231,7 @@ def update_my_provider_profile():
         
         db.session.commit()
         
-        provider_data = provider.to_dict()
-        provider_data['user'] = provider.user.to_dict() if provider.user else None
-        provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
+        provider_data = serialize_provider(provider)
         
         return jsonify({
             'message': 'Provider profile updated successfully',
@@ -274,16 +270,54 @@ def update_availability():
         db.session.rollback()
         return jsonify({'error': 'Failed to update availability', 'details': str(e)}), 500
 
-@providers_bp.route('/categories', methods=['GET'])
-def get_service_categories():
-    """Get all service categories"""
+@providers_bp.route('/availability', methods=['GET'])
+def get_providers_availability():
+    """Free time slots of several providers over a date range, in one call"""
     try:
-        categories = ServiceCategory.query.all()
+        try:
+            params = parse_calendar_request(request.args)
+        except ValueError as e:
+            return jsonify({'error': str(e)}), 400
+        
+        # Providers that are not accepting bookings have no free slots
+        profiles = dict(db.session.query(ProviderProfile.user_id, ProviderProfile.is_available)
+                        .filter(ProviderProfile.user_id.in_(params['provider_ids'])).all())
+        bookable = [user_id for user_id in params['provider_ids'] if profiles.get(user_id)]
+        slots = free_slots(bookable, params['start'], params['end'], params['from_hour'], params['to_hour'],
+                           params['min_hours']) if bookable else {}
+        
+        providers = []
+        for user_id in params['provider_ids']:
+            if user_id not in profiles:
+                continue
+            free = [{'start': start.isoformat(), 'end': end.isoformat()} for start, end in slots.get(user_id, [])]
+            providers.append({
+                'provider_id': user_id,
+                'is_available': bool(profiles[user_id]),
+                'free_slots': free,
+                'next_available': free[0]['start'] if free else None
+            })
         
         return jsonify({
-            'categories': [category.to_dict() for category in categories]
+            'start': params['start'].isoformat(),
+            'end': params['end'].isoformat(),
+            'working_hours': {'from_hour': params['from_hour'], 'to_hour': params['to_hour']},
+            'min_hours': params['min_hours'],
+            'providers': providers
         }), 200
         
+    except Exception as e:
+        return jsonify({'error': 'Failed to fetch provider availability', 'details': str(e)}), 500
+
+@providers_bp.route('/categories', methods=['GET'])
+def get_service_categories():
+    """Get all service categories"""
+    try:
+        # Served from the in-process catalogue, 304 when the client is up to date
+        snapshot = catalogue()
+        return conditional_json(snapshot.etag, lambda: {'categories': snapshot.items},
+                                max_age=category_cache_max_age(), last_modified=snapshot.last_modified)
+        
     except Exception as e:
         return jsonify({'error': 'Failed to fetch service categories', 'details': str(e)}), 500
 
@@ -337,6 +371,7 @@ def upload_provider_image():
         return jsonify({'error': 'Failed to upload business image', 'details': str(e)}), 500
 
 @providers_bp.route('/nearby', methods=['GET'])
+@cached_response(lambda: ['providers', 'categories'])
 def get_nearby_providers():
     """Get providers near a specific location"""
     try:
@@ -361,30 +396,16 @@ def get_nearby_providers():
         service_category_id = request.args.get('service_category_id', type=int)
         limit = request.args.get('limit', 20, type=int)
         
-        # Get all available providers
-        query = ProviderProfile.query.filter_by(is_available=True)
+        # Available providers, narrowed down and ranked by the database
+        query = provider_query().filter_by(is_available=True)
         
         if service_category_id:
             query = query.filter_by(service_category_id=service_category_id)
         
-        providers = query.all()
-        
-        # Calculate distances and filter
-        nearby_providers = []
-        for provider in providers:
-            if provider.latitude and provider.longitude:
-                distance = calculate_distance(user_lat, user_lon, provider.latitude, provider.longitude)
-                
-                if distance and distance <= max_distance:
-                    provider_data = provider.to_dict()
-                    provider_data['user'] = provider.user.to_dict() if provider.user else None
-                    provider_data['service_category'] = provider.service_category.to_dict() if provider.service_category else None
-                    provider_data['distance_km'] = round(distance, 2)
-                    nearby_providers.append(provider_data)
-        
-        # Sort by distance and limit results
-        nearby_providers.sort(key=lambda x: x['distance_km'])
-        nearby_providers = nearby_providers[:limit]
+        results = find_nearby_providers(query, user_lat, user_lon, max_distance, limit=limit)
+        
+        nearby_providers = serialize_providers([provider for provider, _ in results],
+                                               [distance for _, distance in results])
         
         return jsonify({
             'providers': nearby_providers,
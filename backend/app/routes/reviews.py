@@ -1,37 +1,27 @@
 from flask import Blueprint, request, jsonify
 from flask_jwt_extended import jwt_required, get_jwt_identity
-from sqlalchemy import func, desc
+from sqlalchemy import func, desc, select
+from sqlalchemy.orm import selectinload
 from app import db
 from app.models.reviews import Review
 from app.models.booking import Booking, BookingStatus
 from app.models.provider_profile import ProviderProfile
 from app.models.user import User
 from app.utils.auth import admin_required, client_required
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.http_cache import conditional_json, latest, make_etag, query_args_key
+from app.utils.response_cache import cached_response
 
 # Create blueprint - make sure this line exists
 reviews_bp = Blueprint('reviews', __name__)
 
-def update_provider_rating_aggregates(provider_id):
-    """Update provider's average rating and review count"""
-    try:
-        agg = db.session.query(
-            func.avg(Review.rating).label('avg_rating'),
-            func.count(Review.id).label('count')
-        ).filter(Review.provider_id == provider_id).first()
-
-        avg_rating = float(agg.avg_rating) if agg and agg.avg_rating is not None else None
-        count = int(agg.count) if agg and agg.count is not None else 0
-
-        provider_profile = ProviderProfile.query.filter_by(user_id=provider_id).first()
-        if provider_profile:
-            provider_profile.average_rating = avg_rating
-            provider_profile.review_count = count
-            db.session.commit()
-            return True
-    except Exception:
-        db.session.rollback()
-        return False
-    return False
+def update_provider_rating_aggregates(review, delta=1):
+    """
+    Fold a review into its provider's rating aggregates (delta=-1 removes it)
+    O(1): adjusts the counters with a relative UPDATE inside the caller's
+    transaction instead of re-aggregating every review of the provider.
+    """
+    ProviderProfile.apply_rating(review.provider_profile_id, review.rating, delta)
 
 @reviews_bp.route('', methods=['POST'])
 @jwt_required()
@@ -77,20 +67,18 @@ def create_review():
         # Create the review
         review = Review(
             booking_id=booking.id,
-            provider_id=getattr(booking, 'provider_id', None),
+            provider_id=booking.provider_id,
+            provider_profile_id=booking.provider_profile_id,
             client_id=current_user_id,
             rating=rating,
             comment=data['comment']
         )
 
+        # Review and provider rating aggregates are committed together
         db.session.add(review)
+        update_provider_rating_aggregates(review)
         db.session.commit()
 
-        # Update provider rating aggregates
-        provider_id = getattr(booking, 'provider_id', None)
-        if provider_id is not None:
-            update_provider_rating_aggregates(provider_id)
-
         # Prepare response data (avoid exposing internal fields if necessary)
         review_data = {
             'id': review.id,
@@ -108,78 +96,73 @@ def create_review():
         return jsonify({'error': 'Internal server error', 'details': str(e)}), 500
 
 @reviews_bp.route('/provider/<int:provider_id>', methods=['GET'])
+@cached_response(lambda provider_id: [f'provider-reviews:{provider_id}', 'provider-reviews'])
 def get_provider_reviews(provider_id):
-    """Get all reviews for a specific provider"""
+    """
+    Get all reviews for a specific provider
+    Add cursor= (then cursor=<next_cursor>) to page with a keyset instead of OFFSET.
+    Answers conditional requests with a 304 while the provider's reviews are
+    unchanged (a new review bumps the profile's rating_count and updated_at)
+    and none of the reviewers, whose names the page shows, has been updated.
+    """
     try:
-        # Pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        # Check if provider exists
-        provider = ProviderProfile.query.filter_by(user_id=provider_id).first()
-        if not provider:
+        # Check if provider exists - the profile also carries the rating totals.
+        # The latest reviewer update comes with it, from the provider's index range of reviews.
+        reviewers_updated = select(func.max(User.updated_at)) \
+            .join(Review, Review.client_id == User.id) \
+            .where(Review.provider_id == provider_id).scalar_subquery()
+        row = db.session.query(ProviderProfile, reviewers_updated) \
+            .filter(ProviderProfile.user_id == provider_id).first()
+        if not row:
             return jsonify({'error': 'Provider not found'}), 404
+        provider, reviewers_updated_at = row
         
-        # Get reviews with pagination
-        reviews = Review.query.filter_by(provider_id=provider_id).order_by(
-            desc(Review.created_at)
-        ).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
-        
-        # Get review details with client information
-        review_list = []
-        for review in reviews.items:
-            review_data = {
-                'id': review.id,
-                'rating': review.rating,
-                'comment': review.comment,
-                'created_at': review.created_at.isoformat() if review.created_at else None,
-                'client': {
-                    'id': review.client.id,
-                    'first_name': review.client.first_name,
-                    'last_name': review.client.last_name
-                } if review.client else None
-            }
-            review_list.append(review_data)
-        
-        # Calculate rating summary
-        rating_summary = db.session.query(
-            func.avg(Review.rating).label('average'),
-            func.count(Review.id).label('total'),
-            func.sum(func.case((Review.rating == 5, 1), else_=0)).label('five_star'),
-            func.sum(func.case((Review.rating == 4, 1), else_=0)).label('four_star'),
-            func.sum(func.case((Review.rating == 3, 1), else_=0)).label('three_star'),
-            func.sum(func.case((Review.rating == 2, 1), else_=0)).label('two_star'),
-            func.sum(func.case((Review.rating == 1, 1), else_=0)).label('one_star')
-        ).filter(Review.provider_id == provider_id).first()
-        
-        return jsonify({
-            'reviews': review_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': reviews.total,
-                'pages': reviews.pages
-            },
-            'rating_summary': {
-                'average': float(rating_summary.average) if rating_summary.average else 0,
-                'total': int(rating_summary.total) if rating_summary.total else 0,
-                'breakdown': {
-                    '5': int(rating_summary.five_star) if rating_summary.five_star else 0,
-                    '4': int(rating_summary.four_star) if rating_summary.four_star else 0,
-                    '3': int(rating_summary.three_star) if rating_summary.three_star else 0,
-                    '2': int(rating_summary.two_star) if rating_summary.two_star else 0,
-                    '1': int(rating_summary.one_star) if rating_summary.one_star else 0
-                }
-            }
-        }), 200
+        etag = make_etag('provider-reviews', provider.id, provider.updated_at, provider.rating_count,
+                         reviewers_updated_at, query_args_key())
+        return conditional_json(etag, lambda: _provider_reviews_page(provider), max_age=30,
+                                last_modified=latest(provider.updated_at, reviewers_updated_at))
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch reviews', 'details': str(e)}), 500
 
+def _provider_reviews_page(provider):
+    """Response body of get_provider_reviews"""
+    provider_id = provider.user_id
+    # Newest first on (created_at, id), served by ix_reviews_provider_created_id;
+    # clients are fetched for the whole page with one IN query
+    query = Review.query.filter_by(provider_id=provider_id).options(selectinload(Review.client))
+    total = provider.rating_count or 0
+    reviews, pagination = paginate(query, [Review.created_at, Review.id], total=total)
+    
+    # Get review details with client information
+    review_list = []
+    for review in reviews:
+        review_data = {
+            'id': review.id,
+            'rating': review.rating,
+            'comment': review.comment,
+            'created_at': review.created_at.isoformat() if review.created_at else None,
+            'client': {
+                'id': review.client.id,
+                'first_name': review.client.first_name,
+                'last_name': review.client.last_name
+            } if review.client else None
+        }
+        review_list.append(review_data)
+    
+    return {
+        'reviews': review_list,
+        'pagination': pagination,
+        # Precomputed on the provider profile (see ProviderProfile.apply_rating)
+        'rating_summary': {
+            'average': provider.average_rating or 0,
+            'total': total,
+            'breakdown': provider.rating_breakdown()
+        }
+    }
+
 @reviews_bp.route('/user/<int:user_id>', methods=['GET'])
 @jwt_required()
 def get_user_reviews(user_id):
@@ -192,22 +175,13 @@ def get_user_reviews(user_id):
         if current_user.role.value != 'admin' and current_user_id != user_id:
             return jsonify({'error': 'Access denied'}), 403
         
-        # Pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
-        # Get reviews with pagination
-        reviews = Review.query.filter_by(client_id=user_id).order_by(
-            desc(Review.created_at)
-        ).paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Get reviews with pagination (newest first)
+        query = Review.query.filter_by(client_id=user_id).options(selectinload(Review.provider))
+        reviews, pagination = paginate(query, [Review.created_at, Review.id])
         
         # Get review details with provider information
         review_list = []
-        for review in reviews.items:
+        for review in reviews:
             review_data = {
                 'id': review.id,
                 'rating': review.rating,
@@ -224,14 +198,11 @@ def get_user_reviews(user_id):
         
         return jsonify({
             'reviews': review_list,
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': reviews.total,
-                'pages': reviews.pages
-            }
+            'pagination': pagination
         }), 200
         
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch user reviews', 'details': str(e)}), 500
 
@@ -270,11 +241,10 @@ def get_review_aggregates():
             User.last_name,
             ProviderProfile.business_name,
             ProviderProfile.average_rating,
-            ProviderProfile.review_count
+            ProviderProfile.rating_count
         ).join(ProviderProfile, User.id == ProviderProfile.user_id)\
-         .filter(ProviderProfile.average_rating.isnot(None))\
-         .filter(ProviderProfile.review_count >= 3)\
-         .order_by(desc(ProviderProfile.average_rating))\
+         .filter(ProviderProfile.rating_count >= 3)\
+         .order_by(desc(ProviderProfile.average_rating), desc(ProviderProfile.rating_count))\
          .limit(10).all()
         
         return jsonify({
@@ -285,7 +255,7 @@ def get_review_aggregates():
                 {
                     'name': f'{first_name} {last_name}',
                     'business_name': business_name,
-                    'average_rating': float(average_rating),
+                    'average_rating': round(float(average_rating), 2),
                     'review_count': review_count
                 }
                 for first_name, last_name, business_name, average_rating, review_count in top_providers
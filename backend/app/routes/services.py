@@ -1,36 +1,48 @@
+import hashlib
 from flask import Blueprint, jsonify, request
 from flask_jwt_extended import jwt_required, get_jwt_identity
 from app import db
 from app.models.service_category import ServiceCategory
 from app.models.user import User
+from app.utils.fuzzy_search import fuzzy_filter
+from app.utils.category_cache import catalogue, category_cache_max_age
+from app.utils.http_cache import conditional_json
+from app.utils.response_cache import cached_response
 
 services_bp = Blueprint('services', __name__)
 
 @services_bp.route('/', methods=['GET'])
+@cached_response(lambda: ['categories'])
 def get_services():
     """Get all service categories with optional filtering"""
     try:
         # Get query parameters for filtering
         search = request.args.get('search', '')
         
-        # Build query
-        query = ServiceCategory.query
+        # The result only depends on the catalogue and the search term
+        snapshot = catalogue()
+        etag = snapshot.etag
+        if search.strip():
+            etag += '-' + hashlib.sha1(search.strip().lower().encode()).hexdigest()[:16]
         
-        # Apply search filter if provided
-        if search:
-            query = query.filter(ServiceCategory.name.ilike(f'%{search}%'))
-        
-        # Execute query
-        services = query.all()
-        
-        # Convert to dict format
-        services_data = [service.to_dict() for service in services]
-        
-        return jsonify({
-            'services': services_data,
-            'total': len(services_data),
-            'message': 'Services retrieved successfully'
-        }), 200
+        def build():
+            services_data = snapshot.items
+            
+            # Apply search filter if provided - typo tolerant, best match first
+            query, relevance = fuzzy_filter(db.session.query(ServiceCategory.id), ServiceCategory, search)
+            if relevance is not None:
+                query = query.order_by(relevance.desc(), ServiceCategory.name)
+                services_data = [snapshot.by_id[service_id] for service_id, in query.all()
+                                 if service_id in snapshot.by_id]
+            
+            return {
+                'services': services_data,
+                'total': len(services_data),
+                'message': 'Services retrieved successfully'
+            }
+        
+        return conditional_json(etag, build, max_age=category_cache_max_age(),
+                                last_modified=snapshot.last_modified)
         
     except Exception as e:
         return jsonify({
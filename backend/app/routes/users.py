@@ -4,6 +4,8 @@ from app import db
 from app.models.user import User, RoleEnum
 from app.utils.auth import admin_required
 from app.utils.cloudinary_service import upload_image, delete_image
+from app.utils.pagination import paginate, InvalidCursor
+from app.utils.fuzzy_search import fuzzy_filter
 from sqlalchemy.exc import IntegrityError
 
 users_bp = Blueprint('users', __name__)
@@ -72,10 +74,6 @@ def login_user():
 @admin_required
 def get_all_users():
     try:
-        # Pagination
-        page = request.args.get('page', 1, type=int)
-        per_page = request.args.get('per_page', 10, type=int)
-        
         # Filtering
         role = request.args.get('role')
         search = request.args.get('search', '')
@@ -85,28 +83,23 @@ def get_all_users():
         if role:
             query = query.filter_by(role=RoleEnum(role))
         
-        if search:
-            query = query.filter(
-                (User.first_name.ilike(f'%{search}%')) |
-                (User.last_name.ilike(f'%{search}%')) |
-                (User.email.ilike(f'%{search}%'))
-            )
-        
-        users = query.paginate(
-            page=page,
-            per_page=per_page,
-            error_out=False
-        )
+        # Typo-tolerant match on names and email, best match first
+        query, relevance = fuzzy_filter(query, User, search)
+        if relevance is not None:
+            relevance = relevance.label('relevance')
+            rows, pagination = paginate(query.add_columns(relevance), [relevance, User.id],
+                                        row_values=lambda row: [row[1], row[0].id])
+            users = [row[0] for row in rows]
+        else:
+            # Newest first, page or cursor mode
+            users, pagination = paginate(query, [User.created_at, User.id])
         
         return jsonify({
-            'users': [u.to_dict() for u in users.items],
-            'pagination': {
-                'page': page,
-                'per_page': per_page,
-                'total': users.total,
-                'pages': users.pages
-            }
+            'users': [u.to_dict() for u in users],
+            'pagination': pagination
         }), 200
+    except InvalidCursor as e:
+        return jsonify({'error': str(e)}), 400
     except Exception as e:
         return jsonify({'error': 'Failed to fetch users', 'details': str(e)}), 500
 
@@ -0,0 +1,152 @@
+"""
+Time-bucketed analytics for the admin dashboard
+Revenue, bookings per status, cancellations and new providers per hour, day,
+week or month over any date range, optionally for one service category.
+Points are read per day (or per hour) from the daily_stats / hourly_stats
+rollups through daily_stats.series() and folded into weeks and months here,
+so a year of daily points costs one range read of daily_stats plus a live
+query over the days not rolled up yet.
+
+Buckets are labelled by their start (UTC): the hour, the day, the Monday of
+the week, the first of the month. The first and last bucket only count the
+part that falls inside the requested range; every bucket of the range is
+returned, with zeros where nothing happened.
+"""
+from datetime import date, datetime, time, timedelta
+from app.models.booking import BookingStatus
+from app.utils import daily_stats
+from app.utils.settings import setting
+
+GRANULARITIES = ('hour', 'day', 'week', 'month')
+
+# Default range per granularity, in days ending today
+DEFAULT_RANGE_DAYS = {'hour': 1, 'day': 30, 'week': 12 * 7, 'month': 365}
+
+METRICS = ('bookings', 'providers')
+
+
+class InvalidRange(ValueError):
+    """Raised for an unknown granularity, a malformed date or a too large range"""
+
+
+def _parse_date(value, name):
+    try:
+        return date.fromisoformat(value)
+    except (TypeError, ValueError):
+        raise InvalidRange(f'{name} must be a date (YYYY-MM-DD)')
+
+
+def bucket_start(value, granularity):
+    """Start of the bucket a date (or, for hours, a datetime) falls in"""
+    if granularity == 'hour':
+        return value.replace(minute=0, second=0, microsecond=0)
+    day = value.date() if isinstance(value, datetime) else value
+    if granularity == 'week':
+        return day - timedelta(days=day.weekday())
+    if granularity == 'month':
+        return day.replace(day=1)
+    return day
+
+
+def _next_bucket(bucket, granularity):
+    if granularity == 'hour':
+        return bucket + timedelta(hours=1)
+    if granularity == 'week':
+        return bucket + timedelta(days=7)
+    if granularity == 'month':
+        return (bucket + timedelta(days=32)).replace(day=1)
+    return bucket + timedelta(days=1)
+
+
+def bucket_starts(start, end, granularity):
+    """Every bucket of the dates start..end (inclusive), in order"""
+    first = datetime.combine(start, time.min) if granularity == 'hour' else bucket_start(start, granularity)
+    stop = datetime.combine(end + timedelta(days=1), time.min) if granularity == 'hour' else end + timedelta(days=1)
+    buckets, bucket = [], first
+    while bucket < stop:
+        buckets.append(bucket)
+        bucket = _next_bucket(bucket, granularity)
+    return buckets
+
+
+def count_buckets(start, end, granularity):
+    """len(bucket_starts(...)) without building the list"""
+    if granularity == 'hour':
+        return ((end - start).days + 1) * 24
+    if granularity == 'week':
+        return (bucket_start(end, 'week') - bucket_start(start, 'week')).days // 7 + 1
+    if granularity == 'month':
+        return (end.year - start.year) * 12 + end.month - start.month + 1
+    return (end - start).days + 1
+
+
+def parse_range(args):
+    """
+    (granularity, start, end, service_category_id) from the query arguments
+    granularity (default day), start and end (dates, inclusive, default the
+    DEFAULT_RANGE_DAYS ending today) and service_category_id. Raises
+    InvalidRange.
+    """
+    granularity = args.get('granularity', 'day')
+    if granularity not in GRANULARITIES:
+        raise InvalidRange(f'granularity must be one of {", ".join(GRANULARITIES)}')
+    end = _parse_date(args['end'], 'end') if args.get('end') else daily_stats.utc_today()
+    if args.get('start'):
+        start = _parse_date(args['start'], 'start')
+    else:
+        start = end - timedelta(days=DEFAULT_RANGE_DAYS[granularity] - 1)
+    if start > end:
+        raise InvalidRange('start must not be after end')
+
+    category_id = args.get('service_category_id')
+    if category_id not in (None, ''):
+        try:
+            category_id = int(category_id)
+        except ValueError:
+            raise InvalidRange('service_category_id must be an integer')
+    else:
+        category_id = None
+
+    points = count_buckets(start, end, granularity)
+    if points > setting('ANALYTICS_MAX_POINTS'):
+        raise InvalidRange(f'Range too large: {points} points, at most {setting("ANALYTICS_MAX_POINTS")} '
+                           f'- use a coarser granularity or a shorter range')
+    return granularity, start, end, category_id
+
+
+def _values(totals):
+    statuses = {status.value: 0 for status in BookingStatus}
+    statuses.update(totals.by_dimension('bookings'))
+    return {
+        'revenue': totals.amount('bookings', BookingStatus.COMPLETED.value),
+        'bookings': sum(statuses.values()),
+        'bookings_by_status': statuses,
+        'cancellations': statuses[BookingStatus.CANCELLED.value],
+        'new_providers': totals.count('providers'),
+    }
+
+
+def _merge(target, totals):
+    for key, (count, amount) in totals.values.items():
+        target.add(*key, count, amount)
+
+
+def timeseries(start, end, granularity='day', category_id=None):
+    """
+    Analytics points for the dates start..end (inclusive), plus their totals
+    Returns {'points': [...], 'totals': {...}}; each point holds bucket,
+    revenue, bookings, bookings_by_status, cancellations and new_providers.
+    """
+    per_unit = daily_stats.series(start, end, hourly=granularity == 'hour', metrics=METRICS,
+                                  category_id=category_id)
+    buckets, overall = {}, daily_stats.StatsTotals()
+    for unit, totals in per_unit.items():
+        _merge(buckets.setdefault(bucket_start(unit, granularity), daily_stats.StatsTotals()), totals)
+        _merge(overall, totals)
+
+    empty = daily_stats.StatsTotals()
+    return {
+        'points': [{'bucket': bucket.isoformat(), **_values(buckets.get(bucket, empty))}
+                   for bucket in bucket_starts(start, end, granularity)],
+        'totals': _values(overall),
+    }
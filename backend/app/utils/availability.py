@@ -0,0 +1,373 @@
+"""
+Provider availability: booking time ranges and overlap checks
+A booking occupies the half-open range [scheduled_date, ends_at) where
+ends_at = scheduled_date + duration_hours is stored on the row (kept in sync
+by the mapper listeners below), so the overlap test
+
+    other.scheduled_date < end AND other.ends_at > start
+
+compares plain columns on every database and is answered from the
+(provider_id, scheduled_date, ends_at) index. Bookings last at most
+BOOKING_MAX_DURATION_HOURS, so only bookings starting after
+start - BOOKING_MAX_DURATION_HOURS can overlap: that bounds the index range
+scan to a day or so of the provider's bookings instead of their history.
+
+reserve_slot(), move_slot() and restore_slot() make the check and the write atomic, so two
+clients racing for the same slot cannot both get it:
+
+- PostgreSQL: the check and the write run under a transaction-scoped
+  advisory lock on the provider (pg_advisory_xact_lock), held until commit.
+- SQLite (and anything else): the check is part of the write itself, an
+  INSERT ... SELECT ... WHERE NOT EXISTS (or UPDATE ... WHERE NOT EXISTS).
+  SQLite runs a write statement under the database write lock, so a second
+  writer sees the first one's committed booking.
+
+free_slots() answers the calendar question for many providers at once: one
+range query loads the busy intervals of all of them, a sweep merges them per
+provider and the gaps inside the working hours are the free slots.
+"""
+from datetime import datetime, time, timedelta, timezone
+from sqlalchemy import event, exists, func, insert, literal, select, update
+from sqlalchemy.orm import aliased, make_transient_to_detached
+from sqlalchemy.orm.attributes import set_committed_value
+from app import db
+from app.models.booking import Booking, BookingStatus
+from app.utils.settings import setting
+
+# First key of the per-provider advisory locks on PostgreSQL (the second is the provider id)
+ADVISORY_LOCK_NAMESPACE = 4242
+
+# Statuses that hold a provider's time: a pending request reserves its slot
+# until the provider confirms or someone cancels it
+SLOT_HOLDING_STATUSES = (BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS)
+
+
+def parse_duration(value):
+    """Booking duration in whole hours, 1..BOOKING_MAX_DURATION_HOURS; raises ValueError"""
+    maximum = setting('BOOKING_MAX_DURATION_HOURS')
+    if isinstance(value, bool) or not isinstance(value, int) or not 1 <= value <= maximum:
+        raise ValueError(f'duration_hours must be a whole number of hours between 1 and {maximum}')
+    return value
+
+
+def booking_end(start, duration_hours):
+    return start + timedelta(hours=duration_hours)
+
+
+def _overlaps(start, end, model=Booking):
+    """Filter conditions for bookings overlapping [start, end)"""
+    earliest = start - timedelta(hours=setting('BOOKING_MAX_DURATION_HOURS'))
+    return (model.scheduled_date > earliest, model.scheduled_date < end, model.ends_at > start)
+
+
+def overlapping_bookings(provider_id, start, end, exclude_id=None, statuses=SLOT_HOLDING_STATUSES):
+    """Query for the provider's bookings in statuses overlapping [start, end)"""
+    query = Booking.query.filter(Booking.provider_id == provider_id, *_overlaps(start, end),
+                                 Booking.status.in_(statuses))
+    if exclude_id is not None:
+        query = query.filter(Booking.id != exclude_id)
+    return query
+
+
+def find_conflict(provider_id, start, duration_hours, exclude_id=None):
+    """First booking holding the provider's time within the slot, or None"""
+    end = booking_end(start, duration_hours)
+    return overlapping_bookings(provider_id, start, end, exclude_id) \
+        .order_by(Booking.scheduled_date).first()
+
+
+def conflict_response(booking):
+    """Error body for a slot clash; only the clashing time range, not the other client's booking"""
+    return {
+        'error': 'Provider is already booked for part of this time',
+        'conflict': {
+            'scheduled_date': booking.scheduled_date.isoformat(),
+            'ends_at': booking.ends_at.isoformat()
+        }
+    }
+
+
+# ----- race-free reservations -----
+
+def _uses_advisory_locks():
+    return db.session.get_bind().dialect.name == 'postgresql'
+
+
+def lock_provider(provider_id):
+    """Serialize slot changes of one provider until the transaction ends (PostgreSQL only)"""
+    if _uses_advisory_locks():
+        db.session.execute(select(func.pg_advisory_xact_lock(ADVISORY_LOCK_NAMESPACE, provider_id)))
+
+
+def _slot_taken(provider_id, start, end, exclude_id=None):
+    """EXISTS condition: a booking holding the provider's time overlaps [start, end)"""
+    # Aliased so the subquery is not correlated with the bookings row being written
+    other = aliased(Booking)
+    taken = exists().where(other.provider_id == provider_id, *_overlaps(start, end, other),
+                           other.status.in_(SLOT_HOLDING_STATUSES))
+    if exclude_id is not None:
+        taken = taken.where(other.id != exclude_id)
+    return taken
+
+
+def _insert_values(booking):
+    """Column values of a new booking, Python-side defaults applied as a flush would"""
+    booking.ends_at = booking_end(booking.scheduled_date, booking.duration_hours)
+    values = {}
+    for column in Booking.__table__.columns:
+        if column.primary_key:
+            continue
+        value = getattr(booking, column.key)
+        if value is None and column.default is not None:
+            value = column.default.arg(None) if column.default.is_callable else column.default.arg
+            setattr(booking, column.key, value)
+        values[column.key] = value
+    return values
+
+
+def reserve_slot(booking, attempts=3):
+    """
+    Insert a new booking unless its slot overlaps one holding the provider's time
+    Returns None once the booking is written (it is then persistent in the
+    session; commit to keep it), else the conflicting booking.
+    """
+    end = booking_end(booking.scheduled_date, booking.duration_hours)
+    if _uses_advisory_locks():
+        lock_provider(booking.provider_id)
+        conflict = find_conflict(booking.provider_id, booking.scheduled_date, booking.duration_hours)
+        if conflict is None:
+            db.session.add(booking)
+            db.session.flush()
+        return conflict
+
+    for _ in range(attempts):
+        values = _insert_values(booking)
+        table = Booking.__table__
+        candidate = select(*[literal(value, table.c[key].type) for key, value in values.items()]) \
+            .where(~_slot_taken(booking.provider_id, booking.scheduled_date, end))
+        # ORM-enabled statement, so session listeners (table_versions) see the write
+        result = db.session.execute(insert(Booking).from_select(list(values), candidate))
+        if result.rowcount:
+            booking.id = result.lastrowid
+            make_transient_to_detached(booking)
+            db.session.add(booking)
+            return None
+        conflict = find_conflict(booking.provider_id, booking.scheduled_date, booking.duration_hours)
+        # None: the booking in the way was cancelled in the meantime, try again
+        if conflict is not None:
+            return conflict
+    raise RuntimeError('Could not reserve the slot, please retry')
+
+
+def move_slot(booking, start, duration_hours):
+    """
+    Give an existing booking a new start and duration unless the new slot
+    overlaps another booking holding the provider's time
+    Returns None once written (commit to keep it), else the conflicting booking.
+    """
+    end = booking_end(start, duration_hours)
+    if _uses_advisory_locks():
+        lock_provider(booking.provider_id)
+        conflict = find_conflict(booking.provider_id, start, duration_hours, exclude_id=booking.id)
+        if conflict is None:
+            booking.scheduled_date, booking.duration_hours = start, duration_hours
+        return conflict
+
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking.id, ~_slot_taken(booking.provider_id, start, end, exclude_id=booking.id))
+        .values(scheduled_date=start, duration_hours=duration_hours, ends_at=end)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        return find_conflict(booking.provider_id, start, duration_hours, exclude_id=booking.id)
+    # Already written: record the new values as the loaded state
+    for key, value in (('scheduled_date', start), ('duration_hours', duration_hours), ('ends_at', end)):
+        set_committed_value(booking, key, value)
+    return None
+
+
+def restore_slot(booking, status):
+    """
+    Put a booking that gave up its slot (cancelled, completed) back into a
+    slot-holding status unless another booking has taken the time since
+    Returns None once written (commit to keep it), else the conflicting booking.
+    """
+    if _uses_advisory_locks():
+        lock_provider(booking.provider_id)
+        conflict = find_conflict(booking.provider_id, booking.scheduled_date, booking.duration_hours,
+                                 exclude_id=booking.id)
+        if conflict is None:
+            booking.status = status
+        return conflict
+
+    result = db.session.execute(
+        update(Booking)
+        .where(Booking.id == booking.id,
+               ~_slot_taken(booking.provider_id, booking.scheduled_date, booking.ends_at, exclude_id=booking.id))
+        .values(status=status)
+        .execution_options(synchronize_session=False)
+    )
+    if not result.rowcount:
+        return find_conflict(booking.provider_id, booking.scheduled_date, booking.duration_hours,
+                             exclude_id=booking.id)
+    # Also set it on the instance, so the flush listeners (statistics, caches) see the change
+    booking.status = status
+    return None
+
+
+# ----- free-slot calendar -----
+
+def merge_intervals(intervals):
+    """Merge (start, end) intervals sorted by start into disjoint ones (sweep line)"""
+    merged = []
+    for start, end in intervals:
+        if merged and start <= merged[-1][1]:
+            if end > merged[-1][1]:
+                merged[-1][1] = end
+        else:
+            merged.append([start, end])
+    return [(start, end) for start, end in merged]
+
+
+def subtract_intervals(windows, busy, min_length=timedelta(0)):
+    """
+    Parts of the sorted, disjoint windows not covered by the sorted, disjoint
+    busy intervals, dropping parts shorter than min_length. Both lists are
+    walked once.
+    """
+    free, i = [], 0
+    for window_start, window_end in windows:
+        cursor = window_start
+        # Busy intervals ending before this window cannot touch later windows either
+        while i < len(busy) and busy[i][1] <= window_start:
+            i += 1
+        j = i
+        while j < len(busy) and busy[j][0] < window_end:
+            if busy[j][0] > cursor and busy[j][0] - cursor >= min_length:
+                free.append((cursor, busy[j][0]))
+            cursor = max(cursor, busy[j][1])
+            j += 1
+        if window_end > cursor and window_end - cursor >= min_length:
+            free.append((cursor, window_end))
+    return free
+
+
+def working_windows(start, end, from_hour, to_hour):
+    """Daily [from_hour, to_hour) windows between the datetimes start and end, clipped to them"""
+    windows = []
+    day = start.date()
+    while day <= end.date():
+        opens = datetime.combine(day, time.min) + timedelta(hours=from_hour)
+        closes = datetime.combine(day, time.min) + timedelta(hours=to_hour)
+        opens, closes = max(opens, start), min(closes, end)
+        if opens < closes:
+            windows.append((opens, closes))
+        day += timedelta(days=1)
+    return windows
+
+
+def busy_intervals(provider_ids, start, end, statuses=SLOT_HOLDING_STATUSES):
+    """{provider_id: merged busy intervals} within [start, end), from one range query"""
+    rows = db.session.execute(
+        select(Booking.provider_id, Booking.scheduled_date, Booking.ends_at)
+        .where(Booking.provider_id.in_(provider_ids), *_overlaps(start, end), Booking.status.in_(statuses))
+        .order_by(Booking.provider_id, Booking.scheduled_date)
+    ).all()
+    intervals = {}
+    for provider_id, booking_start, booking_end in rows:
+        intervals.setdefault(provider_id, []).append((booking_start, booking_end))
+    return {provider_id: merge_intervals(items) for provider_id, items in intervals.items()}
+
+
+def _parse_moment(value, name, end_of_day=False):
+    """Naive UTC datetime from an ISO date or datetime; a date as end means the end of that day"""
+    try:
+        if len(value) == 10:
+            day = datetime.fromisoformat(value)
+            return day + timedelta(days=1) if end_of_day else day
+        moment = datetime.fromisoformat(value.replace('Z', '+00:00'))
+    except (TypeError, ValueError):
+        raise ValueError(f'{name} must be an ISO date or datetime')
+    if moment.tzinfo is not None:
+        moment = moment.astimezone(timezone.utc).replace(tzinfo=None)
+    return moment
+
+
+def _parse_int(args, name, default, low, high, message):
+    """Integer query argument within low..high; a malformed value is an error, not the default"""
+    raw = args.get(name)
+    if raw is None or not raw.strip():
+        return default
+    try:
+        value = int(raw)
+    except ValueError:
+        raise ValueError(message)
+    if not low <= value <= high:
+        raise ValueError(message)
+    return value
+
+
+def _parse_hour(args, name, default):
+    return _parse_int(args, name, default, 0, 24, f'{name} must be an hour between 0 and 24')
+
+
+def parse_calendar_request(args):
+    """
+    Validated calendar parameters from query arguments: provider_ids (comma
+    separated user ids), start and end (ISO dates or datetimes, default now
+    and 7 days later, never before the next full hour), from_hour / to_hour
+    (working hours, UTC) and min_hours. Raises ValueError.
+    """
+    try:
+        provider_ids = list(dict.fromkeys(int(item) for item in args.get('provider_ids', '').split(',') if item.strip()))
+    except ValueError:
+        raise ValueError('provider_ids must be a comma separated list of provider user ids')
+    if not provider_ids:
+        raise ValueError('provider_ids is required')
+    if len(provider_ids) > setting('CALENDAR_MAX_PROVIDERS'):
+        raise ValueError(f'At most {setting("CALENDAR_MAX_PROVIDERS")} providers per request')
+
+    # Time already past is never free
+    now = datetime.utcnow()
+    next_hour = now.replace(minute=0, second=0, microsecond=0) + timedelta(hours=1)
+    start = _parse_moment(args['start'], 'start') if args.get('start') else next_hour
+    start = max(start, next_hour)
+    end = _parse_moment(args['end'], 'end', end_of_day=True) if args.get('end') else start + timedelta(days=7)
+    if end <= start:
+        raise ValueError('end must be after start (and after the current hour)')
+    if end - start > timedelta(days=setting('CALENDAR_MAX_DAYS')):
+        raise ValueError(f'The range may span at most {setting("CALENDAR_MAX_DAYS")} days')
+
+    from_hour = _parse_hour(args, 'from_hour', setting('BOOKING_DAY_START_HOUR'))
+    to_hour = _parse_hour(args, 'to_hour', setting('BOOKING_DAY_END_HOUR'))
+    if from_hour >= to_hour:
+        raise ValueError('from_hour must be before to_hour')
+    max_hours = setting('BOOKING_MAX_DURATION_HOURS')
+    min_hours = _parse_int(args, 'min_hours', 1, 1, max_hours, f'min_hours must be between 1 and {max_hours}')
+    return {'provider_ids': provider_ids, 'start': start, 'end': end,
+            'from_hour': from_hour, 'to_hour': to_hour, 'min_hours': min_hours}
+
+
+def free_slots(provider_ids, start, end, from_hour=None, to_hour=None, min_hours=1):
+    """
+    {provider_id: [(start, end), ...]} free time of each provider between the
+    datetimes start and end, within the daily working hours (UTC) and at least
+    min_hours long
+    """
+    from_hour = setting('BOOKING_DAY_START_HOUR') if from_hour is None else from_hour
+    to_hour = setting('BOOKING_DAY_END_HOUR') if to_hour is None else to_hour
+    windows = working_windows(start, end, from_hour, to_hour)
+    busy = busy_intervals(provider_ids, start, end) if windows else {}
+    min_length = timedelta(hours=min_hours)
+    return {provider_id: subtract_intervals(windows, busy.get(provider_id, []), min_length)
+            for provider_id in provider_ids}
+
+
+# ----- keeping ends_at in sync -----
+
+@event.listens_for(Booking, 'before_insert')
+@event.listens_for(Booking, 'before_update')
+def _set_ends_at(mapper, connection, target):
+    if target.scheduled_date is not None and target.duration_hours is not None:
+        target.ends_at = booking_end(target.scheduled_date, target.duration_hours)
@@ -0,0 +1,50 @@
+"""
+Shared query builder and serializer for booking listings
+Listing endpoints declare which related objects they serialize, and the builder
+eager-loads exactly those relations. A page of bookings then costs a fixed
+number of queries instead of one extra query per booking and relation.
+Service categories are not loaded at all: they come from the in-process
+catalogue (app/utils/category_cache.py).
+"""
+from sqlalchemy.orm import joinedload, selectinload
+from app.models.booking import Booking
+from app.utils.category_cache import get_category
+
+# Response key -> (Booking relationship name, loader strategy)
+# Many-to-one relations are joined into the page query; the payment
+# (one-to-one from the booking side) is fetched with a single IN query.
+# Names rather than attributes because some are backrefs created at mapper setup.
+BOOKING_RELATIONS = {
+    'client': ('client', joinedload),
+    'provider_user': ('provider', joinedload),
+    'provider_profile': ('provider_profile', joinedload),
+    'service_category': ('service_category', None),   # category cache, see serialize_booking
+    'payment': ('payment', selectinload),
+}
+
+# Relations serialized by each view
+BOOKING_DETAIL_RELATIONS = ('client', 'provider_user', 'provider_profile', 'service_category', 'payment')
+ADMIN_BOOKING_RELATIONS = ('client', 'provider_user', 'service_category')
+
+
+def booking_query(relations, query=None):
+    """Return a Booking query that eager-loads the given response relations"""
+    query = query if query is not None else Booking.query
+    options = []
+    for key in relations:
+        attribute, loader = BOOKING_RELATIONS[key]
+        if loader is not None:
+            options.append(loader(getattr(Booking, attribute)))
+    return query.options(*options)
+
+
+def serialize_booking(booking, relations):
+    """booking.to_dict() plus the requested related objects"""
+    booking_data = booking.to_dict()
+    for key in relations:
+        if key == 'service_category':
+            booking_data[key] = get_category(booking.service_category_id)
+            continue
+        related = getattr(booking, BOOKING_RELATIONS[key][0])
+        booking_data[key] = related.to_dict() if related else None
+    return booking_data
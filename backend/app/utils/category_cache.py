@@ -0,0 +1,124 @@
+"""
+Process-local cache of the service category catalogue
+Categories are a handful of rows that change a few times a year but are read
+by every category listing and by every provider and booking serialization.
+Each worker keeps one snapshot of the whole table:
+
+- writes in this worker (any flush touching service_categories) drop the
+  snapshot at once, see app/utils/table_versions.py
+- writes in other workers are noticed through the 'service_categories' row
+  of cache_versions: every category write increments it in the same
+  transaction, and a worker re-reads it at most every
+  CATEGORY_CACHE_CHECK_INTERVAL seconds before trusting its snapshot
+
+The snapshot carries an ETag derived from its contents and the time of the
+last category write, so the category listings can answer conditional
+requests with a 304.
+"""
+import hashlib
+import json
+import threading
+import time
+from sqlalchemy import event, insert, select, update
+from sqlalchemy.orm import Session
+from app import db
+from app.models.cache_version import CacheVersion
+from app.models.service_category import ServiceCategory
+from app.utils import table_versions
+from app.utils.settings import setting
+
+CATALOGUE = 'service_categories'
+
+class CategoryCatalogue:
+    """Immutable snapshot of all service categories"""
+
+    def __init__(self, version, last_modified, local_version, categories):
+        self.version = version                  # shared counter when the snapshot was read
+        self.last_modified = last_modified      # when the counter was last incremented
+        self.local_version = local_version      # this process's write version of the table
+        self.items = [category.to_dict() for category in categories]
+        self.by_id = {item['id']: item for item in self.items}
+        digest = hashlib.sha1(json.dumps(self.items, sort_keys=True).encode()).hexdigest()
+        self.etag = f'categories-{digest[:16]}'
+        self.next_check = time.monotonic() + setting('CATEGORY_CACHE_CHECK_INTERVAL')
+
+
+_catalogues = {}
+_lock = threading.Lock()
+
+
+# ----- shared version counter -----
+
+def shared_version(session=None):
+    return _shared_state(session)[0]
+
+
+def _shared_state(session=None):
+    """(version, updated_at) of the catalogue's counter"""
+    session = session or db.session
+    row = session.execute(
+        select(CacheVersion.version, CacheVersion.updated_at).where(CacheVersion.name == CATALOGUE)
+    ).first()
+    return (row.version, row.updated_at) if row else (0, None)
+
+
+def bump_shared_version(session):
+    """Increment the catalogue version within the session's transaction"""
+    table = CacheVersion.__table__
+    result = session.execute(
+        update(table).where(table.c.name == CATALOGUE)
+        .values(version=table.c.version + 1, updated_at=db.func.now())
+    )
+    if result.rowcount == 0:
+        session.execute(insert(table).values(name=CATALOGUE, version=1, updated_at=db.func.now()))
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_category_writes(session, flush_context):
+    changed = list(session.new) + list(session.dirty) + list(session.deleted)
+    if any(isinstance(obj, ServiceCategory) for obj in changed):
+        bump_shared_version(session)
+
+
+@event.listens_for(CacheVersion.__table__, 'after_create')
+def _seed_versions(target, connection, **kw):
+    connection.execute(insert(target).values(name=CATALOGUE, version=0))
+
+
+# ----- reading -----
+
+def catalogue():
+    """Return the current CategoryCatalogue, reloading it when it is stale"""
+    key = id(db.engine)
+    local_version = table_versions.version(ServiceCategory.__table__.name)
+    with _lock:
+        snapshot = _catalogues.get(key)
+    if snapshot and snapshot.local_version == local_version:
+        if time.monotonic() < snapshot.next_check:
+            return snapshot
+        if shared_version() == snapshot.version:
+            snapshot.next_check = time.monotonic() + setting('CATEGORY_CACHE_CHECK_INTERVAL')
+            return snapshot
+
+    # Read the counter first: a write racing with the load makes the
+    # snapshot look older than it is, never newer
+    version, last_modified = _shared_state()
+    snapshot = CategoryCatalogue(version, last_modified, local_version,
+                                 ServiceCategory.query.order_by(ServiceCategory.id).all())
+    with _lock:
+        _catalogues[key] = snapshot
+    return snapshot
+
+
+def category_cache_max_age():
+    return setting('CATEGORY_CACHE_MAX_AGE')
+
+
+def get_category(category_id):
+    """Serialized category by id, or None"""
+    return catalogue().by_id.get(category_id)
+
+
+def clear_category_cache():
+    with _lock:
+        _catalogues.clear()
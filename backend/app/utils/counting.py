@@ -0,0 +1,111 @@
+"""
+Count strategies for paginated listings
+The COUNT(*) behind 'total' and 'pages' often costs more than the page itself
+on large tables. Listings pick one of:
+
+- exact:    COUNT(*) on every request (the default)
+- cached:   exact count kept in-process for PAGINATION_COUNT_CACHE_TTL seconds,
+            keyed by the normalized SQL of the filtered query and the write
+            versions of the tables it reads (app/utils/table_versions.py), so
+            a write in this process invalidates it at once. Other workers'
+            writes show up after the TTL at the latest.
+- estimate: PostgreSQL planner estimate - pg_class.reltuples for an unfiltered
+            table, EXPLAIN row estimate otherwise. Falls back to exact on other
+            databases.
+- none:     skip the count, total is null
+
+The strategy comes from the ?count= query parameter, else the endpoint's entry
+in PAGINATION_COUNT_STRATEGIES, else PAGINATION_COUNT_STRATEGY.
+"""
+import hashlib
+import json
+from flask import request
+from sqlalchemy import text
+from sqlalchemy.sql.util import find_tables
+from app import db
+from app.utils import table_versions
+from app.utils.lru import LRUCache, MISSING
+from app.utils.settings import setting
+
+STRATEGIES = ('exact', 'cached', 'estimate', 'none')
+
+_count_cache = LRUCache(setting('PAGINATION_COUNT_CACHE_SIZE'))
+
+
+def resolve_strategy(default=None):
+    """Pick the count strategy for the current request"""
+    requested = request.args.get('count')
+    if requested in STRATEGIES:
+        return requested
+    configured = setting('PAGINATION_COUNT_STRATEGIES').get(request.endpoint)
+    return configured or default or setting('PAGINATION_COUNT_STRATEGY')
+
+
+# ----- strategies -----
+
+def _count_statement(query):
+    return query.order_by(None).statement
+
+
+def exact_count(query):
+    return query.order_by(None).count()
+
+
+def cached_count(query):
+    statement = _count_statement(query)
+    compiled = statement.compile(dialect=db.session.get_bind().dialect)
+    tables = sorted({table.name for table in find_tables(statement, include_joins=True)})
+    fingerprint = json.dumps([str(compiled), {k: repr(v) for k, v in compiled.params.items()}], sort_keys=True)
+    key = (hashlib.sha1(fingerprint.encode()).hexdigest(), table_versions.versions(tables))
+
+    _count_cache.max_size = setting('PAGINATION_COUNT_CACHE_SIZE')
+    total = _count_cache.get(key)
+    if total is MISSING:
+        total = exact_count(query)
+        _count_cache.set(key, total, setting('PAGINATION_COUNT_CACHE_TTL'))
+    return total
+
+
+def estimated_count(query):
+    """Planner estimate on PostgreSQL; None when no estimate is available"""
+    session = db.session
+    if session.get_bind().dialect.name != 'postgresql':
+        return None
+
+    statement = _count_statement(query)
+    froms = statement.get_final_froms()
+    # Unfiltered single-table listing: the table statistics are enough
+    if statement.whereclause is None and len(froms) == 1 and hasattr(froms[0], 'name'):
+        reltuples = session.execute(
+            text('SELECT reltuples FROM pg_class WHERE oid = CAST(:name AS regclass)'),
+            {'name': froms[0].name}
+        ).scalar()
+        if reltuples is not None and reltuples >= 0:
+            return int(reltuples)
+
+    compiled = statement.compile(dialect=session.get_bind().dialect)
+    plan = session.connection().exec_driver_sql(f'EXPLAIN (FORMAT JSON) {compiled}', compiled.params).scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+def count_total(query, strategy):
+    """
+    Return (total, strategy actually used) for a listing query
+    Unknown strategies fall back to exact; 'estimate' does too when the
+    database cannot provide one.
+    """
+    if strategy == 'none':
+        return None, 'none'
+    if strategy == 'cached':
+        return cached_count(query), 'cached'
+    if strategy == 'estimate':
+        total = estimated_count(query)
+        if total is not None:
+            return total, 'estimate'
+    return exact_count(query), 'exact'
+
+
+def clear_count_cache():
+    _count_cache.clear()
@@ -0,0 +1,409 @@
+"""
+Daily statistics rollup for the admin dashboard
+The admin statistics endpoints used to COUNT and SUM the whole users,
+bookings and reviews tables on every refresh. They now read daily_stats,
+one row per (UTC day, metric, dimension, service category) with the number
+of rows created that day and the sum of their amounts:
+
+    users      dimension = role
+    providers  per service category
+    bookings   dimension = current status, per service category, amount = total_amount
+    reviews
+
+A statistics query over a range of days is answered from three parts, so its
+cost grows with the number of days, not the number of rows:
+
+- days already rolled up: one SUM over daily_stats
+- days after the last roll-up (normally just today): a live query over the
+  source tables restricted to those days, served by their created_at indexes
+- rolled-up days whose rows changed since (a booking completed, a user
+  deleted, ...): marked dirty by a session listener and counted live until
+  the next roll-up
+
+The roll-up job (flask rollup-daily-stats, run e.g. nightly) rolls every
+complete day since the last run and re-rolls the dirty days. It aggregates
+the source tables per UTC hour into hourly_stats and sums those hours into
+daily_stats, so both granularities come from one scan. series() returns
+the same three-part answer per day or per hour for the analytics endpoints
+(app/utils/analytics.py).
+"""
+from datetime import date, datetime, time, timedelta
+from decimal import Decimal
+from sqlalchemy import and_, delete, event, func, inspect, insert, literal, not_, or_, select
+from sqlalchemy.orm import Session
+from app import db
+from app.models.booking import Booking
+from app.models.daily_stats import DailyStat, DailyStatsDirtyDay, HourlyStat
+from app.models.provider_profile import ProviderProfile
+from app.models.reviews import Review
+from app.models.user import User
+
+ROLLED = '_rolled'  # marker metric: the day has been rolled up
+
+
+def _sources():
+    """metric -> (created_at column, dimension column, category column, amount column)"""
+    return {
+        'users': (User.created_at, User.role, None, None),
+        'providers': (ProviderProfile.created_at, None, ProviderProfile.service_category_id, None),
+        'bookings': (Booking.created_at, Booking.status, Booking.service_category_id, Booking.total_amount),
+        'reviews': (Review.created_at, None, None, None),
+    }
+
+
+TRACKED_MODELS = (User, ProviderProfile, Booking, Review)
+
+
+def utc_today():
+    return datetime.utcnow().date()
+
+
+def _as_date(value):
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return date.fromisoformat(str(value)[:10])
+
+
+def _as_hour(value):
+    if isinstance(value, datetime):
+        return value.replace(minute=0, second=0, microsecond=0)
+    return datetime.fromisoformat(str(value)[:13] + ':00:00')
+
+
+def _day_start(day):
+    return datetime.combine(day, time.min)
+
+
+def _day_window(day):
+    return _day_start(day), _day_start(day + timedelta(days=1))
+
+
+def _hour_bucket(column, dialect):
+    """SQL expression truncating a datetime column to its hour"""
+    if dialect == 'postgresql':
+        return func.date_trunc('hour', column)
+    if dialect == 'mysql':
+        return func.date_format(column, '%Y-%m-%d %H:00:00')
+    return func.strftime('%Y-%m-%d %H:00:00', column)
+
+
+def _dimension_value(value):
+    if value is None:
+        return ''
+    return getattr(value, 'value', value)
+
+
+# ----- totals -----
+
+class StatsTotals:
+    """Summed counts and amounts keyed by (metric, dimension, service_category_id)"""
+
+    def __init__(self):
+        self.values = {}
+
+    def add(self, metric, dimension, category_id, count, amount):
+        key = (metric, _dimension_value(dimension), category_id or 0)
+        current = self.values.get(key, (0, Decimal(0)))
+        self.values[key] = (current[0] + int(count or 0), current[1] + Decimal(str(amount or 0)))
+
+    def _matching(self, metric, dimension=None, category_id=None):
+        for (m, d, c), value in self.values.items():
+            if m == metric and (dimension is None or d == dimension) and (category_id is None or c == category_id):
+                yield (d, c), value
+
+    def count(self, metric, dimension=None, category_id=None):
+        return sum(value[0] for _, value in self._matching(metric, dimension, category_id))
+
+    def amount(self, metric, dimension=None, category_id=None):
+        return float(sum((value[1] for _, value in self._matching(metric, dimension, category_id)), Decimal(0)))
+
+    def by_dimension(self, metric):
+        """{dimension: count}"""
+        result = {}
+        for (dimension, _), value in self._matching(metric):
+            result[dimension] = result.get(dimension, 0) + value[0]
+        return result
+
+    def by_category(self, metric):
+        """{service_category_id: count}"""
+        result = {}
+        for (_, category_id), value in self._matching(metric):
+            result[category_id] = result.get(category_id, 0) + value[0]
+        return result
+
+
+# ----- live aggregation over the source tables -----
+
+def source_rows(windows, session=None, hourly=False, metrics=None, category_id=None):
+    """
+    Aggregate the source tables over datetime windows [(start, end), ...]
+    (start None for no lower bound). Returns
+    (bucket, metric, dimension, service_category_id, count, amount) rows, the
+    bucket being the day, or the start of the hour with hourly=True.
+    metrics and category_id restrict the metrics aggregated; metrics without
+    a service category are skipped when category_id is given.
+    """
+    session = session or db.session
+    rows = []
+    if not windows:
+        return rows
+    dialect = session.get_bind().dialect.name
+    for metric, (created, dimension, category, amount) in _sources().items():
+        if metrics is not None and metric not in metrics:
+            continue
+        if category_id is not None and category is None:
+            continue
+        condition = or_(*[and_(created >= start, created < end) if start is not None else created < end
+                          for start, end in windows])
+        if category_id is not None:
+            condition = and_(condition, category == category_id)
+        bucket = _hour_bucket(created, dialect) if hourly else func.date(created)
+        group_by = [bucket] + [column for column in (dimension, category) if column is not None]
+        statement = select(
+            bucket,
+            dimension if dimension is not None else literal(None),
+            category if category is not None else literal(0),
+            func.count(),
+            func.coalesce(func.sum(amount), 0) if amount is not None else literal(0)
+        ).where(condition).group_by(*group_by)
+        for row_bucket, row_dimension, row_category, count, row_amount in session.execute(statement):
+            rows.append((_as_hour(row_bucket) if hourly else _as_date(row_bucket), metric,
+                         _dimension_value(row_dimension), row_category or 0, count, row_amount or 0))
+    return rows
+
+
+# ----- reading -----
+
+def rolled_through(session=None):
+    """Last rolled-up day, or None"""
+    session = session or db.session
+    return session.execute(select(func.max(DailyStat.day)).where(DailyStat.metric == ROLLED)).scalar()
+
+
+def _split(start, end, session):
+    """
+    Split the days start..end (inclusive, start None for no lower bound) into
+    rolled-up and live parts. Returns (rollup_end, dirty, windows): the days up
+    to rollup_end (None when none are rolled up) are read from the rollup
+    except the dirty ones, and the datetime windows are aggregated live.
+    """
+    last_rolled = rolled_through(session)
+    rollup_end, dirty, windows = None, [], []
+    if last_rolled is not None:
+        last_rolled = _as_date(last_rolled)
+        rollup_end = min(end, last_rolled)
+        dirty_query = select(DailyStatsDirtyDay.day).where(DailyStatsDirtyDay.day <= rollup_end)
+        if start is not None:
+            dirty_query = dirty_query.where(DailyStatsDirtyDay.day >= start)
+        dirty = sorted(_as_date(day) for day in session.execute(dirty_query).scalars())
+        if start is not None and start > rollup_end:
+            rollup_end = None
+
+        windows.extend(_day_window(day) for day in dirty)
+        live_start = last_rolled + timedelta(days=1)
+        if start is not None:
+            live_start = max(start, live_start)
+    else:
+        live_start = start
+
+    if live_start is None:
+        windows.append((None, _day_start(end + timedelta(days=1))))
+    elif live_start <= end:
+        windows.append((_day_start(live_start), _day_start(end + timedelta(days=1))))
+    return rollup_end, dirty, windows
+
+
+def collect(start=None, end=None, session=None):
+    """
+    StatsTotals for the rows created between start and end (dates, inclusive;
+    None for an open end)
+    """
+    session = session or db.session
+    today = utc_today()
+    end = min(end, today) if end is not None else today
+    totals = StatsTotals()
+    if start is not None and start > end:
+        return totals
+
+    rollup_end, dirty, windows = _split(start, end, session)
+    if rollup_end is not None:
+        statement = select(
+            DailyStat.metric, DailyStat.dimension, DailyStat.service_category_id,
+            func.sum(DailyStat.count), func.sum(DailyStat.amount)
+        ).where(DailyStat.metric != ROLLED, DailyStat.day <= rollup_end)
+        if start is not None:
+            statement = statement.where(DailyStat.day >= start)
+        if dirty:
+            statement = statement.where(DailyStat.day.notin_(dirty))
+        statement = statement.group_by(DailyStat.metric, DailyStat.dimension, DailyStat.service_category_id)
+        for row in session.execute(statement):
+            totals.add(*row)
+
+    for _, metric, dimension, category_id, count, amount in source_rows(windows, session):
+        totals.add(metric, dimension, category_id, count, amount)
+    return totals
+
+
+def series(start, end, hourly=False, metrics=None, category_id=None, session=None):
+    """
+    {bucket: StatsTotals} for the rows created between the dates start and end
+    (inclusive), per day or, with hourly=True, per hour (the datetime the hour
+    starts). Buckets without activity are left out. metrics and category_id
+    restrict the result as in source_rows.
+    """
+    session = session or db.session
+    end = min(end, utc_today())
+    buckets = {}
+    if start > end:
+        return buckets
+
+    def add(bucket, metric, dimension, row_category_id, count, amount):
+        buckets.setdefault(bucket, StatsTotals()).add(metric, dimension, row_category_id, count, amount)
+
+    rollup_end, dirty, windows = _split(start, end, session)
+    if rollup_end is not None:
+        model = HourlyStat if hourly else DailyStat
+        bucket = model.hour if hourly else model.day
+        statement = select(
+            bucket, model.metric, model.dimension, model.service_category_id, model.count, model.amount
+        ).where(model.metric != ROLLED)
+        if hourly:
+            statement = statement.where(bucket >= _day_start(start), bucket < _day_start(rollup_end + timedelta(days=1)))
+            if dirty:
+                statement = statement.where(not_(or_(*[and_(bucket >= day_start, bucket < day_end)
+                                                       for day_start, day_end in map(_day_window, dirty)])))
+        else:
+            statement = statement.where(bucket >= start, bucket <= rollup_end)
+            if dirty:
+                statement = statement.where(bucket.notin_(dirty))
+        if metrics is not None:
+            statement = statement.where(model.metric.in_(list(metrics)))
+        if category_id is not None:
+            statement = statement.where(model.service_category_id == category_id)
+        for row_bucket, *row in session.execute(statement):
+            add(_as_hour(row_bucket) if hourly else _as_date(row_bucket), *row)
+
+    for row in source_rows(windows, session, hourly=hourly, metrics=metrics, category_id=category_id):
+        add(*row)
+    return buckets
+
+
+# ----- rolling up -----
+
+def _earliest_source_day(session):
+    days = [session.execute(select(func.min(created))).scalar() for created, _, _, _ in _sources().values()]
+    days = [_as_date(day) for day in days if day is not None]
+    return min(days) if days else None
+
+
+def _replace_days(session, days, windows):
+    """Rewrite the hourly and daily rollup rows of days from the source rows in windows"""
+    now = datetime.utcnow()
+    session.execute(delete(DailyStat).where(DailyStat.day.in_(days)))
+    session.execute(delete(HourlyStat).where(or_(*[and_(HourlyStat.hour >= start, HourlyStat.hour < end)
+                                                    for start, end in windows])))
+    hourly = source_rows(windows, session, hourly=True)
+    if hourly:
+        session.execute(insert(HourlyStat), [
+            {'hour': hour, 'metric': metric, 'dimension': dimension, 'service_category_id': category_id,
+             'count': count, 'amount': amount, 'rolled_at': now}
+            for hour, metric, dimension, category_id, count, amount in hourly
+        ])
+
+    # Days are the sum of their hours
+    daily = {}
+    for hour, metric, dimension, category_id, count, amount in hourly:
+        key = (hour.date(), metric, dimension, category_id)
+        current = daily.get(key, (0, Decimal(0)))
+        daily[key] = (current[0] + count, current[1] + Decimal(str(amount)))
+    rows = [{'day': day, 'metric': ROLLED, 'dimension': '', 'service_category_id': 0, 'count': 0,
+             'amount': 0, 'rolled_at': now} for day in days]
+    rows += [{'day': day, 'metric': metric, 'dimension': dimension, 'service_category_id': category_id,
+              'count': count, 'amount': amount, 'rolled_at': now}
+             for (day, metric, dimension, category_id), (count, amount) in daily.items()]
+    session.execute(insert(DailyStat), rows)
+
+
+def roll_up(full=False, batch_days=31, session=None):
+    """
+    Roll up every complete day not rolled up yet, and re-roll the dirty days
+    full=True rebuilds the whole table. Returns the number of days written.
+    """
+    session = session or db.session
+    yesterday = utc_today() - timedelta(days=1)
+    if full:
+        session.execute(delete(DailyStat))
+        session.execute(delete(HourlyStat))
+        session.execute(delete(DailyStatsDirtyDay))
+
+    # Claim the dirty days first: a change committed after this point marks its day again
+    dirty = sorted(_as_date(day) for day in session.execute(select(DailyStatsDirtyDay.day)).scalars())
+    if dirty:
+        session.execute(delete(DailyStatsDirtyDay).where(DailyStatsDirtyDay.day.in_(dirty)))
+
+    last_rolled = None if full else rolled_through(session)
+    first = _as_date(last_rolled) + timedelta(days=1) if last_rolled else _earliest_source_day(session)
+    written = 0
+
+    # Dirty days from the new range below are rolled with it
+    dirty = [day for day in dirty if first is None or day < first]
+    for start in range(0, len(dirty), batch_days):
+        days = dirty[start:start + batch_days]
+        _replace_days(session, days, [_day_window(d) for d in days])
+        written += len(days)
+    session.commit()
+
+    # New days in batches of contiguous days, one aggregate query per batch
+    day = first
+    while day is not None and day <= yesterday:
+        batch_end = min(day + timedelta(days=batch_days - 1), yesterday)
+        days = [day + timedelta(days=offset) for offset in range((batch_end - day).days + 1)]
+        _replace_days(session, days, [(_day_start(day), _day_start(batch_end + timedelta(days=1)))])
+        session.commit()
+        written += len(days)
+        day = batch_end + timedelta(days=1)
+    return written
+
+
+# ----- dirty tracking -----
+
+def _insert_ignore(session, table, rows):
+    dialect = session.get_bind().dialect.name
+    if dialect == 'postgresql':
+        from sqlalchemy.dialects.postgresql import insert as dialect_insert
+    elif dialect == 'sqlite':
+        from sqlalchemy.dialects.sqlite import insert as dialect_insert
+    else:
+        existing = set(session.execute(select(table.c.day).where(table.c.day.in_([r['day'] for r in rows]))).scalars())
+        rows = [row for row in rows if row['day'] not in existing]
+        if rows:
+            session.execute(insert(table), rows)
+        return
+    session.execute(dialect_insert(table).on_conflict_do_nothing(), rows)
+
+
+def _changed_days(session):
+    today = utc_today()
+    days = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if not isinstance(obj, TRACKED_MODELS):
+            continue
+        if obj in session.dirty and not session.is_modified(obj):
+            continue
+        history = inspect(obj).attrs.created_at.history
+        for created in list(history.added or ()) + list(history.unchanged or ()) + list(history.deleted or ()):
+            if created is not None and created.date() < today:
+                days.add(created.date())
+    return days
+
+
+@event.listens_for(Session, 'after_flush')
+def _mark_dirty_days(session, flush_context):
+    # Today is always counted live, only earlier (possibly rolled-up) days need marking
+    days = _changed_days(session)
+    if days:
+        now = datetime.utcnow()
+        _insert_ignore(session, DailyStatsDirtyDay.__table__,
+                       [{'day': day, 'marked_at': now} for day in sorted(days)])
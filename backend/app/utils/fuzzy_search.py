@@ -0,0 +1,235 @@
+"""
+Typo-tolerant search over short text columns (category names, user names, emails)
+Matching is based on trigrams - the 3-letter chunks of each word - so
+"plumbr" still finds "Plumbing" (they share "plu", "lum", "umb" ...).
+
+- PostgreSQL with pg_trgm: the % (similarity) and <% (word similarity)
+  operators plus ILIKE, all served by GIN gin_trgm_ops indexes, ranked by
+  greatest(similarity, word_similarity). Cost depends on the number of
+  matches, not on the table size.
+- Anything else (SQLite, tests): an in-process trigram index over the
+  searched columns, rebuilt when this process writes to the table (see
+  app/utils/table_versions.py) or after FUZZY_SEARCH_INDEX_TTL seconds.
+  Meant for development and small tables: a table with more than
+  FUZZY_SEARCH_INDEX_MAX_ROWS rows is not loaded into every worker, it is
+  searched with plain (not typo tolerant) substring matching instead.
+
+Both return a relevance score in [0, 1], higher is better.
+"""
+import logging
+import re
+import threading
+import time
+from collections import defaultdict
+from sqlalchemy import DDL, bindparam, case, event, func, literal, or_, select, text
+from sqlalchemy.exc import DBAPIError
+from app import db
+from app.models.service_category import ServiceCategory
+from app.models.user import User
+from app.utils import table_versions
+from app.utils.settings import setting
+
+logger = logging.getLogger(__name__)
+
+# Searchable columns per model
+SEARCH_FIELDS = {
+    ServiceCategory: ('name',),
+    User: ('first_name', 'last_name', 'email'),
+}
+
+# GIN trigram indexes created on PostgreSQL: (index name, table, column)
+TRIGRAM_INDEXES = [
+    ('ix_service_categories_name_trgm', 'service_categories', 'name'),
+    ('ix_users_first_name_trgm', 'users', 'first_name'),
+    ('ix_users_last_name_trgm', 'users', 'last_name'),
+    ('ix_users_email_trgm', 'users', 'email'),
+]
+
+
+def _contains_pattern(term):
+    """ILIKE pattern matching term anywhere, with % and _ taken literally (escape '\\')"""
+    escaped = term.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f'%{escaped}%'
+
+
+# ----- trigram scoring (same rules as pg_trgm) -----
+
+def _words(value):
+    return re.findall(r'[^\W_]+', (value or '').lower())
+
+
+def trigrams(value):
+    """Set of trigrams of every word, padded like pg_trgm ("  w", " wo", ...)"""
+    grams = set()
+    for word in _words(value):
+        padded = f'  {word} '
+        grams.update(padded[i:i + 3] for i in range(len(padded) - 2))
+    return grams
+
+
+def similarity(a, b):
+    """pg_trgm similarity: shared trigrams over all distinct trigrams"""
+    grams_a = a if isinstance(a, set) else trigrams(a)
+    grams_b = b if isinstance(b, set) else trigrams(b)
+    if not grams_a or not grams_b:
+        return 0.0
+    return len(grams_a & grams_b) / len(grams_a | grams_b)
+
+
+def score(term, value):
+    """
+    Best of the similarity to the whole value and to any single word of it
+    (an approximation of pg_trgm word_similarity), so "gmail" ranks
+    "jane@gmail.com" highly
+    """
+    term_grams = trigrams(term)
+    best = similarity(term_grams, value)
+    for word in _words(value):
+        best = max(best, similarity(term_grams, word))
+    return best
+
+
+# ----- in-process index -----
+
+class TrigramIndex:
+    """Inverted index trigram -> row ids over the searchable text of one model"""
+
+    def __init__(self, rows):
+        self.texts = {}                    # id -> [field values]
+        self.postings = defaultdict(set)   # trigram -> ids
+        for row_id, *values in rows:
+            self.texts[row_id] = values
+            for value in values:
+                for gram in trigrams(value):
+                    self.postings[gram].add(row_id)
+
+    def search(self, term, threshold=0.3):
+        """Return every match as [(id, score)], sorted by score desc then id"""
+        term_grams = trigrams(term)
+        candidates = set()
+        for gram in term_grams:
+            candidates |= self.postings.get(gram, set())
+        needle = (term or '').lower().strip()
+
+        results = []
+        for row_id in candidates:
+            values = self.texts[row_id]
+            best = max(score(term, value) for value in values)
+            # A plain substring hit is always a match, as ILIKE was before
+            if needle and any(needle in (value or '').lower() for value in values):
+                best = max(best, threshold)
+            if best >= threshold:
+                results.append((row_id, round(best, 4)))
+        results.sort(key=lambda item: (-item[1], item[0]))
+        return results
+
+
+_indexes = {}
+_indexes_lock = threading.Lock()
+
+
+def _index_for(model):
+    """The in-process index of a model's table, or None when the table is too large for one"""
+    table = model.__table__.name
+    # The engine identity keeps separate databases with the same URL apart (tests)
+    key = (id(db.engine), str(db.engine.url), table)
+    current = table_versions.version(table)
+    with _indexes_lock:
+        entry = _indexes.get(key)
+        if entry and entry[1] == current and entry[2] > time.monotonic():
+            return entry[0]
+
+    index = None
+    max_rows = setting('FUZZY_SEARCH_INDEX_MAX_ROWS')
+    if db.session.execute(select(func.count()).select_from(model)).scalar() <= max_rows:
+        fields = SEARCH_FIELDS[model]
+        index = TrigramIndex(db.session.execute(select(model.id, *[getattr(model, f) for f in fields])).all())
+    else:
+        logger.warning('%s has more than %d rows, fuzzy search falls back to substring matching', table, max_rows)
+    with _indexes_lock:
+        _indexes[key] = (index, current, time.monotonic() + setting('FUZZY_SEARCH_INDEX_TTL'))
+    return index
+
+
+# ----- PostgreSQL -----
+
+_trgm_available = {}
+
+
+def _has_pg_trgm():
+    bind = db.session.get_bind()
+    if bind.dialect.name != 'postgresql':
+        return False
+    key = str(bind.url)
+    if key not in _trgm_available:
+        _trgm_available[key] = db.session.execute(
+            text("SELECT 1 FROM pg_extension WHERE extname = 'pg_trgm'")
+        ).first() is not None
+    return _trgm_available[key]
+
+
+def _create_trigram_indexes(target, connection, **kw):
+    """Create pg_trgm and the GIN indexes of a table right after db.create_all creates it"""
+    if connection.dialect.name != 'postgresql':
+        return
+    try:
+        with connection.begin_nested():
+            connection.execute(DDL('CREATE EXTENSION IF NOT EXISTS pg_trgm'))
+            for name, table, column in TRIGRAM_INDEXES:
+                if table == target.name:
+                    connection.execute(DDL(
+                        f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIN ({column} gin_trgm_ops)'
+                    ))
+    except DBAPIError:
+        pass  # no permission to install pg_trgm - the in-process index is used instead
+
+
+for _model in SEARCH_FIELDS:
+    event.listen(_model.__table__, 'after_create', _create_trigram_indexes)
+
+
+# ----- public API -----
+
+def fuzzy_filter(query, model, term):
+    """
+    Restrict a query on model to rows matching term, typos allowed
+    Returns (query, relevance) - relevance is a column expression to order by
+    (higher is better), or (query, None) when term is blank.
+    """
+    term = (term or '').strip()
+    if not term:
+        return query, None
+    columns = [getattr(model, field) for field in SEARCH_FIELDS[model]]
+
+    if _has_pg_trgm():
+        bound = literal(term)
+        relevance = func.greatest(*[
+            func.greatest(func.similarity(column, bound), func.word_similarity(bound, column))
+            for column in columns
+        ])
+        matches = or_(*[
+            or_(column.op('%')(bound), bound.op('<%')(column), column.ilike(_contains_pattern(term), escape='\\'))
+            for column in columns
+        ])
+        return query.filter(matches), relevance
+
+    index = _index_for(model)
+    if index is None:
+        matches = or_(*[column.ilike(_contains_pattern(term), escape='\\') for column in columns])
+        return query.filter(matches), literal(setting('FUZZY_SEARCH_THRESHOLD'))
+
+    hits = index.search(term, setting('FUZZY_SEARCH_THRESHOLD'))
+    if not hits:
+        return query.filter(literal(False)), literal(0.0)
+    # Every match is kept, so totals and pages stay exact. The ids are rendered
+    # inline (no bind parameter limit) and grouped by score, so ranking costs
+    # one IN lookup per distinct score rather than one comparison per match.
+    by_score = defaultdict(list)
+    for row_id, hit_score in hits:
+        by_score[hit_score].append(row_id)
+
+    def ids(values):
+        return model.id.in_(bindparam(None, values, expanding=True, literal_execute=True))
+
+    relevance = case(*[(ids(row_ids), hit_score) for hit_score, row_ids in by_score.items()], else_=0.0)
+    return query.filter(ids([row_id for row_id, _ in hits])), relevance
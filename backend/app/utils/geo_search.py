@@ -0,0 +1,152 @@
+"""
+Database-side geo search for provider profiles
+Instead of loading every provider and running the haversine formula in Python,
+the search narrows candidates to the 3x3 block of geohash cells around the
+search point (indexed geohash_N columns) plus a latitude/longitude bounding box,
+and lets the database compute the exact distance, filter by radius, sort and
+apply the LIMIT. Radii too large for the stored geohash precisions fall back to
+the bounding box alone (served by the ix_provider_profiles_lat_lon index).
+
+On PostgreSQL the distance comes from PostGIS or earthdistance when one of those
+extensions is installed, otherwise from a plain SQL haversine expression that
+also works on SQLite (see app/utils/sqlite_functions.py).
+"""
+import math
+from sqlalchemy import func, text, or_, and_, literal
+from app import db
+from app.models.provider_profile import ProviderProfile
+from app.utils import geohash
+
+EARTH_RADIUS_KM = 6371.0
+
+# Cache of the distance backend per database URL so we only inspect
+# pg_extension once per process
+_backend_cache = {}
+
+
+def bounding_box(lat, lon, radius_km):
+    """
+    Return the lat/lon box enclosing a circle of radius_km around (lat, lon)
+    Result: (min_lat, max_lat, [(min_lon, max_lon), ...])
+    Longitude comes back as a list because a box crossing the antimeridian
+    has to be split into two ranges.
+    """
+    angular_radius = radius_km / EARTH_RADIUS_KM
+    min_lat = lat - math.degrees(angular_radius)
+    max_lat = lat + math.degrees(angular_radius)
+
+    # Near the poles every longitude is within range
+    if min_lat <= -90 or max_lat >= 90:
+        return max(min_lat, -90.0), min(max_lat, 90.0), [(-180.0, 180.0)]
+
+    delta_lon = math.degrees(math.asin(min(1.0, math.sin(angular_radius) / math.cos(math.radians(lat)))))
+    min_lon = lon - delta_lon
+    max_lon = lon + delta_lon
+
+    if min_lon < -180:
+        return min_lat, max_lat, [(min_lon + 360, 180.0), (-180.0, max_lon)]
+    if max_lon > 180:
+        return min_lat, max_lat, [(min_lon, 180.0), (-180.0, max_lon - 360)]
+    return min_lat, max_lat, [(min_lon, max_lon)]
+
+
+def distance_backend(session=None):
+    """Return 'postgis', 'earthdistance' or 'haversine' for the current database"""
+    session = session or db.session
+    bind = session.get_bind()
+    key = str(bind.url)
+    if key not in _backend_cache:
+        backend = 'haversine'
+        if bind.dialect.name == 'postgresql':
+            installed = {
+                row[0] for row in session.execute(text(
+                    "SELECT extname FROM pg_extension WHERE extname IN ('postgis', 'earthdistance')"
+                ))
+            }
+            if 'postgis' in installed:
+                backend = 'postgis'
+            elif 'earthdistance' in installed:
+                backend = 'earthdistance'
+        _backend_cache[key] = backend
+    return _backend_cache[key]
+
+
+def distance_expression(lat, lon, backend='haversine', dialect=None):
+    """
+    SQL expression for the distance in km from (lat, lon) to each provider
+    dialect (default: the session's) picks the SQL spelling of the haversine clamp.
+    """
+    if backend == 'postgis':
+        return func.ST_DistanceSphere(
+            func.ST_MakePoint(ProviderProfile.longitude, ProviderProfile.latitude),
+            func.ST_MakePoint(literal(lon), literal(lat))
+        ) / 1000.0
+    if backend == 'earthdistance':
+        return func.earth_distance(
+            func.ll_to_earth(ProviderProfile.latitude, ProviderProfile.longitude),
+            func.ll_to_earth(literal(lat), literal(lon))
+        ) / 1000.0
+
+    # Haversine formula evaluated by the database
+    dlat = func.radians(ProviderProfile.latitude - lat)
+    dlon = func.radians(ProviderProfile.longitude - lon)
+    a = (func.power(func.sin(dlat / 2), 2) +
+         math.cos(math.radians(lat)) * func.cos(func.radians(ProviderProfile.latitude)) *
+         func.power(func.sin(dlon / 2), 2))
+    # Rounding can push a a hair above 1 for identical or antipodal points, where
+    # asin() is undefined (PostgreSQL raises "input is out of range")
+    dialect = dialect or db.session.get_bind().dialect.name
+    clamped = func.min(a, 1.0) if dialect == 'sqlite' else func.least(a, 1.0)
+    return 2 * EARTH_RADIUS_KM * func.asin(func.sqrt(clamped))
+
+
+def apply_bounding_box(query, lat, lon, radius_km):
+    """Restrict a ProviderProfile query to the bounding box of the search circle"""
+    min_lat, max_lat, lon_ranges = bounding_box(lat, lon, radius_km)
+    return query.filter(
+        ProviderProfile.latitude.between(min_lat, max_lat),
+        or_(*[and_(ProviderProfile.longitude >= lo, ProviderProfile.longitude <= hi)
+              for lo, hi in lon_ranges])
+    )
+
+
+def apply_spatial_prefilter(query, lat, lon, radius_km):
+    """
+    Restrict a ProviderProfile query to candidates near (lat, lon)
+    Uses the geohash neighbour cells when the radius allows it, and always
+    keeps the bounding box so the candidate set is as tight as possible.
+    """
+    precision, cells = geohash.covering_cells(lat, lon, radius_km)
+    if precision is not None:
+        query = query.filter(getattr(ProviderProfile, f'geohash_{precision}').in_(cells))
+    return apply_bounding_box(query, lat, lon, radius_km)
+
+
+def distance_column(lat, lon):
+    """Labeled distance_km expression for the current database"""
+    return distance_expression(lat, lon, distance_backend()).label('distance_km')
+
+
+def apply_distance_ordering(query, lat, lon, radius_km=None):
+    """
+    Add a distance_km column to a ProviderProfile query and sort by it
+    With radius_km the spatial prefilter and the exact radius filter are applied
+    as well, so a paginator's COUNT(*) and LIMIT/OFFSET run on the filtered,
+    distance-ordered set and every page comes back full. Rows are returned as
+    (provider, distance_km); providers without coordinates sort last.
+    """
+    distance = distance_column(lat, lon)
+    if radius_km:
+        query = apply_spatial_prefilter(query, lat, lon, radius_km).filter(distance <= radius_km)
+    return query.add_columns(distance).order_by(distance.is_(None), distance, ProviderProfile.id)
+
+
+def find_nearby_providers(query, lat, lon, radius_km, limit=None):
+    """
+    Run a nearby search on top of an existing ProviderProfile query
+    Returns a list of (provider, distance_km) tuples sorted by distance.
+    """
+    query = apply_distance_ordering(query, lat, lon, radius_km)
+    if limit:
+        query = query.limit(limit)
+    return [(provider, float(distance_km)) for provider, distance_km in query.all()]
@@ -1,6 +1,19 @@
 import math
-import requests
-import os
+import heapq
+from array import array
+from concurrent.futures import ThreadPoolExecutor
+from flask import current_app
+
+try:
+    import numpy as np  # Optional - speeds up batch distance calculations
+except ImportError:
+    np = None
+
+from app.utils.geocode_cache import geocode_cache, normalize_address
+from app.utils.geocoders import get_geocoder
+
+# Earth radius in kilometers
+EARTH_RADIUS_KM = 6371
 
 def calculate_distance(lat1, lon1, lat2, lon2):
     """Calculate distance between two coordinates using Haversine formula"""
@@ -16,32 +29,115 @@ def calculate_distance(lat1, lon1, lat2, lon2):
     a = math.sin(dlat/2)**2 + math.cos(lat1) * math.cos(lat2) * math.sin(dlon/2)**2
     c = 2 * math.asin(math.sqrt(a))
     
-    # Earth radius in kilometers
-    r = 6371
-    return c * r
+    return c * EARTH_RADIUS_KM
+
+def _as_float(value):
+    """Convert a coordinate to float, using NaN for missing values"""
+    return float('nan') if value is None else float(value)
+
+def _to_numpy(values):
+    """Convert a sequence of coordinates to a float64 NumPy array"""
+    if isinstance(values, np.ndarray):
+        return values.astype(np.float64, copy=False)
+    return np.fromiter((_as_float(v) for v in values), dtype=np.float64, count=len(values))
+
+def calculate_distances(origin, lats, lons):
+    """
+    Haversine distance in km from origin (lat, lon) to many points at once
+    Uses NumPy when installed and returns a numpy array; otherwise falls back
+    to a tight loop over array('d') buffers and returns an array('d').
+    Missing coordinates (None) produce NaN.
+    """
+    origin_lat, origin_lon = map(float, origin)
+
+    if np is not None:
+        lat_rad = np.radians(_to_numpy(lats))
+        lon_rad = np.radians(_to_numpy(lons))
+        origin_lat_rad = math.radians(origin_lat)
+        a = (np.sin((lat_rad - origin_lat_rad) / 2) ** 2 +
+             math.cos(origin_lat_rad) * np.cos(lat_rad) * np.sin((lon_rad - math.radians(origin_lon)) / 2) ** 2)
+        return 2 * EARTH_RADIUS_KM * np.arcsin(np.sqrt(np.minimum(a, 1.0)))
+
+    # Pure Python fallback - hoist everything loop-invariant out of the loop
+    sin, cos, asin, sqrt, radians = math.sin, math.cos, math.asin, math.sqrt, math.radians
+    origin_lat_rad = radians(origin_lat)
+    origin_lon_rad = radians(origin_lon)
+    cos_origin = cos(origin_lat_rad)
+    diameter = 2 * EARTH_RADIUS_KM
+    nan = float('nan')
+    result = array('d', bytes(8 * len(lats)))
+    for i, (lat, lon) in enumerate(zip(lats, lons)):
+        if lat is None or lon is None:
+            result[i] = nan
+            continue
+        lat_rad = radians(lat)
+        a = sin((lat_rad - origin_lat_rad) / 2) ** 2 + cos_origin * cos(lat_rad) * sin((radians(lon) - origin_lon_rad) / 2) ** 2
+        result[i] = diameter * asin(sqrt(a if a < 1.0 else 1.0))
+    return result
+
+def distance_matrix_rows(origins, destinations):
+    """
+    Yield one list of distances (km) per origin, in destination order
+    origins/destinations are sequences of (lat, lon). The destination arrays are
+    built once and every row is a single vectorized calculate_distances call,
+    so callers can stream rows without materializing the whole N x M matrix.
+    """
+    dest_lats = [_as_float(lat) for lat, _ in destinations]
+    dest_lons = [_as_float(lon) for _, lon in destinations]
+    if np is not None:
+        dest_lats, dest_lons = np.asarray(dest_lats), np.asarray(dest_lons)
+
+    for origin in origins:
+        row = calculate_distances(origin, dest_lats, dest_lons)
+        yield [round(d, 3) if d == d else None for d in row.tolist()]
+
+def top_k_within_radius(origin, lats, lons, radius_km, k=None):
+    """
+    Return [(index, distance_km), ...] for the k closest points within radius_km
+    sorted by distance. With k=None every point inside the radius is returned.
+    """
+    distances = calculate_distances(origin, lats, lons)
+
+    if np is not None:
+        candidates = np.flatnonzero(distances <= radius_km)  # NaN compares False
+        if k is not None and len(candidates) > k:
+            # argpartition finds the k smallest without sorting everything
+            candidates = candidates[np.argpartition(distances[candidates], k - 1)[:k]]
+        candidates = candidates[np.argsort(distances[candidates], kind='stable')]
+        return [(int(i), float(distances[i])) for i in candidates]
+
+    within = ((d, i) for i, d in enumerate(distances) if d <= radius_km)
+    closest = heapq.nsmallest(k, within) if k is not None else sorted(within)
+    return [(i, d) for d, i in closest]
 
 def get_coordinates_from_address(address):
-    """Get coordinates from address using Google Maps API"""
+    """Get coordinates from address, served from the geocode cache when possible"""
     try:
-        api_key = os.environ.get('GOOGLE_MAPS_API_KEY')
-        if not api_key:
-            return None
-        
-        url = f"https://maps.googleapis.com/maps/api/geocode/json"
-        params = {
-            'address': address,
-            'key': api_key
-        }
-        
-        response = requests.get(url, params=params)
-        data = response.json()
-        
-        if data['status'] == 'OK' and data['results']:
-            location = data['results'][0]['geometry']['location']
-            return {
-                'latitude': location['lat'],
-                'longitude': location['lng']
-            }
-        return None
+        return geocode_cache.lookup(address, get_geocoder().geocode)
     except Exception:
-        return None
\ No newline at end of file
+        return None
+
+def geocode_addresses(addresses, max_workers=None):
+    """
+    Geocode many addresses concurrently
+    Returns {address: coordinates or None} for every input address. Addresses
+    that normalize to the same key are resolved once, and at most max_workers
+    lookups (default GEOCODE_MAX_WORKERS) run at the same time.
+    """
+    app = current_app._get_current_object()
+    max_workers = max_workers or app.config.get('GEOCODE_MAX_WORKERS', 8)
+    
+    # One representative address per cache key
+    unique = {}
+    for address in addresses:
+        unique.setdefault(normalize_address(address), address)
+    unique.pop('', None)
+    
+    def resolve(address):
+        with app.app_context():
+            return get_coordinates_from_address(address)
+    
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        resolved = dict(zip(unique.keys(), executor.map(resolve, unique.values())))
+    
+    return {address: resolved.get(normalize_address(address)) for address in addresses}
@@ -0,0 +1,167 @@
+"""
+Two-tier cache for geocoding results
+1. In-process LRU with per-entry TTL - answers repeat lookups without any I/O
+2. geocode_cache table - shared by every gunicorn worker and survives restarts
+
+Failed lookups (address not found) are cached too, with a shorter TTL, so a bad
+address does not hit the geocoding API on every request. Transient failures
+(missing API key, network errors, quota) raise GeocodingUnavailable from the
+resolver and are never cached.
+"""
+import hashlib
+import re
+import threading
+import logging
+from datetime import datetime, timedelta
+from sqlalchemy import delete, insert, select
+from sqlalchemy.exc import SQLAlchemyError
+from app import db
+from app.models.geocode_cache import GeocodeCacheEntry
+from app.utils.lru import LRUCache, MISSING as _MISSING
+from app.utils.settings import setting
+
+logger = logging.getLogger(__name__)
+
+# Length of geocode_cache.address_key
+MAX_KEY_LENGTH = 255
+
+
+class GeocodingUnavailable(Exception):
+    """Raised by a resolver when the lookup could not be performed at all"""
+
+
+def normalize_address(address):
+    """
+    Build the cache key for an address
+    "  Westlands ,  NAIROBI. " and "westlands, nairobi" map to the same key.
+    Keys longer than the column keep a prefix and end in a sha1 of the whole
+    key, so long addresses sharing a prefix do not collide.
+    """
+    if not address:
+        return ''
+    key = address.lower()
+    key = re.sub(r'[^\w\s,]', ' ', key)           # drop punctuation except commas
+    key = re.sub(r'\s*,\s*', ', ', key)            # one space after each comma
+    key = re.sub(r'\s+', ' ', key).strip(' ,')
+    if len(key) > MAX_KEY_LENGTH:
+        digest = hashlib.sha1(key.encode('utf-8')).hexdigest()
+        key = f'{key[:MAX_KEY_LENGTH - len(digest) - 1]}#{digest}'
+    return key
+
+
+class GeocodeCache:
+    """Memory tier + database tier with hit/miss counters"""
+
+    def __init__(self):
+        self.memory = LRUCache(setting('GEOCODE_CACHE_SIZE'))
+        self._stats_lock = threading.Lock()
+        self.reset_stats()
+
+    def reset_stats(self):
+        with self._stats_lock:
+            self.stats = {'memory_hits': 0, 'db_hits': 0, 'negative_hits': 0, 'misses': 0, 'errors': 0}
+
+    def _count(self, name):
+        with self._stats_lock:
+            self.stats[name] += 1
+
+    def get_stats(self):
+        with self._stats_lock:
+            stats = dict(self.stats)
+        lookups = stats['memory_hits'] + stats['db_hits'] + stats['misses']
+        stats['hit_rate'] = round((stats['memory_hits'] + stats['db_hits']) / lookups, 4) if lookups else 0
+        stats['memory_entries'] = len(self.memory)
+        return stats
+
+    # ----- database tier -----
+
+    def _db_get(self, key):
+        """Return (value, remaining ttl in seconds) or (_MISSING, 0)"""
+        try:
+            with db.engine.connect() as conn:
+                row = conn.execute(
+                    select(GeocodeCacheEntry.latitude, GeocodeCacheEntry.longitude, GeocodeCacheEntry.expires_at)
+                    .where(GeocodeCacheEntry.address_key == key)
+                ).first()
+        except SQLAlchemyError as e:
+            logger.warning('Geocode cache table unavailable: %s', e)
+            return _MISSING, 0
+        if row is None:
+            return _MISSING, 0
+        remaining = (row.expires_at - datetime.utcnow()).total_seconds()
+        if remaining <= 0:
+            return _MISSING, 0
+        if row.latitude is None or row.longitude is None:
+            return None, remaining
+        return {'latitude': row.latitude, 'longitude': row.longitude}, remaining
+
+    def _db_set(self, key, value, ttl):
+        now = datetime.utcnow()
+        try:
+            with db.engine.begin() as conn:
+                conn.execute(delete(GeocodeCacheEntry).where(GeocodeCacheEntry.address_key == key))
+                conn.execute(insert(GeocodeCacheEntry).values(
+                    address_key=key,
+                    latitude=value['latitude'] if value else None,
+                    longitude=value['longitude'] if value else None,
+                    created_at=now,
+                    expires_at=now + timedelta(seconds=ttl)
+                ))
+        except SQLAlchemyError as e:
+            # Another worker stored the same key first, or the table is missing
+            logger.warning('Could not persist geocode cache entry: %s', e)
+
+    # ----- public API -----
+
+    def lookup(self, address, resolver):
+        """
+        Return cached coordinates for address, calling resolver(address) on a miss
+        resolver returns {'latitude', 'longitude'} or None (not found), or raises
+        GeocodingUnavailable for failures that must not be cached.
+        """
+        key = normalize_address(address)
+        if not key:
+            return None
+
+        self.memory.max_size = setting('GEOCODE_CACHE_SIZE')
+        value = self.memory.get(key)
+        if value is not _MISSING:
+            self._count('memory_hits')
+            if value is None:
+                self._count('negative_hits')
+            return value
+
+        value, remaining = self._db_get(key)
+        if value is not _MISSING:
+            self._count('db_hits')
+            if value is None:
+                self._count('negative_hits')
+            self.memory.set(key, value, remaining)
+            return value
+
+        self._count('misses')
+        try:
+            value = resolver(address)
+        except GeocodingUnavailable:
+            self._count('errors')
+            return None
+
+        ttl = setting('GEOCODE_CACHE_TTL') if value else setting('GEOCODE_NEGATIVE_TTL')
+        self.memory.set(key, value, ttl)
+        self._db_set(key, value, ttl)
+        return value
+
+    def clear(self):
+        """Drop the in-process tier (the table is pruned with prune_expired)"""
+        self.memory.clear()
+
+
+def prune_expired():
+    """Delete expired rows from the geocode_cache table, returns the row count"""
+    with db.engine.begin() as conn:
+        result = conn.execute(delete(GeocodeCacheEntry).where(GeocodeCacheEntry.expires_at <= datetime.utcnow()))
+    return result.rowcount
+
+
+# Shared per-process instance
+geocode_cache = GeocodeCache()
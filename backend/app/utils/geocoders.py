@@ -0,0 +1,118 @@
+"""
+Pluggable geocoding backends
+Every backend implements geocode(address) and returns {'latitude', 'longitude'},
+None when the address is unknown, or raises GeocodingUnavailable when the lookup
+could not be performed (so the result is not cached).
+
+Backends:
+- google:    Google Geocoding API over a pooled requests.Session with timeouts
+- gazetteer: offline lookup in a local CSV of place names (no network needed)
+
+The backend is picked with the GEOCODER_BACKEND setting.
+"""
+import csv
+import os
+import threading
+import requests
+from requests.adapters import HTTPAdapter
+from app.utils.geocode_cache import GeocodingUnavailable, normalize_address
+from app.utils.settings import setting
+
+BACKEND_DIR = os.path.dirname(os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+DEFAULT_GAZETTEER_PATH = os.path.join(BACKEND_DIR, 'data', 'gazetteer_ke.csv')
+
+
+class Geocoder:
+    """Interface for geocoding backends"""
+    name = 'base'
+
+    def geocode(self, address):
+        raise NotImplementedError
+
+
+class GoogleGeocoder(Geocoder):
+    """Google Geocoding API client sharing one connection pool across threads"""
+    name = 'google'
+    url = 'https://maps.googleapis.com/maps/api/geocode/json'
+
+    def __init__(self, api_key=None, timeout=5, pool_size=10):
+        self.api_key = api_key
+        self.timeout = timeout
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size)
+        self.session.mount('https://', adapter)
+
+    def geocode(self, address):
+        api_key = self.api_key or os.environ.get('GOOGLE_MAPS_API_KEY')
+        if not api_key:
+            raise GeocodingUnavailable('GOOGLE_MAPS_API_KEY not configured')
+
+        try:
+            response = self.session.get(self.url, params={'address': address, 'key': api_key}, timeout=self.timeout)
+            data = response.json()
+        except (requests.RequestException, ValueError) as e:
+            raise GeocodingUnavailable(str(e))
+
+        if data.get('status') == 'OK' and data.get('results'):
+            location = data['results'][0]['geometry']['location']
+            return {'latitude': location['lat'], 'longitude': location['lng']}
+        if data.get('status') == 'ZERO_RESULTS':
+            return None  # Genuinely unknown address - safe to cache
+        # OVER_QUERY_LIMIT, REQUEST_DENIED, UNKNOWN_ERROR... retry next time
+        raise GeocodingUnavailable(data.get('status', 'unknown error'))
+
+
+class GazetteerGeocoder(Geocoder):
+    """
+    Offline geocoder backed by a CSV with name,latitude,longitude columns
+    Addresses are matched on their normalized form; when the full address is
+    not listed, the most specific (leading) components are dropped one at a
+    time, so "12 Ngong Road, Kilimani, Nairobi" resolves to Kilimani rather
+    than to nothing. Trailing components such as the country are dropped
+    within each step, so "Kilimani, Nairobi, Kenya" still matches "kilimani".
+    """
+    name = 'gazetteer'
+
+    def __init__(self, path=DEFAULT_GAZETTEER_PATH):
+        self.path = path
+        self.places = {}
+        with open(path, newline='', encoding='utf-8') as f:
+            for row in csv.DictReader(f):
+                self.places[normalize_address(row['name'])] = {
+                    'latitude': float(row['latitude']),
+                    'longitude': float(row['longitude'])
+                }
+
+    def geocode(self, address):
+        parts = [part for part in normalize_address(address).split(', ') if part]
+        while parts:
+            for end in range(len(parts), 0, -1):
+                match = self.places.get(', '.join(parts[:end]))
+                if match:
+                    return dict(match)
+            parts.pop(0)
+        return None
+
+
+# One instance per configuration so the HTTP pool and CSV are reused
+_geocoders = {}
+_geocoders_lock = threading.Lock()
+
+
+def get_geocoder():
+    """Return the configured geocoding backend"""
+    backend = setting('GEOCODER_BACKEND')
+    if backend == 'gazetteer':
+        key = (backend, setting('GAZETTEER_PATH'))
+    elif backend == 'google':
+        key = (backend, setting('GEOCODE_TIMEOUT'))
+    else:
+        raise ValueError(f'Unknown geocoder backend: {backend}')
+
+    with _geocoders_lock:
+        if key not in _geocoders:
+            if backend == 'gazetteer':
+                _geocoders[key] = GazetteerGeocoder(key[1])
+            else:
+                _geocoders[key] = GoogleGeocoder(timeout=key[1], pool_size=setting('GEOCODE_MAX_WORKERS'))
+        return _geocoders[key]
@@ -0,0 +1,127 @@
+"""
+Geohash encoding used as a precomputed spatial key on provider profiles
+A geohash splits the world into a grid of cells; every extra character
+makes the cell 32 times smaller. Providers store their cell at a few
+precisions so a nearby search can look up the 3x3 block of cells around
+the search point with an indexed IN (...) instead of scanning the table.
+"""
+import math
+
+BASE32 = '0123456789bcdefghjkmnpqrstuvwxyz'
+
+# Precisions stored on ProviderProfile (geohash_3 ... geohash_6)
+# Approximate cell size at the equator:
+#   3 -> 156 x 156 km, 4 -> 39 x 20 km, 5 -> 4.9 x 4.9 km, 6 -> 1.2 x 0.6 km
+PRECISIONS = (3, 4, 5, 6)
+
+KM_PER_DEGREE = 111.32
+
+
+def encode(lat, lon, precision=6):
+    """Encode a coordinate as a geohash string of the given length"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    chars = []
+    bits = 0
+    bit_count = 0
+    even = True  # geohash interleaves bits starting with longitude
+
+    while len(chars) < precision:
+        if even:
+            mid = (lon_range[0] + lon_range[1]) / 2
+            if lon >= mid:
+                bits = (bits << 1) | 1
+                lon_range[0] = mid
+            else:
+                bits = bits << 1
+                lon_range[1] = mid
+        else:
+            mid = (lat_range[0] + lat_range[1]) / 2
+            if lat >= mid:
+                bits = (bits << 1) | 1
+                lat_range[0] = mid
+            else:
+                bits = bits << 1
+                lat_range[1] = mid
+        even = not even
+        bit_count += 1
+        if bit_count == 5:
+            chars.append(BASE32[bits])
+            bits = 0
+            bit_count = 0
+
+    return ''.join(chars)
+
+
+def cell_size(precision):
+    """Return (lat_degrees, lon_degrees) covered by one cell"""
+    total_bits = 5 * precision
+    lon_bits = (total_bits + 1) // 2
+    lat_bits = total_bits // 2
+    return 180.0 / (2 ** lat_bits), 360.0 / (2 ** lon_bits)
+
+
+def decode(geohash):
+    """Return the (lat, lon) centre of a geohash cell"""
+    lat_range = [-90.0, 90.0]
+    lon_range = [-180.0, 180.0]
+    even = True
+    for char in geohash:
+        value = BASE32.index(char)
+        for shift in range(4, -1, -1):
+            bit = (value >> shift) & 1
+            target = lon_range if even else lat_range
+            mid = (target[0] + target[1]) / 2
+            if bit:
+                target[0] = mid
+            else:
+                target[1] = mid
+            even = not even
+    return (lat_range[0] + lat_range[1]) / 2, (lon_range[0] + lon_range[1]) / 2
+
+
+def neighbors(geohash):
+    """Return the 8 cells surrounding a geohash (fewer at the poles)"""
+    precision = len(geohash)
+    lat, lon = decode(geohash)
+    lat_step, lon_step = cell_size(precision)
+    cells = set()
+    for dlat in (-1, 0, 1):
+        for dlon in (-1, 0, 1):
+            if dlat == 0 and dlon == 0:
+                continue
+            neighbor_lat = lat + dlat * lat_step
+            if neighbor_lat <= -90 or neighbor_lat >= 90:
+                continue
+            neighbor_lon = (lon + dlon * lon_step + 180) % 360 - 180
+            cells.add(encode(neighbor_lat, neighbor_lon, precision))
+    cells.discard(geohash)
+    return sorted(cells)
+
+
+def precision_for_radius(lat, radius_km):
+    """
+    Pick the finest stored precision whose cells are at least radius_km wide
+    With cells that big, the 3x3 block around the search point always covers
+    the search circle. Returns None when the radius is too large for any
+    stored precision.
+    """
+    for precision in reversed(PRECISIONS):
+        lat_step, lon_step = cell_size(precision)
+        height_km = lat_step * KM_PER_DEGREE
+        width_km = lon_step * KM_PER_DEGREE * math.cos(math.radians(lat))
+        if min(height_km, width_km) >= radius_km:
+            return precision
+    return None
+
+
+def covering_cells(lat, lon, radius_km):
+    """
+    Return (precision, cells) covering a search circle, or (None, None)
+    when the radius is too large to be served by the stored precisions
+    """
+    precision = precision_for_radius(lat, radius_km)
+    if precision is None:
+        return None, None
+    center = encode(lat, lon, precision)
+    return precision, [center] + neighbors(center)
@@ -0,0 +1,64 @@
+"""
+HTTP validators for read endpoints
+A response carries a weak ETag computed from the data it was built from (a
+row version, the updated_at of the rows it shows, ...) and, when known, a
+Last-Modified date. A client that polls with If-None-Match or
+If-Modified-Since gets a bodiless 304 as long as that data has not changed:
+routes compute the validators with one cheap lookup and only build and
+encode the body on a miss.
+"""
+import hashlib
+from datetime import datetime
+from flask import current_app, jsonify, request
+
+
+def make_etag(*parts):
+    """Opaque ETag value from the parts that identify a response's data"""
+    raw = '|'.join(part.isoformat() if isinstance(part, datetime) else str(part) for part in parts)
+    return hashlib.sha1(raw.encode()).hexdigest()[:20]
+
+
+def latest(*values):
+    """Most recent of some datetimes, ignoring None"""
+    values = [value for value in values if value is not None]
+    return max(values) if values else None
+
+
+def query_args_key():
+    """Query string in canonical order, for ETags of responses that depend on it"""
+    return '&'.join(f'{key}={value}' for key, value in sorted(request.args.items(multi=True)))
+
+
+def is_not_modified(etag, last_modified=None):
+    """
+    True when the client's cached copy is current
+    If-None-Match wins over If-Modified-Since when both are sent (RFC 9110).
+    """
+    if request.if_none_match:
+        return request.if_none_match.contains_weak(etag)
+    if last_modified is not None and request.if_modified_since is not None:
+        # HTTP dates have whole-second precision
+        return last_modified.replace(microsecond=0, tzinfo=None) <= request.if_modified_since.replace(tzinfo=None)
+    return False
+
+
+def conditional_json(etag, build, max_age=0, public=True, last_modified=None):
+    """
+    Return a 304 when the client's copy is current, else jsonify(build())
+    Either way the response carries the validators and a Cache-Control header;
+    max_age=0 makes clients revalidate on every use. Private responses
+    (per-user data) must not be stored by shared caches.
+    """
+    if is_not_modified(etag, last_modified):
+        response = current_app.response_class(status=304)
+    else:
+        response = jsonify(build())
+    response.set_etag(etag, weak=True)
+    if last_modified is not None:
+        response.last_modified = last_modified
+    if public:
+        response.cache_control.public = True
+    else:
+        response.cache_control.private = True
+    response.cache_control.max_age = max_age
+    return response
@@ -0,0 +1,125 @@
+"""
+Index advisor
+Replays the query shapes the API issues on its hot paths through the
+database's planner and reports every full table scan, so a missing index
+shows up before the table is large enough to hurt.
+
+- SQLite:     EXPLAIN QUERY PLAN, a bare "SCAN <table>" is a full scan
+- PostgreSQL: EXPLAIN (FORMAT JSON), every "Seq Scan" node is reported.
+              On small tables the planner prefers a seq scan even when an
+              index exists, so run it against production-sized data (or
+              after ANALYZE) before acting on the report.
+
+Other databases raise UnsupportedDatabase.
+
+Run it with: flask index-advisor
+"""
+import json
+import re
+from datetime import datetime, timedelta
+from sqlalchemy import select
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+from app.models.payment import Payment
+
+_SAMPLE_TIME = datetime(2026, 1, 1, 9, 0)
+
+
+class UnsupportedDatabase(ValueError):
+    """Raised for a database whose query plans the advisor cannot read"""
+
+
+def _query_shapes():
+    """(name, statement) pairs mirroring the filters and sort orders of the routes"""
+    active = [BookingStatus.CONFIRMED, BookingStatus.IN_PROGRESS]
+    return [
+        ('user by email (login)',
+         select(User).where(User.email == 'someone@example.com')),
+        ('users of a role, newest first',
+         select(User).where(User.role == RoleEnum.PROVIDER).order_by(User.created_at.desc()).limit(10)),
+        ('available providers of a category',
+         select(ProviderProfile).where(ProviderProfile.is_available.is_(True),
+                                       ProviderProfile.service_category_id == 1).limit(10)),
+        ('provider profile of a user',
+         select(ProviderProfile).where(ProviderProfile.user_id == 1)),
+        ('providers in a geohash block',
+         select(ProviderProfile).where(ProviderProfile.geohash_5.in_(['kzf0x', 'kzf0z', 'kzf18']))),
+        ('provider active bookings in a window',
+         select(Booking).where(Booking.provider_id == 1, Booking.status.in_(active),
+                               Booking.scheduled_date.between(_SAMPLE_TIME, _SAMPLE_TIME + timedelta(days=1)))),
+        ('provider bookings overlapping a slot',
+         select(Booking).where(Booking.provider_id == 1, Booking.scheduled_date > _SAMPLE_TIME - timedelta(days=1),
+                               Booking.scheduled_date < _SAMPLE_TIME + timedelta(hours=2),
+                               Booking.ends_at > _SAMPLE_TIME)),
+        ('client bookings, newest first',
+         select(Booking).where(Booking.client_id == 1)
+         .order_by(Booking.created_at.desc(), Booking.id.desc()).limit(10)),
+        ('provider bookings, newest first',
+         select(Booking).where(Booking.provider_id == 1)
+         .order_by(Booking.created_at.desc(), Booking.id.desc()).limit(10)),
+        ('all bookings, keyset page',
+         select(Booking).where(Booking.created_at < _SAMPLE_TIME)
+         .order_by(Booking.created_at.desc(), Booking.id.desc()).limit(10)),
+        ('provider reviews, newest first',
+         select(Review).where(Review.provider_id == 1)
+         .order_by(Review.created_at.desc(), Review.id.desc()).limit(10)),
+        ('client reviews, newest first',
+         select(Review).where(Review.client_id == 1)
+         .order_by(Review.created_at.desc(), Review.id.desc()).limit(10)),
+        ('review of a booking',
+         select(Review).where(Review.booking_id == 1)),
+        ('payment by M-Pesa checkout id (callback)',
+         select(Payment).where(Payment.mpesa_checkout_request_id == 'ws_CO_0000')),
+    ]
+
+
+def _sqlite_scans(connection, sql):
+    rows = connection.exec_driver_sql(f'EXPLAIN QUERY PLAN {sql}').fetchall()
+    scans = []
+    for row in rows:
+        detail = row[-1]
+        match = re.match(r'SCAN (?:TABLE )?(\w+)', detail)
+        if match and 'USING' not in detail:
+            scans.append(match.group(1))
+    return scans
+
+
+def _postgres_scans(connection, sql):
+    plan = connection.exec_driver_sql(f'EXPLAIN (FORMAT JSON) {sql}').scalar()
+    if isinstance(plan, str):
+        plan = json.loads(plan)
+
+    scans = []
+
+    def walk(node):
+        if node.get('Node Type') == 'Seq Scan':
+            scans.append(node.get('Relation Name'))
+        for child in node.get('Plans', []):
+            walk(child)
+
+    walk(plan[0]['Plan'])
+    return scans
+
+
+def find_sequential_scans(statement, connection=None):
+    """Return the tables a statement would read with a full scan"""
+    connection = connection or db.session.connection()
+    dialect = connection.dialect
+    sql = str(statement.compile(dialect=dialect, compile_kwargs={'literal_binds': True}))
+    if dialect.name == 'sqlite':
+        return _sqlite_scans(connection, sql)
+    if dialect.name == 'postgresql':
+        return _postgres_scans(connection, sql)
+    raise UnsupportedDatabase(f'Unsupported database {dialect.name}: the index advisor reads SQLite and PostgreSQL plans only')
+
+
+def analyze_query_shapes(shapes=None):
+    """
+    Explain every query shape; returns a list of
+    {'query': name, 'sequential_scans': [table, ...]}
+    """
+    shapes = shapes if shapes is not None else _query_shapes()
+    return [{'query': name, 'sequential_scans': find_sequential_scans(statement)} for name, statement in shapes]
@@ -0,0 +1,46 @@
+"""
+In-process LRU cache with per-entry TTL
+Shared by the geocoding cache and the pagination count cache.
+"""
+import threading
+import time
+from collections import OrderedDict
+
+# Marker for "not in cache" so a cached None can be told apart from a miss
+MISSING = object()
+
+
+class LRUCache:
+    """Thread-safe LRU cache where every entry carries its own expiry time"""
+
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._entries = OrderedDict()  # key -> (value, expires_at monotonic seconds)
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        """Return the cached value, or MISSING when absent or expired"""
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return MISSING
+            value, expires_at = entry
+            if expires_at <= time.monotonic():
+                del self._entries[key]
+                return MISSING
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key, value, ttl):
+        with self._lock:
+            self._entries[key] = (value, time.monotonic() + ttl)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)  # evict least recently used
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def __len__(self):
+        return len(self._entries)
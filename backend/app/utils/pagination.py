@@ -0,0 +1,146 @@
+"""
+Pagination for list endpoints
+Two modes share one response shape:
+
+- page mode (default, ?page=N&per_page=M): LIMIT/OFFSET plus a COUNT(*) for
+  total/pages. Simple, but page N has to skip every earlier row.
+- cursor mode (opt-in, ?cursor= then ?cursor=<next_cursor>): keyset pagination.
+  A page is fetched with WHERE (created_at, id) < (last seen values) ORDER BY
+  created_at DESC, id DESC LIMIT n, which a composite index on the sort
+  columns answers by reading exactly n rows - page 1000 costs the same as
+  page 1. The total is only counted when asked for with ?with_total=1.
+
+How the total is counted (exact, cached, planner estimate or not at all) is
+chosen per request, see app/utils/counting.py.
+
+Cursors are the sort values of the last row of a page, signed with the app's
+SECRET_KEY and bound to the endpoint that issued them, so clients cannot
+forge or replay them against another listing.
+"""
+from datetime import datetime
+from flask import current_app, request
+from itsdangerous import BadSignature, URLSafeSerializer
+from sqlalchemy import and_, or_
+from app.utils.counting import count_total, resolve_strategy
+
+
+class InvalidCursor(ValueError):
+    """Raised when a cursor token is malformed, tampered with or issued elsewhere"""
+
+
+def _encode_value(value):
+    if isinstance(value, datetime):
+        return {'dt': value.isoformat()}
+    return value
+
+
+def _decode_value(value):
+    if isinstance(value, dict) and 'dt' in value:
+        return datetime.fromisoformat(value['dt'])
+    return value
+
+
+def _serializer(scope):
+    return URLSafeSerializer(current_app.config['SECRET_KEY'], salt=f'cursor:{scope}')
+
+
+def encode_cursor(values, scope='default'):
+    """Encode a row's sort values as a signed, opaque cursor token"""
+    return _serializer(scope).dumps([_encode_value(v) for v in values])
+
+
+def decode_cursor(token, scope='default'):
+    """Verify a cursor token and return its list of sort values"""
+    try:
+        values = _serializer(scope).loads(token)
+        if not isinstance(values, list):
+            raise InvalidCursor('Invalid cursor')
+        return [_decode_value(v) for v in values]
+    except (BadSignature, ValueError, TypeError) as e:
+        raise InvalidCursor('Invalid cursor') from e
+
+
+def keyset_after(columns, values, descending=True):
+    """
+    Condition selecting the rows that follow values in the sort order on columns
+    Written as nested OR/AND so it runs on every database and can use a
+    composite index on the columns.
+    """
+    column, value = columns[0], values[0]
+    after = column < value if descending else column > value
+    if len(columns) == 1:
+        return after
+    return or_(after, and_(column == value, keyset_after(columns[1:], values[1:], descending)))
+
+
+def _default_row_values(columns):
+    return lambda row: [getattr(row, column.key) for column in columns]
+
+
+def keyset_page(query, columns, per_page, cursor=None, descending=True, row_values=None, scope='default'):
+    """
+    Fetch one page ordered by columns (DESC by default), starting after cursor
+    Returns (items, next_cursor); next_cursor is None on the last page.
+    row_values(row) extracts the sort values from a result row; by default
+    rows are model instances exposing the columns by name.
+    """
+    row_values = row_values or _default_row_values(columns)
+    if cursor:
+        values = decode_cursor(cursor, scope)
+        if len(values) != len(columns):
+            raise InvalidCursor('Invalid cursor')
+        query = query.filter(keyset_after(columns, values, descending))
+
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*ordering).limit(per_page + 1).all()
+    items = rows[:per_page]
+    next_cursor = encode_cursor(row_values(items[-1]), scope) if len(rows) > per_page else None
+    return items, next_cursor
+
+
+def paginate(query, columns, descending=True, row_values=None, total=None, count=None):
+    """
+    Paginate a listing query according to the request arguments
+    Reads page, per_page, cursor, count and with_total from the query string
+    and returns (items, pagination) where pagination is the response dict.
+    Pass total when it is already known to skip counting, and count to set the
+    endpoint's default count strategy (see app/utils/counting.py).
+    Raises InvalidCursor for a bad cursor.
+    """
+    page = request.args.get('page', 1, type=int)
+    per_page = max(request.args.get('per_page', 10, type=int), 1)
+    scope = request.endpoint or 'default'
+    row_values = row_values or _default_row_values(columns)
+    strategy = 'provided'
+
+    if 'cursor' in request.args:
+        items, next_cursor = keyset_page(query, columns, per_page, request.args.get('cursor'),
+                                         descending, row_values, scope)
+        if total is None:
+            # Cursor mode only counts when the client asks for a total
+            wants_total = request.args.get('with_total', type=int) or 'count' in request.args
+            total, strategy = count_total(query, resolve_strategy(count) if wants_total else 'none')
+        return items, {
+            'page': None,
+            'per_page': per_page,
+            'total': total,
+            'pages': (total + per_page - 1) // per_page if total is not None else None,
+            'count': strategy,
+            'next_cursor': next_cursor
+        }
+
+    page = max(page, 1)
+    ordering = [column.desc() if descending else column.asc() for column in columns]
+    rows = query.order_by(None).order_by(*ordering).offset((page - 1) * per_page).limit(per_page + 1).all()
+    items = rows[:per_page]
+    if total is None:
+        total, strategy = count_total(query, resolve_strategy(count))
+    return items, {
+        'page': page,
+        'per_page': per_page,
+        'total': total,
+        'pages': (total + per_page - 1) // per_page if total is not None else None,
+        'count': strategy,
+        # Lets a client switch to cursor mode from any page
+        'next_cursor': encode_cursor(row_values(items[-1]), scope) if len(rows) > per_page else None
+    }
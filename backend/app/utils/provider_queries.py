@@ -0,0 +1,72 @@
+"""
+Provider listing repository
+Loads provider profiles together with their user in a fixed number of
+queries, and serializes a whole page in one pass. Users shared by several
+rows are serialized once and reused; service categories come from the
+in-process catalogue (app/utils/category_cache.py).
+"""
+from sqlalchemy import func, select
+from sqlalchemy.orm import joinedload
+from app.models.provider_profile import ProviderProfile
+from app.models.booking import Booking
+from app.models.reviews import Review
+from app.utils.category_cache import catalogue
+
+
+def provider_query(query=None):
+    """ProviderProfile query that eager-loads the user"""
+    query = query if query is not None else ProviderProfile.query
+    return query.options(joinedload(ProviderProfile.user))
+
+
+def with_activity_counts(query):
+    """
+    Add booking_count and review_count columns to a ProviderProfile query
+    Each count is a scalar subquery correlated on the provider's user id, so
+    it is evaluated for the rows of the page only and answered from the
+    provider_id indexes of bookings and reviews, instead of grouping both
+    tables whole on every request. Rows are returned as
+    (provider, booking_count, review_count).
+    """
+    booking_count = select(func.count(Booking.id)).where(
+        Booking.provider_id == ProviderProfile.user_id
+    ).correlate(ProviderProfile).scalar_subquery()
+    review_count = select(func.count(Review.id)).where(
+        Review.provider_id == ProviderProfile.user_id
+    ).correlate(ProviderProfile).scalar_subquery()
+
+    return query.add_columns(
+        booking_count.label('booking_count'),
+        review_count.label('review_count')
+    )
+
+
+def serialize_providers(providers, distances=None):
+    """
+    Serialize a list of provider profiles with their user and service category
+    distances, when given, is a list of km values (or None) aligned with providers
+    and is exposed as 'distance_km'.
+    """
+    users = {}
+    categories = catalogue().by_id
+    result = []
+    for index, provider in enumerate(providers):
+        provider_data = provider.to_dict()
+
+        if provider.user_id not in users:
+            users[provider.user_id] = provider.user.to_dict() if provider.user else None
+        provider_data['user'] = users[provider.user_id]
+
+        provider_data['service_category'] = categories.get(provider.service_category_id)
+
+        if distances is not None:
+            distance = distances[index]
+            provider_data['distance_km'] = round(distance, 2) if distance is not None else None
+
+        result.append(provider_data)
+    return result
+
+
+def serialize_provider(provider):
+    """Single-provider form of serialize_providers"""
+    return serialize_providers([provider])[0]
@@ -0,0 +1,235 @@
+"""
+Full-text search index for provider profiles
+Provider search used to OR four ILIKE '%term%' predicates over the business
+name, description and the user's names - a full scan of both tables on every
+search. The search terms are now matched against an index instead:
+
+- PostgreSQL: provider_profiles.search_vector (tsvector, GIN index), weighted
+  A = business name, B = first/last name, C = description
+- SQLite:     provider_search FTS5 table whose rowid is the profile id
+
+Every term is a prefix match ("plumb" finds "Plumbing Pros") and all terms
+must match. Results carry a relevance score where higher is better.
+
+The index is kept in sync by a session listener: any flush that inserts or
+changes a profile's text, or renames its user, rewrites that profile's
+index entry in the same transaction. Other databases, or a SQLite build
+without FTS5, fall back to the ILIKE predicates.
+"""
+import logging
+import re
+import weakref
+from sqlalchemy import DDL, Float, Integer, bindparam, column, event, inspect, literal_column, or_, text
+from sqlalchemy.exc import DBAPIError
+from sqlalchemy.orm import Session
+from app import db
+from app.models.provider_profile import ProviderProfile
+from app.models.user import User
+
+logger = logging.getLogger(__name__)
+
+FTS_TABLE = 'provider_search'
+
+# Profile and user attributes that feed the index
+PROFILE_FIELDS = ('business_name', 'description', 'user_id')
+USER_FIELDS = ('first_name', 'last_name')
+
+# bm25 column weights for SQLite: business_name, description, first_name, last_name
+SQLITE_WEIGHTS = (10.0, 2.0, 5.0, 5.0)
+
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(p.business_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(p.description, '')), 'C')"
+)
+
+# ----- schema -----
+
+SQLITE_CREATE = (
+    f"CREATE VIRTUAL TABLE IF NOT EXISTS {FTS_TABLE} "
+    "USING fts5(business_name, description, first_name, last_name, tokenize = 'unicode61 remove_diacritics 2')"
+)
+SEARCH_VECTOR_INDEX = 'ix_provider_profiles_search_vector'
+POSTGRES_CREATE = [
+    'ALTER TABLE provider_profiles ADD COLUMN IF NOT EXISTS search_vector tsvector',
+    f'CREATE INDEX IF NOT EXISTS {SEARCH_VECTOR_INDEX} ON provider_profiles USING GIN (search_vector)',
+]
+
+
+def _create_index_storage(target, connection, **kw):
+    """Create the search index next to provider_profiles (db.create_all / tests)"""
+    try:
+        if connection.dialect.name == 'sqlite':
+            connection.execute(DDL(SQLITE_CREATE))
+        elif connection.dialect.name == 'postgresql':
+            for statement in POSTGRES_CREATE:
+                connection.execute(DDL(statement))
+    except DBAPIError as e:
+        logger.warning('Provider search index not created, falling back to ILIKE: %s', e)
+
+
+def _drop_index_storage(target, connection, **kw):
+    if connection.dialect.name == 'sqlite':
+        connection.execute(DDL(f'DROP TABLE IF EXISTS {FTS_TABLE}'))
+
+
+event.listen(ProviderProfile.__table__, 'after_create', _create_index_storage)
+event.listen(ProviderProfile.__table__, 'before_drop', _drop_index_storage)
+
+
+def is_index_storage(type_, name, table_name=None):
+    """
+    Whether a reflected schema object belongs to the search index
+    The FTS5 table (and its shadow tables), search_vector and its GIN index
+    are not on any model; migrations/env.py uses this to keep autogenerate
+    from dropping them.
+    """
+    if type_ == 'table':
+        return name == FTS_TABLE or name.startswith(f'{FTS_TABLE}_')
+    if type_ == 'column':
+        return table_name == 'provider_profiles' and name == 'search_vector'
+    if type_ == 'index':
+        return name == SEARCH_VECTOR_INDEX
+    return False
+
+
+def search_backend(connection):
+    """Return 'postgres', 'fts5' or None (ILIKE fallback) for a connection"""
+    name = connection.dialect.name
+    if name == 'postgresql':
+        return 'postgres' if 'search_vector' in {c['name'] for c in inspect(connection).get_columns('provider_profiles')} else None
+    if name == 'sqlite':
+        exists = connection.execute(
+            text("SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = :name"), {'name': FTS_TABLE}
+        ).first()
+        return 'fts5' if exists else None
+    return None
+
+
+# Keyed on the engine itself: an engine that is disposed and collected (a
+# recreated in-memory database, say) takes its entry with it
+_backend_cache = weakref.WeakKeyDictionary()
+
+
+def _cached_backend(session):
+    connection = session.connection()
+    engine = connection.engine
+    if engine not in _backend_cache:
+        _backend_cache[engine] = search_backend(connection)
+    return _backend_cache[engine]
+
+
+# ----- sync -----
+
+def reindex(session, profile_ids=(), user_ids=()):
+    """Rewrite the index entries of the given profiles and of the profiles owned by user_ids"""
+    profile_ids, user_ids = list(profile_ids), list(user_ids)
+    if not profile_ids and not user_ids:
+        return
+    backend = _cached_backend(session)
+    params = {'profile_ids': profile_ids, 'user_ids': user_ids}
+    expanding = [bindparam('profile_ids', expanding=True), bindparam('user_ids', expanding=True)]
+    where = '(p.id IN :profile_ids OR p.user_id IN :user_ids)'
+
+    if backend == 'fts5':
+        session.execute(text(
+            f'DELETE FROM {FTS_TABLE} WHERE rowid IN '
+            f'(SELECT p.id FROM provider_profiles p WHERE {where}) OR rowid IN :profile_ids'
+        ).bindparams(*expanding), params)
+        session.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, business_name, description, first_name, last_name) "
+            f"SELECT p.id, p.business_name, coalesce(p.description, ''), u.first_name, u.last_name "
+            f"FROM provider_profiles p JOIN users u ON u.id = p.user_id WHERE {where}"
+        ).bindparams(*expanding), params)
+    elif backend == 'postgres':
+        session.execute(text(
+            f'UPDATE provider_profiles p SET search_vector = {POSTGRES_VECTOR} '
+            f'FROM users u WHERE u.id = p.user_id AND {where}'
+        ).bindparams(*expanding), params)
+
+
+def rebuild_index(session=None):
+    """Rebuild the whole search index from provider_profiles and users"""
+    session = session or db.session
+    backend = _cached_backend(session)
+    if backend == 'fts5':
+        session.execute(text(f'DELETE FROM {FTS_TABLE}'))
+        session.execute(text(
+            f"INSERT INTO {FTS_TABLE} (rowid, business_name, description, first_name, last_name) "
+            f"SELECT p.id, p.business_name, coalesce(p.description, ''), u.first_name, u.last_name "
+            f"FROM provider_profiles p JOIN users u ON u.id = p.user_id"
+        ))
+    elif backend == 'postgres':
+        session.execute(text(
+            f'UPDATE provider_profiles p SET search_vector = {POSTGRES_VECTOR} FROM users u WHERE u.id = p.user_id'
+        ))
+    return backend
+
+
+def _changed(obj, fields):
+    state = inspect(obj)
+    return any(state.attrs[field].history.has_changes() for field in fields)
+
+
+@event.listens_for(Session, 'after_flush')
+def _sync_search_index(session, flush_context):
+    profile_ids = set()
+    user_ids = set()
+    for obj in session.new:
+        if isinstance(obj, ProviderProfile):
+            profile_ids.add(obj.id)
+    for obj in session.dirty:
+        if isinstance(obj, ProviderProfile) and _changed(obj, PROFILE_FIELDS):
+            profile_ids.add(obj.id)
+        elif isinstance(obj, User) and _changed(obj, USER_FIELDS):
+            user_ids.add(obj.id)
+    for obj in session.deleted:
+        if isinstance(obj, ProviderProfile):
+            profile_ids.add(obj.id)  # row is gone, so only its FTS entry is removed
+    if profile_ids or user_ids:
+        reindex(session, profile_ids, user_ids)
+
+
+# ----- querying -----
+
+def search_terms(term):
+    """Split user input into lowercase word tokens (no query syntax passes through)"""
+    return re.findall(r'\w+', (term or '').lower())
+
+
+def apply_search(query, term):
+    """
+    Restrict a ProviderProfile query to providers matching term
+    Returns (query, relevance) where relevance is a column expression to sort
+    on (higher is better), or None when the ILIKE fallback was used.
+    """
+    tokens = search_terms(term)
+    if not tokens:
+        return query, None
+
+    backend = _cached_backend(db.session)
+    if backend == 'fts5':
+        match = ' '.join(f'"{token}"*' for token in tokens)
+        weights = ', '.join(str(w) for w in SQLITE_WEIGHTS)
+        matches = text(
+            f'SELECT rowid AS profile_id, -bm25({FTS_TABLE}, {weights}) AS relevance '
+            f'FROM {FTS_TABLE} WHERE {FTS_TABLE} MATCH :match'
+        ).bindparams(match=match).columns(
+            column('profile_id', Integer), column('relevance', Float)
+        ).subquery('provider_matches')
+        relevance = matches.c.relevance
+        return query.join(matches, matches.c.profile_id == ProviderProfile.id), relevance
+
+    if backend == 'postgres':
+        tsquery = db.func.to_tsquery('simple', ' & '.join(f'{token}:*' for token in tokens))
+        vector = literal_column('provider_profiles.search_vector')
+        relevance = db.func.ts_rank_cd(vector, tsquery)
+        return query.filter(vector.op('@@')(tsquery)), relevance
+
+    pattern = f'%{term}%'
+    return query.join(User, User.id == ProviderProfile.user_id).filter(or_(
+        ProviderProfile.business_name.ilike(pattern),
+        ProviderProfile.description.ilike(pattern),
+        User.first_name.ilike(pattern),
+        User.last_name.ilike(pattern)
+    )), None
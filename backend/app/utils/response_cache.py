@@ -0,0 +1,386 @@
+"""
+Shared response cache for anonymous public endpoints
+Public listings (providers, provider details, reviews, categories) are read
+far more often than they change, and marketing pushes send bursts of
+identical anonymous requests. Whole JSON responses are cached in two tiers:
+
+- local:  in-process LRU, checked first, entries live RESPONSE_CACHE_LOCAL_TTL
+          seconds (RESPONSE_CACHE_TTL when there is no shared tier)
+- shared: a store all workers see, picked with RESPONSE_CACHE_BACKEND:
+          memory (default, no shared tier), sqlite (a file at
+          RESPONSE_CACHE_URL, for single-host deployments and development),
+          redis (RESPONSE_CACHE_URL is the Redis URL, needs the redis package)
+          or none (caching disabled)
+
+The key is the endpoint, its URL arguments and the query string in canonical
+order. Every entry carries tags ('providers', 'provider:12', 'categories', ...)
+and the tag versions it was built under; committing a write to providers,
+reviews or categories increments the versions of the tags it touches, which
+turns every dependent entry stale at once. Other workers' local tiers notice
+within RESPONSE_CACHE_LOCAL_TTL seconds.
+
+Only anonymous GETs answered with 200 are cached; responses keep their
+ETag, so a cached hit still answers If-None-Match with a 304.
+"""
+import hashlib
+import json
+import logging
+import os
+import sqlite3
+import threading
+import time
+from functools import wraps
+from flask import current_app, has_app_context, request
+from sqlalchemy import event, select
+from sqlalchemy.orm import Session
+from app.models.provider_profile import ProviderProfile
+from app.models.reviews import Review
+from app.models.service_category import ServiceCategory
+from app.models.user import User
+from app.utils.lru import LRUCache, MISSING
+from app.utils.settings import setting
+
+logger = logging.getLogger(__name__)
+
+# Response headers kept with a cached body
+CACHED_HEADERS = ('Content-Type', 'ETag', 'Last-Modified', 'Cache-Control')
+
+
+# ----- shared stores -----
+
+class CacheStore:
+    """Interface of the shared tier: string values with a TTL and tag version counters"""
+    name = 'base'
+
+    def get(self, key):
+        raise NotImplementedError
+
+    def set(self, key, value, ttl):
+        raise NotImplementedError
+
+    def tag_versions(self, tags):
+        """{tag: version} for the given tags, 0 for tags never bumped"""
+        raise NotImplementedError
+
+    def bump_tags(self, tags):
+        raise NotImplementedError
+
+    def clear(self):
+        raise NotImplementedError
+
+
+class SQLiteStore(CacheStore):
+    """Shared tier in a local SQLite file - every worker on the host opens the same file"""
+    name = 'sqlite'
+    purge_every = 500  # sets between sweeps of expired entries
+
+    def __init__(self, path):
+        self.path = path
+        self._local = threading.local()
+        self._sets = 0
+        with self._connection() as connection:
+            connection.execute('CREATE TABLE IF NOT EXISTS response_cache '
+                               '(key TEXT PRIMARY KEY, value TEXT NOT NULL, expires_at REAL NOT NULL)')
+            connection.execute('CREATE TABLE IF NOT EXISTS response_cache_tags '
+                               '(tag TEXT PRIMARY KEY, version INTEGER NOT NULL)')
+
+    def _connection(self):
+        connection = getattr(self._local, 'connection', None)
+        if connection is None:
+            connection = sqlite3.connect(self.path, timeout=5)
+            connection.execute('PRAGMA journal_mode=WAL')
+            self._local.connection = connection
+        return connection
+
+    def get(self, key):
+        row = self._connection().execute(
+            'SELECT value FROM response_cache WHERE key = ? AND expires_at > ?', (key, time.time())
+        ).fetchone()
+        return row[0] if row else None
+
+    def set(self, key, value, ttl):
+        with self._connection() as connection:
+            connection.execute('INSERT OR REPLACE INTO response_cache (key, value, expires_at) VALUES (?, ?, ?)',
+                               (key, value, time.time() + ttl))
+            self._sets += 1
+            if self._sets % self.purge_every == 0:
+                connection.execute('DELETE FROM response_cache WHERE expires_at <= ?', (time.time(),))
+
+    def tag_versions(self, tags):
+        tags = list(tags)
+        if not tags:
+            return {}
+        placeholders = ', '.join('?' for _ in tags)
+        rows = self._connection().execute(
+            f'SELECT tag, version FROM response_cache_tags WHERE tag IN ({placeholders})', tags
+        ).fetchall()
+        versions = dict(rows)
+        return {tag: versions.get(tag, 0) for tag in tags}
+
+    def bump_tags(self, tags):
+        with self._connection() as connection:
+            connection.executemany(
+                'INSERT INTO response_cache_tags (tag, version) VALUES (?, 1) '
+                'ON CONFLICT(tag) DO UPDATE SET version = version + 1',
+                [(tag,) for tag in tags]
+            )
+
+    def clear(self):
+        with self._connection() as connection:
+            connection.execute('DELETE FROM response_cache')
+
+
+class RedisStore(CacheStore):
+    """Shared tier in Redis, for deployments spanning several hosts"""
+    name = 'redis'
+    prefix = 'joblink:response:'
+
+    def __init__(self, url):
+        try:
+            import redis
+        except ImportError as e:
+            raise RuntimeError('RESPONSE_CACHE_BACKEND=redis needs the redis package') from e
+        self.client = redis.Redis.from_url(url)
+
+    def get(self, key):
+        value = self.client.get(self.prefix + key)
+        return value.decode() if value is not None else None
+
+    def set(self, key, value, ttl):
+        self.client.set(self.prefix + key, value, ex=int(ttl))
+
+    def tag_versions(self, tags):
+        tags = list(tags)
+        if not tags:
+            return {}
+        values = self.client.mget([f'{self.prefix}tag:{tag}' for tag in tags])
+        return {tag: int(value or 0) for tag, value in zip(tags, values)}
+
+    def bump_tags(self, tags):
+        pipeline = self.client.pipeline()
+        for tag in tags:
+            pipeline.incr(f'{self.prefix}tag:{tag}')
+        pipeline.execute()
+
+    def clear(self):
+        keys = [key for key in self.client.scan_iter(f'{self.prefix}*') if b':tag:' not in key]
+        if keys:
+            self.client.delete(*keys)
+
+
+# ----- two-tier cache -----
+
+class ResponseCache:
+    """Local LRU in front of an optional shared store, with tag invalidation"""
+
+    def __init__(self, store=None, ttl=60, local_ttl=5, local_size=1000):
+        self.store = store
+        self.ttl = ttl
+        self.local_ttl = local_ttl if store is not None else ttl
+        self.local = LRUCache(local_size)
+        self._local_tags = {}
+        self._lock = threading.Lock()
+
+    def _local_versions(self, tags):
+        with self._lock:
+            return {tag: self._local_tags.get(tag, 0) for tag in tags}
+
+    def _shared(self, operation, *args, default=None):
+        """Run a store operation; an unreachable store behaves like an empty one"""
+        try:
+            return getattr(self.store, operation)(*args)
+        except Exception as e:
+            logger.warning('Response cache store %s failed: %s', operation, e)
+            return default
+
+    def versions(self, tags):
+        """Tag versions to build an entry under - read them before building the response"""
+        shared = self._shared('tag_versions', tags, default=None) if self.store is not None else {}
+        return {'local': self._local_versions(tags), 'shared': shared}
+
+    def get(self, key):
+        """Return (entry, tier) or (None, None)"""
+        hit = self.local.get(key)
+        if hit is not MISSING:
+            entry, local_versions = hit
+            if local_versions == self._local_versions(local_versions):
+                return entry, 'local'
+
+        if self.store is None:
+            return None, None
+        raw = self._shared('get', key)
+        if raw is None:
+            return None, None
+        entry = json.loads(raw)
+        tags = entry['tags']
+        if self._shared('tag_versions', list(tags), default=None) != tags:
+            return None, None
+        self.local.set(key, (entry, self._local_versions(tags)), self.local_ttl)
+        return entry, 'shared'
+
+    def set(self, key, entry, versions):
+        """Store entry (body, status, headers) built under versions (see versions())"""
+        if versions['shared'] is None:
+            return  # store unreachable when the response was built
+        entry = dict(entry, tags=versions['shared'] if self.store is not None else versions['local'])
+        self.local.set(key, (entry, versions['local']), self.local_ttl)
+        if self.store is not None:
+            self._shared('set', key, json.dumps(entry), self.ttl)
+
+    def invalidate(self, tags):
+        tags = sorted(set(tags))
+        if not tags:
+            return
+        with self._lock:
+            for tag in tags:
+                self._local_tags[tag] = self._local_tags.get(tag, 0) + 1
+        if self.store is not None:
+            self._shared('bump_tags', tags)
+
+    def clear(self):
+        self.local.clear()
+        if self.store is not None:
+            self._shared('clear')
+
+
+def _create_cache(app):
+    backend = app.config.get('RESPONSE_CACHE_BACKEND', setting('RESPONSE_CACHE_BACKEND'))
+    url = app.config.get('RESPONSE_CACHE_URL')
+    if backend == 'none':
+        return None
+    if backend == 'memory':
+        store = None
+    elif backend == 'sqlite':
+        store = SQLiteStore(url or os.path.join(app.instance_path, 'response_cache.sqlite3'))
+    elif backend == 'redis':
+        store = RedisStore(url or 'redis://localhost:6379/0')
+    else:
+        raise ValueError(f'Unknown response cache backend: {backend}')
+    return ResponseCache(store, ttl=setting('RESPONSE_CACHE_TTL'), local_ttl=setting('RESPONSE_CACHE_LOCAL_TTL'),
+                         local_size=setting('RESPONSE_CACHE_LOCAL_SIZE'))
+
+
+_create_lock = threading.Lock()
+
+
+def get_response_cache():
+    """The current app's ResponseCache, or None when caching is disabled"""
+    app = current_app._get_current_object()
+    with _create_lock:
+        if 'response_cache' not in app.extensions:
+            app.extensions['response_cache'] = _create_cache(app)
+    return app.extensions['response_cache']
+
+
+# ----- view decorator -----
+
+def cache_key():
+    """Endpoint, URL arguments and non-empty query arguments in canonical order"""
+    args = sorted((key, value.strip()) for key, value in request.args.items(multi=True) if value.strip())
+    raw = json.dumps([request.endpoint, sorted(request.view_args.items()), args])
+    return hashlib.sha1(raw.encode()).hexdigest()
+
+
+def cached_response(tags):
+    """
+    Cache an anonymous GET endpoint's 200 responses
+    tags(**view_args) returns the tags of the response, e.g.
+    lambda provider_id: [f'provider:{provider_id}'].
+    """
+    def decorator(view):
+        @wraps(view)
+        def wrapper(*args, **kwargs):
+            cache = get_response_cache()
+            if cache is None or request.method != 'GET' or 'Authorization' in request.headers:
+                return view(*args, **kwargs)
+
+            key = cache_key()
+            entry, tier = cache.get(key)
+            if entry is not None:
+                response = current_app.response_class(entry['body'], status=entry['status'], headers=entry['headers'])
+                response.headers['X-Cache'] = f'HIT-{tier}'
+                return response.make_conditional(request)
+
+            versions = cache.versions(tags(**kwargs))
+            response = current_app.make_response(view(*args, **kwargs))
+            if response.status_code == 200 and not response.direct_passthrough:
+                cache.set(key, {
+                    'body': response.get_data(as_text=True),
+                    'status': 200,
+                    'headers': [[name, response.headers[name]] for name in CACHED_HEADERS if name in response.headers]
+                }, versions)
+            response.headers['X-Cache'] = 'MISS'
+            return response
+        return wrapper
+    return decorator
+
+
+# ----- invalidation -----
+
+def _write_tags(session):
+    """Tags of the public responses affected by the pending changes of a flush"""
+    tags = set()
+    user_ids = set()
+    for obj in list(session.new) + list(session.dirty) + list(session.deleted):
+        if isinstance(obj, ProviderProfile):
+            # The reviews page embeds the profile's rating summary
+            tags.update(('providers', f'provider:{obj.id}', f'provider-reviews:{obj.user_id}'))
+        elif isinstance(obj, Review):
+            tags.update(('providers', f'provider:{obj.provider_profile_id}', f'provider-reviews:{obj.provider_id}'))
+        elif isinstance(obj, ServiceCategory):
+            tags.add('categories')
+        elif isinstance(obj, User) and obj not in session.new:
+            user_ids.add(obj.id)
+    if user_ids:
+        # Provider responses embed the owner's user record
+        profile_ids = session.execute(
+            select(ProviderProfile.id).where(ProviderProfile.user_id.in_(user_ids))
+        ).scalars().all()
+        if profile_ids:
+            tags.add('providers')
+            tags.update(f'provider:{profile_id}' for profile_id in profile_ids)
+        # Reviews pages embed their reviewers' names
+        reviewed = session.execute(
+            select(Review.provider_id).where(Review.client_id.in_(user_ids)).distinct()
+        ).scalars().all()
+        tags.update(f'provider-reviews:{provider_id}' for provider_id in reviewed)
+    return tags
+
+
+@event.listens_for(Session, 'after_flush')
+def _collect_write_tags(session, flush_context):
+    tags = _write_tags(session)
+    if tags:
+        session.info.setdefault('response_cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _collect_bulk_write_tags(orm_execute_state):
+    # Bulk UPDATE/DELETE (rating aggregates, repairs) - the rows are unknown,
+    # so every response built from the table goes stale
+    if not (orm_execute_state.is_update or orm_execute_state.is_delete):
+        return
+    mapper = orm_execute_state.bind_mapper
+    table = mapper.local_table.name if mapper is not None else None
+    tags = {
+        'provider_profiles': {'providers', 'provider-details', 'provider-reviews'},
+        'reviews': {'providers', 'provider-details', 'provider-reviews'},
+        'service_categories': {'categories'},
+    }.get(table)
+    if tags:
+        orm_execute_state.session.info.setdefault('response_cache_tags', set()).update(tags)
+
+
+@event.listens_for(Session, 'after_commit')
+def _invalidate_committed(session):
+    # Invalidate only once the write is visible, so no worker can cache the old data again
+    tags = session.info.pop('response_cache_tags', None)
+    if tags and has_app_context():
+        cache = get_response_cache()
+        if cache is not None:
+            cache.invalidate(tags)
+
+
+@event.listens_for(Session, 'after_rollback')
+def _discard_write_tags(session):
+    session.info.pop('response_cache_tags', None)
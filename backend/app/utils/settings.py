@@ -0,0 +1,16 @@
+"""
+Tunable settings of the utility modules
+The defaults live in one place, the Config class in config.py. Inside an
+application context the app's config wins; outside one (scripts, module
+level setup, unit tests without an app) the Config default is used.
+"""
+from flask import current_app, has_app_context
+from config import Config
+
+
+def setting(name, default=None):
+    """The current app's value of a config key, else the Config default, else default"""
+    fallback = getattr(Config, name, default)
+    if has_app_context():
+        return current_app.config.get(name, fallback)
+    return fallback
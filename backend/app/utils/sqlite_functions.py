@@ -0,0 +1,48 @@
+"""
+SQL math functions for SQLite connections
+PostgreSQL ships radians/sin/cos/asin/sqrt/power out of the box, but SQLite only
+has them when compiled with SQLITE_ENABLE_MATH_FUNCTIONS. Registering Python
+fallbacks on connect lets the geo search build one distance expression that
+runs unchanged on both databases.
+"""
+import math
+import sqlite3
+from sqlalchemy import event
+from sqlalchemy.engine import Engine
+
+# name -> (number of arguments, python implementation)
+MATH_FUNCTIONS = {
+    'radians': (1, math.radians),
+    'sin': (1, math.sin),
+    'cos': (1, math.cos),
+    'asin': (1, math.asin),
+    'sqrt': (1, math.sqrt),
+    'power': (2, math.pow),
+}
+
+
+def _null_safe(fn):
+    """SQL functions must return NULL for NULL input instead of raising"""
+    def wrapper(*args):
+        if any(arg is None for arg in args):
+            return None
+        try:
+            return fn(*args)
+        except (ValueError, OverflowError):
+            return None
+    return wrapper
+
+
+def register_math_functions(dbapi_connection):
+    """Register any math function the SQLite build is missing"""
+    for name, (num_args, fn) in MATH_FUNCTIONS.items():
+        try:
+            dbapi_connection.execute(f"SELECT {name}({', '.join(['1'] * num_args)})")
+        except sqlite3.OperationalError:
+            dbapi_connection.create_function(name, num_args, _null_safe(fn), deterministic=True)
+
+
+@event.listens_for(Engine, 'connect')
+def _on_connect(dbapi_connection, connection_record):
+    if isinstance(dbapi_connection, sqlite3.Connection):
+        register_math_functions(dbapi_connection)
@@ -0,0 +1,48 @@
+"""
+Per-table write versions for in-process caches
+Every flush that inserts, updates or deletes ORM rows, and every ORM bulk
+UPDATE/DELETE, bumps a counter for the tables it touched. Caches put the
+versions of the tables they read into their keys (or compare them before
+using an entry), so a write in this process makes dependent entries stale
+immediately; other processes rely on the cache TTLs.
+"""
+import threading
+from sqlalchemy import event
+from sqlalchemy.orm import Session
+
+_versions = {}
+_lock = threading.Lock()
+
+
+def bump(names):
+    """Mark the given tables as written"""
+    with _lock:
+        for name in names:
+            _versions[name] = _versions.get(name, 0) + 1
+
+
+def version(name):
+    with _lock:
+        return _versions.get(name, 0)
+
+
+def versions(names):
+    """Tuple of (table, version) pairs, usable as part of a cache key"""
+    with _lock:
+        return tuple((name, _versions.get(name, 0)) for name in names)
+
+
+@event.listens_for(Session, 'after_flush')
+def _track_flush(session, flush_context):
+    tables = {obj.__table__.name for obj in list(session.new) + list(session.dirty) + list(session.deleted)
+              if hasattr(obj, '__table__')}
+    if tables:
+        bump(tables)
+
+
+@event.listens_for(Session, 'do_orm_execute')
+def _track_bulk_writes(orm_execute_state):
+    if orm_execute_state.is_update or orm_execute_state.is_delete or orm_execute_state.is_insert:
+        mapper = orm_execute_state.bind_mapper
+        if mapper is not None:
+            bump([mapper.local_table.name])
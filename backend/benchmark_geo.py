@@ -0,0 +1,50 @@
+"""
+Micro-benchmark: scalar calculate_distance loop vs batch calculate_distances
+Run from the backend directory:
+    python benchmark_geo.py
+    python benchmark_geo.py 10000 100000
+NumPy is used automatically when installed; otherwise the array-module
+fallback is measured.
+"""
+import random
+import sys
+import time
+
+from app.utils.geo_service import calculate_distance, calculate_distances, top_k_within_radius, np
+
+ORIGIN = (-1.286389, 36.817223)  # Nairobi CBD
+
+
+def random_points(count):
+    """Points scattered over Kenya"""
+    rng = random.Random(42)
+    lats = [rng.uniform(-4.7, 5.0) for _ in range(count)]
+    lons = [rng.uniform(33.9, 41.9) for _ in range(count)]
+    return lats, lons
+
+
+def timed(fn):
+    start = time.perf_counter()
+    result = fn()
+    return result, time.perf_counter() - start
+
+
+def run(count):
+    lats, lons = random_points(count)
+    if np is not None:
+        lats, lons = np.asarray(lats), np.asarray(lons)
+
+    _, scalar = timed(lambda: [calculate_distance(ORIGIN[0], ORIGIN[1], lat, lon) for lat, lon in zip(lats, lons)])
+    _, batch = timed(lambda: calculate_distances(ORIGIN, lats, lons))
+    _, top_k = timed(lambda: top_k_within_radius(ORIGIN, lats, lons, 25, k=20))
+
+    print(f"{count:>10,} | {scalar * 1000:>10.1f} ms | {batch * 1000:>10.1f} ms | "
+          f"{scalar / batch:>7.1f}x | {top_k * 1000:>10.1f} ms")
+
+
+if __name__ == '__main__':
+    sizes = [int(arg) for arg in sys.argv[1:]] or [10_000, 100_000, 1_000_000]
+    print(f"Batch backend: {'numpy' if np is not None else 'array module'}")
+    print(f"{'points':>10} | {'scalar':>13} | {'batch':>13} | {'speedup':>8} | {'top-k (20)':>13}")
+    for size in sizes:
+        run(size)
@@ -18,6 +18,63 @@ class Config:
     
     # CORS configuration
     CORS_ORIGINS = os.environ.get('CORS_ORIGINS', 'http://localhost:3000,http://localhost:5173,http://localhost:5176').split(',')
+    
+    # Distance matrix limits (origins x destinations)
+    GEO_MATRIX_MAX_CELLS = int(os.environ.get('GEO_MATRIX_MAX_CELLS', 250000))
+    # Matrices larger than this are streamed row by row instead of built in memory
+    GEO_MATRIX_STREAM_THRESHOLD = int(os.environ.get('GEO_MATRIX_STREAM_THRESHOLD', 10000))
+    
+    # Geocoding backend: 'google' (needs GOOGLE_MAPS_API_KEY) or 'gazetteer' (offline CSV)
+    GEOCODER_BACKEND = os.environ.get('GEOCODER_BACKEND', 'google')
+    GAZETTEER_PATH = os.environ.get('GAZETTEER_PATH') or os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'gazetteer_ke.csv')
+    GEOCODE_TIMEOUT = float(os.environ.get('GEOCODE_TIMEOUT', 5))
+    GEOCODE_MAX_WORKERS = int(os.environ.get('GEOCODE_MAX_WORKERS', 8))
+    GEOCODE_MAX_BATCH = int(os.environ.get('GEOCODE_MAX_BATCH', 1000))
+    
+    # Geocoding cache (seconds / entries)
+    GEOCODE_CACHE_TTL = int(os.environ.get('GEOCODE_CACHE_TTL', 30 * 24 * 3600))
+    GEOCODE_NEGATIVE_TTL = int(os.environ.get('GEOCODE_NEGATIVE_TTL', 3600))
+    GEOCODE_CACHE_SIZE = int(os.environ.get('GEOCODE_CACHE_SIZE', 10000))
+    
+    # How list endpoints count their total: exact, cached, estimate or none
+    # Per-endpoint overrides, e.g. "admin.get_all_bookings=estimate,bookings.get_bookings=cached"
+    PAGINATION_COUNT_STRATEGY = os.environ.get('PAGINATION_COUNT_STRATEGY', 'exact')
+    PAGINATION_COUNT_STRATEGIES = dict(
+        item.split('=', 1) for item in os.environ.get('PAGINATION_COUNT_STRATEGIES', '').split(',') if '=' in item
+    )
+    PAGINATION_COUNT_CACHE_TTL = int(os.environ.get('PAGINATION_COUNT_CACHE_TTL', 30))
+    PAGINATION_COUNT_CACHE_SIZE = int(os.environ.get('PAGINATION_COUNT_CACHE_SIZE', 1000))
+    
+    # Service category catalogue cache: seconds between checks for other workers'
+    # writes, and the Cache-Control max-age of the category listings
+    CATEGORY_CACHE_CHECK_INTERVAL = int(os.environ.get('CATEGORY_CACHE_CHECK_INTERVAL', 5))
+    CATEGORY_CACHE_MAX_AGE = int(os.environ.get('CATEGORY_CACHE_MAX_AGE', 60))
+    
+    # Response cache for anonymous public endpoints: memory (in-process only),
+    # sqlite (file shared by the workers of a host), redis or none.
+    # RESPONSE_CACHE_URL is the SQLite file path or the Redis URL.
+    RESPONSE_CACHE_BACKEND = os.environ.get('RESPONSE_CACHE_BACKEND', 'memory')
+    RESPONSE_CACHE_URL = os.environ.get('RESPONSE_CACHE_URL')
+    RESPONSE_CACHE_TTL = int(os.environ.get('RESPONSE_CACHE_TTL', 60))
+    RESPONSE_CACHE_LOCAL_TTL = int(os.environ.get('RESPONSE_CACHE_LOCAL_TTL', 5))
+    RESPONSE_CACHE_LOCAL_SIZE = int(os.environ.get('RESPONSE_CACHE_LOCAL_SIZE', 1000))
+    
+    # Longest booking accepted, in hours; also bounds the overlap check's index scan
+    BOOKING_MAX_DURATION_HOURS = int(os.environ.get('BOOKING_MAX_DURATION_HOURS', 24))
+    # Free-slot calendar: default working hours (UTC) and request limits
+    BOOKING_DAY_START_HOUR = int(os.environ.get('BOOKING_DAY_START_HOUR', 8))
+    BOOKING_DAY_END_HOUR = int(os.environ.get('BOOKING_DAY_END_HOUR', 18))
+    CALENDAR_MAX_PROVIDERS = int(os.environ.get('CALENDAR_MAX_PROVIDERS', 100))
+    CALENDAR_MAX_DAYS = int(os.environ.get('CALENDAR_MAX_DAYS', 31))
+    
+    # Most buckets one admin analytics request may return (e.g. 31 days hourly = 744)
+    ANALYTICS_MAX_POINTS = int(os.environ.get('ANALYTICS_MAX_POINTS', 2000))
+    
+    # Typo-tolerant search without pg_trgm: minimum match score, largest table
+    # indexed in-process, and seconds before other workers' writes are picked up
+    FUZZY_SEARCH_THRESHOLD = float(os.environ.get('FUZZY_SEARCH_THRESHOLD', 0.3))
+    FUZZY_SEARCH_INDEX_MAX_ROWS = int(os.environ.get('FUZZY_SEARCH_INDEX_MAX_ROWS', 50000))
+    FUZZY_SEARCH_INDEX_TTL = int(os.environ.get('FUZZY_SEARCH_INDEX_TTL', 60))
 
 class DevelopmentConfig(Config):
     DEBUG = True
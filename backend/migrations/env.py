@@ -51,6 +51,24 @@ def get_metadata():
     return target_db.metadata
 
 
+def include_object(object, name, type_, reflected, compare_to):
+    """Leave the search indexes that are not on any model out of autogenerate
+
+    The provider full-text index (app/utils/provider_search.py) and the
+    pg_trgm indexes (app/utils/fuzzy_search.py) are created by their
+    migrations, so 'flask db migrate' must not emit drops for them.
+    """
+    if reflected and compare_to is None:
+        from app.utils import fuzzy_search, provider_search
+
+        table_name = object.table.name if type_ in ('column', 'index') else None
+        if provider_search.is_index_storage(type_, name, table_name):
+            return False
+        if type_ == 'index' and name in {index[0] for index in fuzzy_search.TRIGRAM_INDEXES}:
+            return False
+    return True
+
+
 def run_migrations_offline():
     """Run migrations in 'offline' mode.
 
@@ -65,7 +83,8 @@ def run_migrations_offline():
     """
     url = config.get_main_option("sqlalchemy.url")
     context.configure(
-        url=url, target_metadata=get_metadata(), literal_binds=True
+        url=url, target_metadata=get_metadata(), literal_binds=True,
+        include_object=include_object
     )
 
     with context.begin_transaction():
@@ -93,6 +112,7 @@ def run_migrations_online():
     conf_args = current_app.extensions['migrate'].configure_args
     if conf_args.get("process_revision_directives") is None:
         conf_args["process_revision_directives"] = process_revision_directives
+    conf_args.setdefault("include_object", include_object)
 
     connectable = get_engine()
 
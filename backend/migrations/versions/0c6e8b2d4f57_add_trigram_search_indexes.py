@@ -0,0 +1,40 @@
+"""Add pg_trgm indexes for fuzzy category and user search
+
+Revision ID: 0c6e8b2d4f57
+Revises: f3b9a1d7c265
+Create Date: 2026-10-18 19:02:44.915370
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '0c6e8b2d4f57'
+down_revision = 'f3b9a1d7c265'
+branch_labels = None
+depends_on = None
+
+# (index name, table, column) - keep in sync with app/utils/fuzzy_search.py
+TRIGRAM_INDEXES = [
+    ('ix_service_categories_name_trgm', 'service_categories', 'name'),
+    ('ix_users_first_name_trgm', 'users', 'first_name'),
+    ('ix_users_last_name_trgm', 'users', 'last_name'),
+    ('ix_users_email_trgm', 'users', 'email'),
+]
+
+
+def upgrade():
+    # Other databases use the in-process trigram index, nothing to create
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    op.execute('CREATE EXTENSION IF NOT EXISTS pg_trgm')
+    for name, table, column in TRIGRAM_INDEXES:
+        op.execute(f'CREATE INDEX IF NOT EXISTS {name} ON {table} USING GIN ({column} gin_trgm_ops)')
+
+
+def downgrade():
+    if op.get_bind().dialect.name != 'postgresql':
+        return
+    for name, _, _ in reversed(TRIGRAM_INDEXES):
+        op.execute(f'DROP INDEX IF EXISTS {name}')
@@ -0,0 +1,26 @@
+"""Add composite latitude/longitude index for geo search
+
+Revision ID: 3b8e1f2a9c41
+Revises: df99cc210e77
+Create Date: 2026-10-18 09:12:40.118204
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '3b8e1f2a9c41'
+down_revision = 'df99cc210e77'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.create_index('ix_provider_profiles_lat_lon', ['latitude', 'longitude'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.drop_index('ix_provider_profiles_lat_lon')
@@ -0,0 +1,46 @@
+"""Add denormalized rating aggregates to provider profiles
+
+Revision ID: 4f2b9d7e1a63
+Revises: c51f7e09a2d3
+Create Date: 2026-10-18 14:12:45.208113
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '4f2b9d7e1a63'
+down_revision = 'c51f7e09a2d3'
+branch_labels = None
+depends_on = None
+
+AGGREGATE_COLUMNS = ['rating_sum', 'rating_count'] + [f'rating_{stars}_count' for stars in range(1, 6)]
+
+
+def upgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        for name in AGGREGATE_COLUMNS:
+            batch_op.add_column(sa.Column(name, sa.Integer(), nullable=False, server_default='0'))
+
+    # Populate existing profiles from their reviews
+    # (the same statement as: flask repair-rating-aggregates)
+    histogram = ',\n'.join(
+        f"rating_{stars}_count = (SELECT COUNT(*) FROM reviews r "
+        f"WHERE r.provider_profile_id = provider_profiles.id AND r.rating = {stars})"
+        for stars in range(1, 6)
+    )
+    op.execute(f"""
+        UPDATE provider_profiles SET
+            rating_sum = COALESCE((SELECT SUM(r.rating) FROM reviews r
+                                   WHERE r.provider_profile_id = provider_profiles.id), 0),
+            rating_count = (SELECT COUNT(*) FROM reviews r
+                            WHERE r.provider_profile_id = provider_profiles.id),
+            {histogram}
+    """)
+
+
+def downgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        for name in reversed(AGGREGATE_COLUMNS):
+            batch_op.drop_column(name)
@@ -0,0 +1,30 @@
+"""Add cache_versions table for cross-worker cache invalidation
+
+Revision ID: 5a7d1c3e9b20
+Revises: 0c6e8b2d4f57
+Create Date: 2026-10-18 19:41:07.263518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '5a7d1c3e9b20'
+down_revision = '0c6e8b2d4f57'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    cache_versions = op.create_table('cache_versions',
+    sa.Column('name', sa.String(length=50), nullable=False),
+    sa.Column('version', sa.Integer(), server_default='0', nullable=False),
+    sa.Column('updated_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('name')
+    )
+    op.bulk_insert(cache_versions, [{'name': 'service_categories', 'version': 0}])
+
+
+def downgrade():
+    op.drop_table('cache_versions')
@@ -0,0 +1,44 @@
+"""Add daily_stats rollup tables and reviews created_at index
+
+Revision ID: 7b4e2f9c1d86
+Revises: 5a7d1c3e9b20
+Create Date: 2026-10-18 21:12:36.508142
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '7b4e2f9c1d86'
+down_revision = '5a7d1c3e9b20'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('daily_stats',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('metric', sa.String(length=30), nullable=False),
+    sa.Column('dimension', sa.String(length=30), nullable=False),
+    sa.Column('service_category_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day', 'metric', 'dimension', 'service_category_id')
+    )
+    op.create_table('daily_stats_dirty_days',
+    sa.Column('day', sa.Date(), nullable=False),
+    sa.Column('marked_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('day')
+    )
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_created_at', ['created_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_created_at')
+
+    op.drop_table('daily_stats_dirty_days')
+    op.drop_table('daily_stats')
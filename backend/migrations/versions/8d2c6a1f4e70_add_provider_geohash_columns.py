@@ -0,0 +1,78 @@
+"""Add geohash spatial key columns to provider profiles
+
+Revision ID: 8d2c6a1f4e70
+Revises: 3b8e1f2a9c41
+Create Date: 2026-10-18 10:41:07.532918
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+from app.utils import geohash
+
+
+# revision identifiers, used by Alembic.
+revision = '8d2c6a1f4e70'
+down_revision = '3b8e1f2a9c41'
+branch_labels = None
+depends_on = None
+
+BATCH_SIZE = 500
+
+provider_profiles = sa.table(
+    'provider_profiles',
+    sa.column('id', sa.Integer),
+    sa.column('latitude', sa.Float),
+    sa.column('longitude', sa.Float),
+    *[sa.column(f'geohash_{precision}', sa.String) for precision in geohash.PRECISIONS],
+)
+
+
+def upgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('geohash_3', sa.String(length=3), nullable=True))
+        batch_op.add_column(sa.Column('geohash_4', sa.String(length=4), nullable=True))
+        batch_op.add_column(sa.Column('geohash_5', sa.String(length=5), nullable=True))
+        batch_op.add_column(sa.Column('geohash_6', sa.String(length=6), nullable=True))
+        batch_op.create_index(batch_op.f('ix_provider_profiles_geohash_3'), ['geohash_3'], unique=False)
+        batch_op.create_index(batch_op.f('ix_provider_profiles_geohash_4'), ['geohash_4'], unique=False)
+        batch_op.create_index(batch_op.f('ix_provider_profiles_geohash_5'), ['geohash_5'], unique=False)
+        batch_op.create_index(batch_op.f('ix_provider_profiles_geohash_6'), ['geohash_6'], unique=False)
+
+    # Populate existing profiles, or geo searches would skip them until
+    # someone ran: flask backfill-geohash
+    connection = op.get_bind()
+    last_id = 0
+    while True:
+        batch = connection.execute(
+            sa.select(provider_profiles.c.id, provider_profiles.c.latitude, provider_profiles.c.longitude)
+            .where(provider_profiles.c.id > last_id,
+                   provider_profiles.c.latitude.isnot(None), provider_profiles.c.longitude.isnot(None))
+            .order_by(provider_profiles.c.id)
+            .limit(BATCH_SIZE)
+        ).all()
+        if not batch:
+            break
+        rows = []
+        for row_id, latitude, longitude in batch:
+            cell = geohash.encode(float(latitude), float(longitude), max(geohash.PRECISIONS))
+            rows.append({'row_id': row_id, **{f'geohash_{p}': cell[:p] for p in geohash.PRECISIONS}})
+        connection.execute(
+            provider_profiles.update()
+            .where(provider_profiles.c.id == sa.bindparam('row_id'))
+            .values({f'geohash_{p}': sa.bindparam(f'geohash_{p}') for p in geohash.PRECISIONS}),
+            rows
+        )
+        last_id = batch[-1][0]
+
+
+def downgrade():
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_provider_profiles_geohash_6'))
+        batch_op.drop_index(batch_op.f('ix_provider_profiles_geohash_5'))
+        batch_op.drop_index(batch_op.f('ix_provider_profiles_geohash_4'))
+        batch_op.drop_index(batch_op.f('ix_provider_profiles_geohash_3'))
+        batch_op.drop_column('geohash_6')
+        batch_op.drop_column('geohash_5')
+        batch_op.drop_column('geohash_4')
+        batch_op.drop_column('geohash_3')
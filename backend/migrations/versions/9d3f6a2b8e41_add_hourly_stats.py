@@ -0,0 +1,37 @@
+"""Add hourly_stats rollup table
+
+Revision ID: 9d3f6a2b8e41
+Revises: 7b4e2f9c1d86
+Create Date: 2026-10-18 23:05:12.118304
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9d3f6a2b8e41'
+down_revision = '7b4e2f9c1d86'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    op.create_table('hourly_stats',
+    sa.Column('hour', sa.DateTime(), nullable=False),
+    sa.Column('metric', sa.String(length=30), nullable=False),
+    sa.Column('dimension', sa.String(length=30), nullable=False),
+    sa.Column('service_category_id', sa.Integer(), nullable=False),
+    sa.Column('count', sa.Integer(), nullable=False),
+    sa.Column('amount', sa.Numeric(precision=14, scale=2), nullable=False),
+    sa.Column('rolled_at', sa.DateTime(), nullable=True),
+    sa.PrimaryKeyConstraint('hour', 'metric', 'dimension', 'service_category_id')
+    )
+    # Days rolled up so far have no hourly rows: forget them, statistics are
+    # counted live until the next rollup-daily-stats run rebuilds both tables
+    op.execute('DELETE FROM daily_stats')
+    op.execute('DELETE FROM daily_stats_dirty_days')
+
+
+def downgrade():
+    op.drop_table('hourly_stats')
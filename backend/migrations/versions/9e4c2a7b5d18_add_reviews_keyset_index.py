@@ -0,0 +1,27 @@
+"""Add keyset pagination index on reviews
+
+Revision ID: 9e4c2a7b5d18
+Revises: 4f2b9d7e1a63
+Create Date: 2026-10-18 15:03:22.640917
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = '9e4c2a7b5d18'
+down_revision = '4f2b9d7e1a63'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index('ix_reviews_provider_created_id', ['provider_id', 'created_at', 'id'], unique=False,
+                              postgresql_include=['client_id', 'rating'])
+
+
+def downgrade():
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index('ix_reviews_provider_created_id')
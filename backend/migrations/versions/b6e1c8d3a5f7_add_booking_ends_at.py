@@ -0,0 +1,41 @@
+"""Add bookings.ends_at and the provider time range index
+
+Revision ID: b6e1c8d3a5f7
+Revises: 9d3f6a2b8e41
+Create Date: 2026-10-19 09:41:27.630518
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b6e1c8d3a5f7'
+down_revision = '9d3f6a2b8e41'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('ends_at', sa.DateTime(), nullable=True))
+
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('UPDATE bookings SET ends_at = scheduled_date + make_interval(hours => duration_hours)')
+    elif dialect == 'sqlite':
+        # Same text format as SQLAlchemy writes, fractional seconds included
+        op.execute("UPDATE bookings SET ends_at = strftime('%Y-%m-%d %H:%M:%S', scheduled_date, "
+                   "'+' || duration_hours || ' hours') || substr(scheduled_date, 20)")
+    else:
+        op.execute('UPDATE bookings SET ends_at = DATE_ADD(scheduled_date, INTERVAL duration_hours HOUR)')
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.alter_column('ends_at', existing_type=sa.DateTime(), nullable=False)
+        batch_op.create_index('ix_bookings_provider_scheduled_ends', ['provider_id', 'scheduled_date', 'ends_at'], unique=False)
+
+
+def downgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_provider_scheduled_ends')
+        batch_op.drop_column('ends_at')
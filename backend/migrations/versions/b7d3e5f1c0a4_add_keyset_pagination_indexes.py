@@ -0,0 +1,42 @@
+"""Add composite indexes for keyset pagination
+
+Revision ID: b7d3e5f1c0a4
+Revises: 9e4c2a7b5d18
+Create Date: 2026-10-18 16:20:51.193406
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'b7d3e5f1c0a4'
+down_revision = '9e4c2a7b5d18'
+branch_labels = None
+depends_on = None
+
+# table -> [(index name, columns)]
+INDEXES = {
+    'users': [('ix_users_created_id', ['created_at', 'id'])],
+    'provider_profiles': [('ix_provider_profiles_created_id', ['created_at', 'id'])],
+    'bookings': [
+        ('ix_bookings_created_id', ['created_at', 'id']),
+        ('ix_bookings_client_created_id', ['client_id', 'created_at', 'id']),
+        ('ix_bookings_provider_created_id', ['provider_id', 'created_at', 'id']),
+    ],
+    'reviews': [('ix_reviews_client_created_id', ['client_id', 'created_at', 'id'])],
+}
+
+
+def upgrade():
+    for table, indexes in INDEXES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, columns in indexes:
+                batch_op.create_index(name, columns, unique=False)
+
+
+def downgrade():
+    for table, indexes in INDEXES.items():
+        with op.batch_alter_table(table, schema=None) as batch_op:
+            for name, _ in reversed(indexes):
+                batch_op.drop_index(name)
@@ -0,0 +1,54 @@
+"""Add secondary indexes for the hot query filters
+
+Revision ID: e2a8c4f6b913
+Revises: b7d3e5f1c0a4
+Create Date: 2026-10-18 17:05:36.771254
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'e2a8c4f6b913'
+down_revision = 'b7d3e5f1c0a4'
+branch_labels = None
+depends_on = None
+
+
+def upgrade():
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.create_index('ix_bookings_provider_status_scheduled', ['provider_id', 'status', 'scheduled_date'], unique=False)
+
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.create_index('ix_provider_profiles_available_category', ['is_available', 'service_category_id'], unique=False)
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.create_index('ix_users_role_created', ['role', 'created_at'], unique=False)
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.create_index(batch_op.f('ix_reviews_provider_profile_id'), ['provider_profile_id'], unique=False)
+
+    # The payments route already stores the STK push CheckoutRequestID and looks
+    # payments up by it in the callback, but the column was never created
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.add_column(sa.Column('mpesa_checkout_request_id', sa.String(length=100), nullable=True))
+        batch_op.create_index(batch_op.f('ix_payments_mpesa_checkout_request_id'), ['mpesa_checkout_request_id'], unique=True)
+
+
+def downgrade():
+    with op.batch_alter_table('payments', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_payments_mpesa_checkout_request_id'))
+        batch_op.drop_column('mpesa_checkout_request_id')
+
+    with op.batch_alter_table('reviews', schema=None) as batch_op:
+        batch_op.drop_index(batch_op.f('ix_reviews_provider_profile_id'))
+
+    with op.batch_alter_table('users', schema=None) as batch_op:
+        batch_op.drop_index('ix_users_role_created')
+
+    with op.batch_alter_table('provider_profiles', schema=None) as batch_op:
+        batch_op.drop_index('ix_provider_profiles_available_category')
+
+    with op.batch_alter_table('bookings', schema=None) as batch_op:
+        batch_op.drop_index('ix_bookings_provider_status_scheduled')
@@ -0,0 +1,48 @@
+"""Add full-text search index for provider profiles
+
+Revision ID: f3b9a1d7c265
+Revises: e2a8c4f6b913
+Create Date: 2026-10-18 18:11:09.402736
+
+"""
+from alembic import op
+import sqlalchemy as sa
+
+
+# revision identifiers, used by Alembic.
+revision = 'f3b9a1d7c265'
+down_revision = 'e2a8c4f6b913'
+branch_labels = None
+depends_on = None
+
+# Keep in sync with app/utils/provider_search.py
+POSTGRES_VECTOR = (
+    "setweight(to_tsvector('simple', coalesce(p.business_name, '')), 'A') || "
+    "setweight(to_tsvector('simple', coalesce(u.first_name, '') || ' ' || coalesce(u.last_name, '')), 'B') || "
+    "setweight(to_tsvector('simple', coalesce(p.description, '')), 'C')"
+)
+
+
+def upgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('ALTER TABLE provider_profiles ADD COLUMN IF NOT EXISTS search_vector tsvector')
+        op.execute(f'UPDATE provider_profiles p SET search_vector = {POSTGRES_VECTOR} FROM users u WHERE u.id = p.user_id')
+        op.execute('CREATE INDEX IF NOT EXISTS ix_provider_profiles_search_vector '
+                   'ON provider_profiles USING GIN (search_vector)')
+    elif dialect == 'sqlite':
+        op.execute("CREATE VIRTUAL TABLE IF NOT EXISTS provider_search "
+                   "USING fts5(business_name, description, first_name, last_name, "
+                   "tokenize = 'unicode61 remove_diacritics 2')")
+        op.execute("INSERT INTO provider_search (rowid, business_name, description, first_name, last_name) "
+                   "SELECT p.id, p.business_name, coalesce(p.description, ''), u.first_name, u.last_name "
+                   "FROM provider_profiles p JOIN users u ON u.id = p.user_id")
+
+
+def downgrade():
+    dialect = op.get_bind().dialect.name
+    if dialect == 'postgresql':
+        op.execute('DROP INDEX IF EXISTS ix_provider_profiles_search_vector')
+        op.execute('ALTER TABLE provider_profiles DROP COLUMN IF EXISTS search_vector')
+    elif dialect == 'sqlite':
+        op.execute('DROP TABLE IF EXISTS provider_search')
@@ -0,0 +1,166 @@
+"""
+Tests for the time-bucketed admin analytics endpoints
+"""
+import pytest
+from datetime import datetime, time, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.daily_stats import HourlyStat
+from app.utils import daily_stats
+
+STATUSES = [BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.COMPLETED, BookingStatus.CANCELLED]
+
+
+@pytest.fixture
+def activity(app):
+    """
+    Two providers (one per category) created 20 days ago and 40 bookings,
+    booking i created at 10:00 i days ago, alternating between the providers;
+    plus three bookings yesterday at 08:15, 08:45 and 17:30. Returns
+    (admin id, plumbing id, cleaning id).
+    """
+    today = daily_stats.utc_today()
+    with app.app_context():
+        plumbing, cleaning = ServiceCategory(name='Plumbing'), ServiceCategory(name='Cleaning')
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN)
+        client = User(email='client@example.com', first_name='Cy', last_name='Client', role=RoleEnum.CLIENT)
+        providers = [User(email=f'p{i}@example.com', first_name='P', last_name=str(i), role=RoleEnum.PROVIDER)
+                     for i in range(2)]
+        for user in [admin, client] + providers:
+            user.password_hash = 'x'
+        db.session.add_all([plumbing, cleaning, admin, client] + providers)
+        db.session.flush()
+        created = datetime.combine(today - timedelta(days=20), time(9))
+        profiles = [ProviderProfile(user_id=user.id, business_name=f'Biz {user.id}', hourly_rate=10,
+                                    service_category_id=category.id, created_at=created)
+                    for user, category in zip(providers, (plumbing, cleaning))]
+        db.session.add_all(profiles)
+        db.session.flush()
+
+        def book(i, created_at, status, amount):
+            profile = profiles[i % 2]
+            db.session.add(Booking(client_id=client.id, provider_id=profile.user_id,
+                                   provider_profile_id=profile.id, service_category_id=profile.service_category_id,
+                                   scheduled_date=created_at, duration_hours=1, total_amount=amount,
+                                   status=status, address='Westlands', created_at=created_at))
+
+        for i in range(40):
+            book(i, datetime.combine(today - timedelta(days=i), time(10)), STATUSES[i % 4], 10 + i)
+        yesterday = today - timedelta(days=1)
+        for i, moment in enumerate((time(8, 15), time(8, 45), time(17, 30))):
+            book(i, datetime.combine(yesterday, moment), BookingStatus.COMPLETED, 100)
+        db.session.commit()
+        return admin.id, plumbing.id, cleaning.id
+
+
+def get(client, headers, path='timeseries', **params):
+    response = client.get(f'/api/admin/analytics/{path}', headers=headers, query_string=params)
+    return response.status_code, response.get_json()
+
+
+def test_daily_points_before_and_after_rollup_agree(app, client, auth_headers, activity):
+    headers = auth_headers(activity[0], 'admin')
+    today = daily_stats.utc_today()
+    params = {'start': (today - timedelta(days=9)).isoformat(), 'end': today.isoformat()}
+    status, live = get(client, headers, **params)
+    assert status == 200
+
+    with app.app_context():
+        daily_stats.roll_up()
+    assert get(client, headers, **params)[1] == live
+
+    points = live['points']
+    assert [point['bucket'] for point in points] == [(today - timedelta(days=9 - n)).isoformat() for n in range(10)]
+    today_point, yesterday_point = points[-1], points[-2]
+    assert today_point['bookings_by_status'] == {'pending': 1, 'confirmed': 0, 'in_progress': 0, 'completed': 0,
+                                                 'cancelled': 0}
+    assert yesterday_point['bookings'] == 4
+    assert yesterday_point['revenue'] == 300.0
+    assert points[-4]['cancellations'] == 1  # booking 3 is cancelled
+    assert live['totals']['bookings'] == 13
+    assert live['totals']['revenue'] == 300.0 + 12 + 16
+    assert live['totals']['new_providers'] == 0
+
+
+def test_weeks_months_and_hours_sum_to_the_same_totals(app, client, auth_headers, activity):
+    headers = auth_headers(activity[0], 'admin')
+    today = daily_stats.utc_today()
+    params = {'start': (today - timedelta(days=30)).isoformat(), 'end': today.isoformat()}
+    with app.app_context():
+        daily_stats.roll_up()
+        assert HourlyStat.query.count() > 0
+
+    totals = {granularity: get(client, headers, granularity=granularity, **params)[1]['totals']
+              for granularity in ('hour', 'day', 'week', 'month')}
+    assert totals['day']['bookings'] == 34
+    assert totals['day']['new_providers'] == 2
+    assert totals['hour'] == totals['day'] == totals['week'] == totals['month']
+
+    start = today - timedelta(days=30)
+    _, weekly = get(client, headers, granularity='week', **params)
+    assert weekly['points'][0]['bucket'] == (start - timedelta(days=start.weekday())).isoformat()
+    _, monthly = get(client, headers, granularity='month', **params)
+    assert monthly['points'][-1]['bucket'] == today.replace(day=1).isoformat()
+
+
+def test_hourly_points(app, client, auth_headers, activity):
+    headers = auth_headers(activity[0], 'admin')
+    yesterday = (daily_stats.utc_today() - timedelta(days=1)).isoformat()
+    _, live = get(client, headers, granularity='hour', start=yesterday, end=yesterday)
+    with app.app_context():
+        daily_stats.roll_up()
+    _, rolled = get(client, headers, granularity='hour', start=yesterday, end=yesterday)
+    assert rolled == live
+
+    points = rolled['points']
+    assert len(points) == 24
+    assert points[8]['bucket'] == f'{yesterday}T08:00:00'
+    assert [point['bookings'] for point in points if point['bookings']] == [2, 1, 1]
+    assert points[8]['revenue'] == 200.0
+    assert points[10]['bookings_by_status']['confirmed'] == 1
+
+    # A change to a rolled-up day shows up at once
+    with app.app_context():
+        booking = Booking.query.filter(Booking.total_amount == 100).order_by(Booking.created_at.desc()).first()
+        booking.status = BookingStatus.CANCELLED
+        db.session.commit()
+    points = get(client, headers, granularity='hour', start=yesterday, end=yesterday)[1]['points']
+    assert points[17]['cancellations'] == 1
+    assert points[17]['revenue'] == 0.0
+
+
+def test_category_filter_and_metric_endpoints(app, client, auth_headers, activity):
+    admin_id, plumbing_id, cleaning_id = activity
+    headers = auth_headers(admin_id, 'admin')
+    today = daily_stats.utc_today()
+    params = {'start': (today - timedelta(days=39)).isoformat(), 'end': today.isoformat(), 'granularity': 'month'}
+    with app.app_context():
+        daily_stats.roll_up()
+
+    plumbing = get(client, headers, service_category_id=plumbing_id, **params)[1]['totals']
+    cleaning = get(client, headers, service_category_id=cleaning_id, **params)[1]['totals']
+    overall = get(client, headers, **params)[1]['totals']
+    assert plumbing['bookings'] == 22 and cleaning['bookings'] == 21
+    assert plumbing['new_providers'] == cleaning['new_providers'] == 1
+    assert plumbing['revenue'] + cleaning['revenue'] == overall['revenue']
+
+    status, revenue = get(client, headers, 'revenue', **params)
+    assert status == 200
+    assert revenue['totals'] == {'revenue': overall['revenue']}
+    assert set(revenue['points'][0]) == {'bucket', 'revenue'}
+    bookings = get(client, headers, 'bookings', **params)[1]
+    assert set(bookings['totals']) == {'bookings', 'bookings_by_status', 'cancellations'}
+    assert get(client, headers, 'new-providers', **params)[1]['totals'] == {'new_providers': 2}
+
+
+def test_invalid_ranges_are_rejected(client, auth_headers, activity):
+    headers = auth_headers(activity[0], 'admin')
+    assert get(client, headers, granularity='minute')[0] == 400
+    assert get(client, headers, start='yesterday')[0] == 400
+    assert get(client, headers, start='2026-02-01', end='2026-01-01')[0] == 400
+    assert get(client, headers, granularity='hour', start='2020-01-01', end='2026-01-01')[0] == 400
+    assert get(client, headers, service_category_id='plumbing')[0] == 400
+    assert get(client, auth_headers(activity[0], 'client'))[0] == 403
@@ -0,0 +1,239 @@
+"""
+Tests for booking time ranges, the provider overlap checks and the free-slot calendar
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.utils import table_versions
+from app.utils.availability import find_conflict, merge_intervals, subtract_intervals, working_windows
+
+
+@pytest.fixture
+def slot_start():
+    return (datetime.utcnow() + timedelta(days=3)).replace(hour=10, minute=0, second=0, microsecond=0)
+
+
+@pytest.fixture
+def schedule(app, slot_start):
+    """
+    A provider with a confirmed booking 10:00-12:00 and a cancelled one
+    14:00-15:00 three days from now; returns (client id, provider id, category id)
+    """
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        client = User(email='client@example.com', first_name='Cy', last_name='Client', role=RoleEnum.CLIENT)
+        provider = User(email='provider@example.com', first_name='Pat', last_name='Provider', role=RoleEnum.PROVIDER)
+        for user in (client, provider):
+            user.password_hash = 'x'
+        db.session.add_all([category, client, provider])
+        db.session.flush()
+        profile = ProviderProfile(user_id=provider.id, business_name='Pipes', hourly_rate=20,
+                                  service_category_id=category.id)
+        db.session.add(profile)
+        db.session.flush()
+        for offset, hours, status in ((0, 2, BookingStatus.CONFIRMED), (4, 1, BookingStatus.CANCELLED)):
+            db.session.add(Booking(client_id=client.id, provider_id=provider.id, provider_profile_id=profile.id,
+                                   service_category_id=category.id, scheduled_date=slot_start + timedelta(hours=offset),
+                                   duration_hours=hours, total_amount=20 * hours, status=status, address='Westlands'))
+        db.session.commit()
+        return client.id, provider.id, category.id
+
+
+def booking_request(schedule, start, hours=1):
+    return {'provider_id': schedule[1], 'service_category_id': schedule[2], 'scheduled_date': start.isoformat(),
+            'duration_hours': hours, 'address': 'Kilimani'}
+
+
+def test_ends_at_follows_the_schedule(app, schedule, slot_start):
+    with app.app_context():
+        booking = Booking.query.filter_by(status=BookingStatus.CONFIRMED).one()
+        assert booking.ends_at == slot_start + timedelta(hours=2)
+        booking.duration_hours = 3
+        db.session.commit()
+        assert booking.ends_at == slot_start + timedelta(hours=3)
+
+
+@pytest.mark.parametrize('offset, hours, clashes', [
+    (-1, 1, False),    # 09:00-10:00 ends as the booking starts
+    (-1, 2, True),     # 09:00-11:00
+    (1, 3, True),      # 11:00-14:00
+    (0.5, 1, True),    # inside
+    (2, 1, False),     # 12:00-13:00 starts as it ends
+    (4, 1, False),     # over the cancelled booking
+])
+def test_find_conflict_uses_half_open_ranges(app, schedule, slot_start, offset, hours, clashes):
+    with app.app_context():
+        conflict = find_conflict(schedule[1], slot_start + timedelta(hours=offset), hours)
+        assert (conflict is not None) == clashes
+
+
+def test_create_booking_rejects_overlapping_slots(app, client, auth_headers, schedule, slot_start):
+    headers = auth_headers(schedule[0], 'client')
+    response = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(hours=1)),
+                           headers=headers)
+    assert response.status_code == 409
+    assert response.get_json()['conflict'] == {
+        'scheduled_date': slot_start.isoformat(), 'ends_at': (slot_start + timedelta(hours=2)).isoformat()
+    }
+
+    response = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(hours=2)),
+                           headers=headers)
+    assert response.status_code == 201
+    assert response.get_json()['booking']['ends_at'] == (slot_start + timedelta(hours=3)).isoformat()
+
+    # The new pending booking holds its slot too
+    response = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(hours=2)),
+                           headers=headers)
+    assert response.status_code == 409
+
+    response = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(days=1), 0),
+                           headers=headers)
+    assert response.status_code == 400
+
+
+def test_update_booking_checks_the_new_slot(app, client, auth_headers, schedule, slot_start):
+    headers = auth_headers(schedule[0], 'client')
+    created = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(hours=5)),
+                          headers=headers).get_json()['booking']
+
+    response = client.put(f"/api/bookings/{created['id']}", headers=headers,
+                          json={'scheduled_date': (slot_start + timedelta(hours=1)).isoformat()})
+    assert response.status_code == 409
+    with app.app_context():
+        assert db.session.get(Booking, created['id']).scheduled_date == slot_start + timedelta(hours=5)
+
+    # Growing the booking over its own old range is fine
+    response = client.put(f"/api/bookings/{created['id']}", headers=headers, json={'duration_hours': 3})
+    assert response.status_code == 200
+    assert response.get_json()['booking']['ends_at'] == (slot_start + timedelta(hours=8)).isoformat()
+    assert response.get_json()['booking']['total_amount'] == 60.0
+
+
+def test_provider_availability_check(client, auth_headers, schedule, slot_start):
+    headers = auth_headers(schedule[1], 'provider')
+
+    def check(start, hours):
+        response = client.get('/api/bookings/provider/availability', headers=headers,
+                              query_string={'scheduled_date': start.isoformat(), 'duration_hours': hours})
+        assert response.status_code == 200
+        return response.get_json()
+
+    busy = check(slot_start - timedelta(minutes=30), 1)
+    assert busy['is_available'] is False
+    assert busy['conflicting_booking']['scheduled_date'] == slot_start.isoformat()
+    assert check(slot_start - timedelta(hours=1), 1)['is_available'] is True
+    assert check(slot_start + timedelta(hours=2), 2)['is_available'] is True
+
+
+def test_sweep_merges_busy_time_and_keeps_long_enough_gaps():
+    day = datetime(2030, 1, 7)
+    at = lambda hour: day + timedelta(hours=hour)  # noqa: E731
+    busy = merge_intervals([(at(9), at(10)), (at(9.5), at(11)), (at(11), at(12)), (at(13), at(13.5)),
+                            (at(17), at(33))])
+    assert busy == [(at(9), at(12)), (at(13), at(13.5)), (at(17), at(33))]
+
+    windows = working_windows(at(8), at(24 + 18), 8, 18)
+    assert windows == [(at(8), at(18)), (at(32), at(42))]
+    assert subtract_intervals(windows, busy, timedelta(hours=1)) == [
+        (at(8), at(9)), (at(12), at(13)), (at(13.5), at(17)), (at(33), at(42))
+    ]
+    assert subtract_intervals(windows, busy, timedelta(hours=2)) == [(at(13.5), at(17)), (at(33), at(42))]
+
+
+def test_calendar_returns_free_slots_of_many_providers(app, client, count_queries, schedule, slot_start):
+    with app.app_context():
+        other = User(email='other@example.com', first_name='Oli', last_name='Other', role=RoleEnum.PROVIDER,
+                     password_hash='x')
+        db.session.add(other)
+        db.session.flush()
+        db.session.add(ProviderProfile(user_id=other.id, business_name='Closed', hourly_rate=20,
+                                       service_category_id=schedule[2], is_available=False))
+        db.session.commit()
+        other_id = other.id
+
+    day = slot_start.date().isoformat()
+    params = {'provider_ids': f'{schedule[1]},{other_id},999', 'start': day, 'end': day}
+    with count_queries() as counter:
+        response = client.get('/api/providers/availability', query_string=params)
+    assert response.status_code == 200
+    assert counter.count <= 2
+
+    providers = response.get_json()['providers']
+    assert [p['provider_id'] for p in providers] == [schedule[1], other_id]
+    at = lambda hour: (slot_start.replace(hour=0) + timedelta(hours=hour)).isoformat()  # noqa: E731
+    # 10:00-12:00 is booked, the cancelled 14:00 booking leaves its slot free
+    assert providers[0]['free_slots'] == [{'start': at(8), 'end': at(10)}, {'start': at(12), 'end': at(18)}]
+    assert providers[0]['next_available'] == at(8)
+    assert providers[1] == {'provider_id': other_id, 'is_available': False, 'free_slots': [],
+                            'next_available': None}
+
+    longer = client.get('/api/providers/availability', query_string={**params, 'min_hours': 3,
+                                                                     'from_hour': 9, 'to_hour': 20})
+    assert longer.get_json()['providers'][0]['free_slots'] == [{'start': at(12), 'end': at(20)}]
+
+
+@pytest.mark.parametrize('params', [
+    {},
+    {'provider_ids': 'a,b'},
+    {'provider_ids': '1', 'start': '2030-01-10', 'end': '2030-01-01'},
+    {'provider_ids': '1', 'start': '2030-01-01', 'end': '2030-06-01'},
+    {'provider_ids': '1', 'from_hour': 18, 'to_hour': 8},
+    {'provider_ids': '1', 'from_hour': 'nine'},
+    {'provider_ids': '1', 'to_hour': '17.5'},
+    {'provider_ids': '1', 'min_hours': 'two'},
+    {'provider_ids': '1', 'min_hours': 0},
+    {'provider_ids': ','.join(str(i) for i in range(200))},
+])
+def test_calendar_rejects_invalid_requests(client, params):
+    assert client.get('/api/providers/availability', query_string=params).status_code == 400
+
+
+def test_slot_writes_bump_the_bookings_version(app, client, auth_headers, schedule, slot_start):
+    """Cached counts (PAGINATION_COUNT_STRATEGY=cached) must see reserved and moved slots"""
+    headers = auth_headers(schedule[0], 'client')
+    before = table_versions.version('bookings')
+    created = client.post('/api/bookings', json=booking_request(schedule, slot_start + timedelta(hours=5)),
+                          headers=headers).get_json()['booking']
+    assert table_versions.version('bookings') > before
+
+    before = table_versions.version('bookings')
+    response = client.put(f"/api/bookings/{created['id']}", headers=headers,
+                          json={'scheduled_date': (slot_start + timedelta(hours=6)).isoformat()})
+    assert response.status_code == 200
+    assert table_versions.version('bookings') > before
+
+
+def test_reinstating_a_cancelled_booking_checks_its_slot(app, client, auth_headers, schedule, slot_start):
+    with app.app_context():
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN,
+                     password_hash='x')
+        db.session.add(admin)
+        db.session.commit()
+        admin_id = admin.id
+        confirmed, cancelled = (Booking.query.filter_by(status=status).one().id
+                                for status in (BookingStatus.CONFIRMED, BookingStatus.CANCELLED))
+    headers = auth_headers(admin_id, 'admin')
+
+    def set_status(booking_id, status):
+        return client.put(f'/api/bookings/{booking_id}/status', json={'status': status}, headers=headers)
+
+    # 10:00-12:00 is taken by someone else once the first booking is cancelled
+    assert set_status(confirmed, 'cancelled').status_code == 200
+    response = client.post('/api/bookings', json=booking_request(schedule, slot_start, 2),
+                           headers=auth_headers(schedule[0], 'client'))
+    assert response.status_code == 201
+
+    response = set_status(confirmed, 'confirmed')
+    assert response.status_code == 409
+    assert response.get_json()['conflict']['scheduled_date'] == slot_start.isoformat()
+    with app.app_context():
+        assert db.session.get(Booking, confirmed).status == BookingStatus.CANCELLED
+
+    # The cancelled 14:00 booking's slot is still free
+    response = set_status(cancelled, 'confirmed')
+    assert response.status_code == 200
+    assert response.get_json()['booking']['status'] == 'confirmed'
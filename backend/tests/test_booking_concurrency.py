@@ -0,0 +1,99 @@
+"""
+Concurrency tests for booking creation
+Runs against a file-backed SQLite database so that concurrent requests really
+use separate connections, as they would in production.
+"""
+import pytest
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from flask import Flask
+from flask_jwt_extended import JWTManager, create_access_token
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking
+
+ATTEMPTS = 300
+THREADS = 16
+
+
+@pytest.fixture
+def file_app(tmp_path):
+    app = Flask(__name__)
+    app.config['TESTING'] = True
+    app.config['SQLALCHEMY_DATABASE_URI'] = f"sqlite:///{tmp_path / 'bookings.db'}"
+    app.config['SQLALCHEMY_TRACK_MODIFICATIONS'] = False
+    app.config['JWT_SECRET_KEY'] = 'test-secret-key-for-jwt-tokens'
+    db.init_app(app)
+    JWTManager(app)
+    with app.app_context():
+        db.create_all()
+        from app.routes.bookings import bookings_bp
+        app.register_blueprint(bookings_bp, url_prefix='/api/bookings')
+    yield app
+    with app.app_context():
+        db.session.remove()
+        db.drop_all()
+        db.engine.dispose()
+
+
+@pytest.fixture
+def market(file_app):
+    """One provider and eight clients; returns (provider user id, category id, client tokens)"""
+    with file_app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        provider = User(email='provider@example.com', first_name='Pat', last_name='Provider',
+                        role=RoleEnum.PROVIDER, password_hash='x')
+        clients = [User(email=f'client{i}@example.com', first_name='Client', last_name=str(i),
+                        role=RoleEnum.CLIENT, password_hash='x') for i in range(8)]
+        db.session.add_all([category, provider] + clients)
+        db.session.flush()
+        db.session.add(ProviderProfile(user_id=provider.id, business_name='Pipes', hourly_rate=20,
+                                       service_category_id=category.id))
+        db.session.commit()
+        tokens = [create_access_token(identity=str(c.id), additional_claims={'role': 'client'}) for c in clients]
+        return provider.id, category.id, tokens
+
+
+def fire(app, requests):
+    """POST every (token, body) pair to create_booking from THREADS threads; returns the statuses"""
+    def attempt(item):
+        token, body = item
+        response = app.test_client().post('/api/bookings', json=body, headers={'Authorization': f'Bearer {token}'})
+        return response.status_code
+
+    with ThreadPoolExecutor(max_workers=THREADS) as pool:
+        return list(pool.map(attempt, requests))
+
+
+def body(market, start, hours=2):
+    return {'provider_id': market[0], 'service_category_id': market[1], 'scheduled_date': start.isoformat(),
+            'duration_hours': hours, 'address': 'Westlands'}
+
+
+def test_exactly_one_concurrent_request_wins_a_slot(file_app, market):
+    start = (datetime.utcnow() + timedelta(days=2)).replace(hour=10, minute=0, second=0, microsecond=0)
+    tokens = market[2]
+    statuses = fire(file_app, [(tokens[i % len(tokens)], body(market, start)) for i in range(ATTEMPTS)])
+
+    assert statuses.count(201) == 1
+    assert statuses.count(409) == ATTEMPTS - 1
+    with file_app.app_context():
+        assert Booking.query.count() == 1
+
+
+def test_concurrent_overlapping_requests_never_double_book(file_app, market):
+    # Two hour slots starting every half hour: at most one in four can be accepted per window
+    base = (datetime.utcnow() + timedelta(days=2)).replace(hour=8, minute=0, second=0, microsecond=0)
+    tokens = market[2]
+    requests = [(tokens[i % len(tokens)], body(market, base + timedelta(minutes=30 * (i % 16))))
+                for i in range(ATTEMPTS)]
+    statuses = fire(file_app, requests)
+
+    assert set(statuses) <= {201, 409}
+    with file_app.app_context():
+        accepted = Booking.query.order_by(Booking.scheduled_date).all()
+        assert len(accepted) == statuses.count(201) >= 3
+        for earlier, later in zip(accepted, accepted[1:]):
+            assert earlier.ends_at <= later.scheduled_date
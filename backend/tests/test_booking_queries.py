@@ -0,0 +1,77 @@
+"""
+Query-count regression tests for booking listings
+Every page must cost the same number of queries, however many bookings it holds.
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.payment import Payment, PaymentStatus
+
+
+@pytest.fixture
+def bookings(app):
+    """An admin, 4 clients, 3 providers and 30 bookings (every other one paid)"""
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN)
+        clients = [User(email=f'client{i}@example.com', first_name='Client', last_name=str(i), role=RoleEnum.CLIENT)
+                   for i in range(4)]
+        providers = [User(email=f'provider{i}@example.com', first_name='Provider', last_name=str(i), role=RoleEnum.PROVIDER)
+                     for i in range(3)]
+        for user in [admin] + clients + providers:
+            user.set_password('password123')
+        db.session.add_all([category, admin] + clients + providers)
+        db.session.flush()
+
+        profiles = [ProviderProfile(user_id=p.id, business_name=f'Business {p.id}', hourly_rate=20,
+                                    service_category_id=category.id) for p in providers]
+        db.session.add_all(profiles)
+        db.session.flush()
+
+        start = datetime.utcnow() + timedelta(days=1)
+        for i in range(30):
+            profile = profiles[i % len(profiles)]
+            booking = Booking(client_id=clients[i % len(clients)].id, provider_id=profile.user_id,
+                              provider_profile_id=profile.id, service_category_id=category.id,
+                              scheduled_date=start + timedelta(hours=i), duration_hours=1,
+                              total_amount=20, status=BookingStatus.CONFIRMED, address='Westlands')
+            if i % 2 == 0:
+                booking.payment = Payment(amount=20, status=PaymentStatus.COMPLETED)
+            db.session.add(booking)
+        db.session.commit()
+        return admin.id
+
+
+def test_get_bookings_serializes_relations(client, auth_headers, bookings):
+    response = client.get('/api/bookings?per_page=5', headers=auth_headers(bookings, 'admin'))
+    data = response.get_json()
+
+    assert response.status_code == 200
+    first = data['bookings'][0]
+    assert first['client']['role'] == 'client'
+    assert first['provider_user']['role'] == 'provider'
+    assert first['provider_profile']['business_name'].startswith('Business')
+    assert first['service_category']['name'] == 'Plumbing'
+    assert any(b['payment'] for b in data['bookings'])
+    assert any(b['payment'] is None for b in data['bookings'])
+
+
+@pytest.mark.parametrize('url', ['/api/bookings', '/api/admin/bookings'])
+def test_booking_listing_query_count_is_constant(client, auth_headers, count_queries, bookings, url):
+    """Growing the page from 5 to 30 bookings must not add queries"""
+    headers = auth_headers(bookings, 'admin')
+    client.get(url, headers=headers)  # load the category catalogue
+    counts = []
+    for per_page in (5, 30):
+        with count_queries() as counter:
+            response = client.get(f'{url}?per_page={per_page}', headers=headers)
+        assert response.status_code == 200
+        assert len(response.get_json()['bookings']) == per_page
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 5
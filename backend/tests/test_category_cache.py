@@ -0,0 +1,71 @@
+"""
+Tests for the in-process service category catalogue and its ETags
+"""
+import pytest
+from sqlalchemy import text
+from app import db
+from app.models.cache_version import CacheVersion
+from app.models.service_category import ServiceCategory
+from app.models.user import User, RoleEnum
+
+
+@pytest.fixture
+def categories(app):
+    """Three categories and an admin; returns the admin id"""
+    with app.app_context():
+        admin = User(email='admin@example.com', first_name='Site', last_name='Admin', role=RoleEnum.ADMIN)
+        admin.password_hash = 'x'
+        db.session.add_all([admin, ServiceCategory(name='Plumbing'),
+                            ServiceCategory(name='Cleaning'), ServiceCategory(name='Electrical')])
+        db.session.commit()
+        return admin.id
+
+
+def shared_version(app):
+    with app.app_context():
+        return db.session.get(CacheVersion, 'service_categories').version
+
+
+@pytest.mark.parametrize('url', ['/api/providers/categories', '/api/services/', '/api/services/?search=plumbng'])
+def test_unchanged_catalogue_answers_304_without_queries(client, count_queries, categories, url):
+    first = client.get(url)
+    etag = first.headers['ETag']
+
+    with count_queries() as counter:
+        second = client.get(url, headers={'If-None-Match': etag})
+
+    assert first.status_code == 200
+    assert etag.startswith('W/')
+    assert 'max-age=60' in first.headers['Cache-Control']
+    assert second.status_code == 304
+    assert second.data == b''
+    assert counter.count == 0
+
+
+def test_category_write_changes_etag_and_shared_version(client, auth_headers, app, categories):
+    before = client.get('/api/providers/categories')
+    version = shared_version(app)
+
+    response = client.post('/api/services/', json={'name': 'Painting'}, headers=auth_headers(categories, 'admin'))
+    after = client.get('/api/providers/categories', headers={'If-None-Match': before.headers['ETag']})
+
+    assert response.status_code == 201
+    assert shared_version(app) == version + 1
+    assert after.status_code == 200
+    assert [c['name'] for c in after.get_json()['categories']] == ['Plumbing', 'Cleaning', 'Electrical', 'Painting']
+
+
+def test_other_workers_writes_are_seen_through_shared_version(client, app, categories):
+    app.config['CATEGORY_CACHE_CHECK_INTERVAL'] = 0
+    etag = client.get('/api/providers/categories').headers['ETag']
+
+    # Another worker renames a category: plain SQL, so this process's write tracking never sees it
+    with app.app_context():
+        db.session.execute(text("UPDATE service_categories SET name = 'Wiring' WHERE name = 'Electrical'"))
+        db.session.execute(text("UPDATE cache_versions SET version = version + 1 WHERE name = 'service_categories'"))
+        db.session.commit()
+
+    response = client.get('/api/providers/categories', headers={'If-None-Match': etag})
+
+    assert response.status_code == 200
+    assert 'Wiring' in [c['name'] for c in response.get_json()['categories']]
@@ -0,0 +1,133 @@
+"""
+Tests for the daily statistics rollup behind the admin statistics endpoints
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+from app.models.daily_stats import DailyStat, DailyStatsDirtyDay
+from app.utils import daily_stats
+
+STATUSES = [BookingStatus.PENDING, BookingStatus.CONFIRMED, BookingStatus.COMPLETED, BookingStatus.CANCELLED]
+
+
+@pytest.fixture
+def activity(app):
+    """
+    Users, providers, bookings and reviews spread over the last 40 days
+    (booking i is created i days ago); returns the admin id
+    """
+    now = datetime.utcnow()
+    with app.app_context():
+        plumbing, cleaning = ServiceCategory(name='Plumbing'), ServiceCategory(name='Cleaning')
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN,
+                     created_at=now - timedelta(days=90))
+        clients = [User(email=f'c{i}@example.com', first_name='C', last_name=str(i), role=RoleEnum.CLIENT,
+                        created_at=now - timedelta(days=10 * i)) for i in range(4)]
+        providers = [User(email=f'p{i}@example.com', first_name='P', last_name=str(i), role=RoleEnum.PROVIDER,
+                          created_at=now - timedelta(days=35 + i)) for i in range(2)]
+        for user in [admin] + clients + providers:
+            user.password_hash = 'x'
+        db.session.add_all([plumbing, cleaning, admin] + clients + providers)
+        db.session.flush()
+        profiles = [ProviderProfile(user_id=user.id, business_name=f'Biz {user.id}', hourly_rate=10,
+                                    service_category_id=category.id, created_at=user.created_at)
+                    for user, category in zip(providers, (plumbing, cleaning))]
+        db.session.add_all(profiles)
+        db.session.flush()
+        for i in range(40):
+            profile = profiles[i % 2]
+            booking = Booking(client_id=clients[i % 4].id, provider_id=profile.user_id,
+                              provider_profile_id=profile.id, service_category_id=profile.service_category_id,
+                              scheduled_date=now, duration_hours=1, total_amount=10 + i,
+                              status=STATUSES[i % 4], address='Westlands', created_at=now - timedelta(days=i))
+            db.session.add(booking)
+            db.session.flush()
+            if i % 4 == 2:
+                db.session.add(Review(booking_id=booking.id, client_id=booking.client_id,
+                                      provider_id=booking.provider_id, provider_profile_id=profile.id,
+                                      rating=5, created_at=booking.created_at))
+        db.session.commit()
+        return admin.id
+
+
+def expected_admin_stats():
+    revenue = float(sum(10 + i for i in range(40) if i % 4 == 2))
+    return {
+        'totals': {'users': 7, 'providers': 2, 'bookings': 40, 'reviews': 10, 'revenue': revenue},
+        'recent_activity': {'new_users_30d': 3, 'new_bookings_30d': 30, 'new_reviews_30d': 7},
+    }
+
+
+def get_stats(client, headers):
+    return {
+        'stats': client.get('/api/admin/stats', headers=headers).get_json(),
+        'dashboard': client.get('/api/admin/dashboard/stats', headers=headers).get_json(),
+        'jobs': client.get('/api/admin/analytics/total-jobs', headers=headers).get_json(),
+        'users': client.get('/api/admin/analytics/total-users', headers=headers).get_json(),
+    }
+
+
+def test_stats_before_and_after_rollup_agree(app, client, auth_headers, activity):
+    headers = auth_headers(activity, 'admin')
+    live = get_stats(client, headers)
+
+    with app.app_context():
+        written = daily_stats.roll_up()
+        assert written >= 90
+        assert daily_stats.rolled_through() == daily_stats.utc_today() - timedelta(days=1)
+        assert DailyStatsDirtyDay.query.count() == 0
+
+    rolled = get_stats(client, headers)
+    assert rolled == live
+    stats = rolled['stats']
+    assert {key: stats[key] for key in ('totals', 'recent_activity')} == expected_admin_stats()
+    assert stats['top_categories'] == [{'name': 'Plumbing', 'booking_count': 20},
+                                       {'name': 'Cleaning', 'booking_count': 20}]
+    assert rolled['dashboard']['booking_statistics'] == {
+        'total_bookings': 40, 'pending': 10, 'confirmed': 10, 'completed': 10, 'cancelled': 10
+    }
+    assert rolled['dashboard']['user_statistics'] == {'total_users': 7, 'clients': 4, 'providers': 2, 'admins': 1}
+    assert rolled['jobs']['completion_rate'] == 25.0
+    assert rolled['users']['clients'] == 4
+
+
+def test_changes_to_rolled_up_days_are_counted_at_once(app, client, auth_headers, activity):
+    headers = auth_headers(activity, 'admin')
+    with app.app_context():
+        daily_stats.roll_up()
+        # Complete a pending booking from 8 days ago and remove a 30 day old client
+        booking = Booking.query.filter(Booking.status == BookingStatus.PENDING).order_by(Booking.created_at).first()
+        booking.status = BookingStatus.COMPLETED
+        db.session.delete(User.query.filter_by(email='c3@example.com').one())
+        db.session.commit()
+        assert DailyStatsDirtyDay.query.count() == 2
+
+    stats = get_stats(client, headers)
+    assert stats['jobs']['completed_jobs'] == 11
+    assert stats['jobs']['pending_jobs'] == 9
+    assert stats['users']['clients'] == 3
+
+    with app.app_context():
+        assert daily_stats.roll_up() == 2
+        assert DailyStatsDirtyDay.query.count() == 0
+    assert get_stats(client, headers) == stats
+
+
+def test_dashboard_cost_does_not_grow_with_rows(app, client, auth_headers, count_queries, activity):
+    headers = auth_headers(activity, 'admin')
+    with app.app_context():
+        daily_stats.roll_up()
+    client.get('/api/admin/stats', headers=headers)  # load the category catalogue
+
+    with count_queries() as counter:
+        assert client.get('/api/admin/stats', headers=headers).status_code == 200
+
+    with app.app_context():
+        # Only today is aggregated from the source tables
+        assert DailyStat.query.filter(DailyStat.day == daily_stats.utc_today()).count() == 0
+    assert counter.count <= 14
@@ -0,0 +1,115 @@
+"""
+Tests for typo-tolerant category and user search (in-process trigram index)
+"""
+import pytest
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.service_category import ServiceCategory
+from app.utils.fuzzy_search import TrigramIndex, _contains_pattern, similarity, trigrams
+
+
+@pytest.fixture
+def search_data(app):
+    """An admin, three users with similar names and a few categories; returns the admin id"""
+    with app.app_context():
+        admin = User(email='admin@example.com', first_name='Site', last_name='Admin', role=RoleEnum.ADMIN)
+        users = [
+            User(email='jane.wanjiru@gmail.com', first_name='Jane', last_name='Wanjiru', role=RoleEnum.CLIENT),
+            User(email='john.kamau@yahoo.com', first_name='John', last_name='Kamau', role=RoleEnum.CLIENT),
+            User(email='joan.wambui@gmail.com', first_name='Joan', last_name='Wambui', role=RoleEnum.PROVIDER),
+        ]
+        for user in [admin] + users:
+            user.password_hash = 'x'
+        db.session.add_all([admin] + users + [
+            ServiceCategory(name='Plumbing'),
+            ServiceCategory(name='Electrical Repairs'),
+            ServiceCategory(name='House Cleaning'),
+        ])
+        db.session.commit()
+        return admin.id
+
+
+def service_names(response):
+    return [s['name'] for s in response.get_json()['services']]
+
+
+def user_emails(response):
+    return [u['email'] for u in response.get_json()['users']]
+
+
+def test_trigrams_are_padded_like_pg_trgm():
+    assert trigrams('Cat') == {'  c', ' ca', 'cat', 'at '}
+    assert similarity('plumbing', 'plumbing') == 1.0
+    assert similarity('plumbing', 'cleaning') < 0.3
+
+
+def test_index_search_orders_by_score_then_id():
+    index = TrigramIndex([(1, 'Plumbing'), (2, 'Plumbers'), (3, 'Painting')])
+
+    hits = index.search('plumbing')
+
+    assert [row_id for row_id, _ in hits] == [1, 2]
+    assert hits[0][1] == 1.0
+
+
+def test_index_search_returns_every_match():
+    index = TrigramIndex([(i, f'Plumber {i}') for i in range(1, 2501)])
+    assert len(index.search('plumber')) == 2500
+
+
+def test_like_wildcards_are_escaped():
+    assert _contains_pattern('50%_off\\') == '%50\\%\\_off\\\\%'
+
+
+def test_misspelled_category_is_found(client, search_data):
+    assert service_names(client.get('/api/services/?search=plumbr')) == ['Plumbing']
+    assert service_names(client.get('/api/services/?search=electricl')) == ['Electrical Repairs']
+    assert service_names(client.get('/api/services/?search=gardening')) == []
+    assert len(service_names(client.get('/api/services/'))) == 3
+
+
+def test_user_search_tolerates_typos_and_ranks_best_match_first(client, auth_headers, search_data):
+    headers = auth_headers(search_data, 'admin')
+
+    response = client.get('/api/users/?search=wanjiro', headers=headers)
+
+    assert response.status_code == 200
+    assert user_emails(response)[0] == 'jane.wanjiru@gmail.com'
+    assert 'john.kamau@yahoo.com' not in user_emails(response)
+
+
+def test_user_search_keeps_substring_matches_and_pages(client, auth_headers, search_data):
+    headers = auth_headers(search_data, 'admin')
+
+    first = client.get('/api/users/?search=gmail&per_page=1&cursor=', headers=headers).get_json()
+    second = client.get(f"/api/users/?search=gmail&per_page=1&cursor={first['pagination']['next_cursor']}",
+                        headers=headers).get_json()
+
+    emails = [u['email'] for u in first['users'] + second['users']]
+    assert sorted(emails) == ['jane.wanjiru@gmail.com', 'joan.wambui@gmail.com']
+    assert second['pagination']['next_cursor'] is None
+
+
+def test_index_picks_up_new_rows(app, client, search_data):
+    assert service_names(client.get('/api/services/?search=paintng')) == []
+
+    with app.app_context():
+        db.session.add(ServiceCategory(name='Painting'))
+        db.session.commit()
+
+    assert service_names(client.get('/api/services/?search=paintng')) == ['Painting']
+
+
+def test_large_tables_fall_back_to_substring_matching(app, client, auth_headers, search_data):
+    app.config['FUZZY_SEARCH_INDEX_MAX_ROWS'] = 2
+    headers = auth_headers(search_data, 'admin')
+
+    def search(term):
+        response = client.get('/api/users/', query_string={'search': term}, headers=headers)
+        assert response.status_code == 200
+        return sorted(user_emails(response)), response.get_json()['pagination']['total']
+
+    assert search('gmail') == (['jane.wanjiru@gmail.com', 'joan.wambui@gmail.com'], 2)
+    assert search('wanjiro') == ([], 0)  # no typo tolerance without the index
+    assert search('_') == ([], 0)         # LIKE wildcards match literally
+    assert search('%') == ([], 0)
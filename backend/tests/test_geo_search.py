@@ -0,0 +1,172 @@
+"""
+Tests for the database-side geo search and the geohash spatial key
+"""
+import pytest
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from sqlalchemy.dialects import postgresql
+from app.utils.geo_search import bounding_box, distance_expression, find_nearby_providers
+from app.utils.geo_service import calculate_distance
+from app.utils import geohash
+from app.commands import register_commands
+
+NAIROBI = (-1.286389, 36.817223)
+
+# (business name, latitude, longitude)
+PROVIDERS = [
+    ('CBD Plumbing', -1.2841, 36.8155),        # ~0.4 km from the CBD
+    ('Westlands Wiring', -1.2676, 36.8108),    # ~2.2 km
+    ('Karen Carpentry', -1.3197, 36.7073),     # ~12.7 km
+    ('Thika Movers', -1.0333, 37.0693),        # ~39.6 km
+    ('Mombasa Painters', -4.0435, 39.6682),    # ~440 km
+]
+
+
+@pytest.fixture
+def providers(app):
+    """Create one provider per entry in PROVIDERS"""
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing', description='Pipe services')
+        db.session.add(category)
+        db.session.flush()
+        for index, (name, lat, lon) in enumerate(PROVIDERS):
+            user = User(email=f'provider{index}@example.com', first_name='Test',
+                        last_name=f'Provider{index}', role=RoleEnum.PROVIDER)
+            user.set_password('password123')
+            db.session.add(user)
+            db.session.flush()
+            db.session.add(ProviderProfile(
+                user_id=user.id, business_name=name, hourly_rate=20,
+                service_category_id=category.id, latitude=lat, longitude=lon
+            ))
+        db.session.commit()
+
+
+def test_bounding_box_contains_circle():
+    """Every point within the radius must fall inside the box"""
+    min_lat, max_lat, lon_ranges = bounding_box(NAIROBI[0], NAIROBI[1], 25)
+    assert min_lat < NAIROBI[0] < max_lat
+    assert len(lon_ranges) == 1
+    # 25 km due east should still be inside the box
+    assert lon_ranges[0][1] > NAIROBI[1] + 0.2
+
+
+def test_bounding_box_splits_at_antimeridian():
+    """A search near 180 degrees longitude wraps around"""
+    _, _, lon_ranges = bounding_box(0.0, 179.9, 50)
+    assert len(lon_ranges) == 2
+    assert lon_ranges[0][1] == 180.0
+    assert lon_ranges[1][0] == -180.0
+
+
+def test_haversine_clamps_asin_argument(app, providers):
+    """asin() only gets values <= 1, so identical and antipodal points still get a distance"""
+    compiled = str(distance_expression(0.0, 0.0, dialect='postgresql').compile(dialect=postgresql.dialect()))
+    assert 'least(' in compiled
+
+    with app.app_context():
+        lat, lon = PROVIDERS[0][1:]
+        same = db.session.query(distance_expression(lat, lon)).filter(
+            ProviderProfile.business_name == PROVIDERS[0][0]).scalar()
+        antipode = db.session.query(distance_expression(-lat, lon - 180)).filter(
+            ProviderProfile.business_name == PROVIDERS[0][0]).scalar()
+        assert same == pytest.approx(0.0, abs=1e-6)
+        assert antipode == pytest.approx(calculate_distance(lat, lon, -lat, lon - 180), rel=1e-3)
+
+
+def test_find_nearby_providers_filters_and_orders(app, providers):
+    """Only providers inside the radius come back, closest first"""
+    with app.app_context():
+        results = find_nearby_providers(ProviderProfile.query, NAIROBI[0], NAIROBI[1], 25)
+        names = [provider.business_name for provider, _ in results]
+        assert names == ['CBD Plumbing', 'Westlands Wiring', 'Karen Carpentry']
+
+        # Database distance matches the Python haversine implementation
+        for provider, distance in results:
+            expected = calculate_distance(NAIROBI[0], NAIROBI[1], provider.latitude, provider.longitude)
+            assert distance == pytest.approx(expected, rel=1e-6)
+
+
+def test_find_nearby_providers_applies_limit(app, providers):
+    """The limit is applied after sorting by distance"""
+    with app.app_context():
+        results = find_nearby_providers(ProviderProfile.query, NAIROBI[0], NAIROBI[1], 100, limit=2)
+        assert [provider.business_name for provider, _ in results] == ['CBD Plumbing', 'Westlands Wiring']
+
+
+def test_nearby_endpoint(client, providers):
+    """The nearby endpoint returns providers ranked by distance"""
+    response = client.get(f'/api/providers/nearby?latitude={NAIROBI[0]}&longitude={NAIROBI[1]}&max_distance=50')
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data['total_found'] == 4
+    distances = [provider['distance_km'] for provider in data['providers']]
+    assert distances == sorted(distances)
+    assert data['providers'][0]['business_name'] == 'CBD Plumbing'
+
+
+def test_geohash_encode_known_value():
+    """Reference value from the geohash specification"""
+    assert geohash.encode(42.6, -5.6, 5) == 'ezs42'
+    assert geohash.decode('ezs42') == pytest.approx((42.605, -5.603), abs=0.01)
+
+
+def test_geohash_neighbors():
+    """A cell away from the poles has 8 distinct neighbours of the same precision"""
+    cells = geohash.neighbors('kzf0')
+    assert len(cells) == 8
+    assert all(len(cell) == 4 for cell in cells)
+    assert 'kzf0' not in cells
+
+
+def test_covering_cells_picks_precision_for_radius():
+    """Small radii use fine cells, huge radii fall back to the bounding box"""
+    assert geohash.covering_cells(NAIROBI[0], NAIROBI[1], 1)[0] == 5
+    assert geohash.covering_cells(NAIROBI[0], NAIROBI[1], 25)[0] == 3
+    assert geohash.covering_cells(NAIROBI[0], NAIROBI[1], 500) == (None, None)
+
+
+def test_geohash_maintained_on_write(app, providers):
+    """Inserting or moving a provider refreshes its geohash cells"""
+    with app.app_context():
+        provider = ProviderProfile.query.filter_by(business_name='CBD Plumbing').first()
+        assert provider.geohash_6 == geohash.encode(provider.latitude, provider.longitude, 6)
+        assert provider.geohash_3 == provider.geohash_6[:3]
+
+        provider.latitude, provider.longitude = -4.0435, 39.6682
+        db.session.commit()
+        assert provider.geohash_6 == geohash.encode(-4.0435, 39.6682, 6)
+
+
+def test_backfill_geohash_command(app, providers):
+    """The backfill command fills in rows written before the columns existed"""
+    with app.app_context():
+        ProviderProfile.query.update({'geohash_3': None, 'geohash_6': None})
+        db.session.commit()
+
+    register_commands(app)
+    result = app.test_cli_runner().invoke(args=['backfill-geohash', '--batch-size', '2'])
+    assert 'Geohash backfill complete (5 rows)' in result.output
+
+    with app.app_context():
+        assert ProviderProfile.query.filter(ProviderProfile.geohash_6.is_(None)).count() == 0
+
+
+def test_get_providers_paginates_after_distance_filter(client, providers):
+    """Pages are full, ordered by distance across pages and totals exclude far providers"""
+    base_url = f'/api/providers?latitude={NAIROBI[0]}&longitude={NAIROBI[1]}&max_distance=50&per_page=2'
+
+    first = client.get(f'{base_url}&page=1').get_json()
+    second = client.get(f'{base_url}&page=2').get_json()
+
+    assert first['pagination']['total'] == 4
+    assert first['pagination']['pages'] == 2
+    assert len(first['providers']) == 2
+    assert len(second['providers']) == 2
+
+    distances = [p['distance_km'] for p in first['providers'] + second['providers']]
+    assert distances == sorted(distances)
+    assert all(distance <= 50 for distance in distances)
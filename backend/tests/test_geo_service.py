@@ -0,0 +1,119 @@
+"""
+Tests for the batch distance helpers in app/utils/geo_service.py
+"""
+import pytest
+from app.utils import geo_service
+from app.utils.geo_service import calculate_distance, calculate_distances, top_k_within_radius
+
+ORIGIN = (-1.286389, 36.817223)
+LATS = [-1.2841, -1.2676, None, -1.3197, -4.0435]
+LONS = [36.8155, 36.8108, 36.8, 36.7073, 39.6682]
+
+
+@pytest.fixture(params=['numpy', 'array'])
+def backend(request, monkeypatch):
+    """Run each test against NumPy (when installed) and the array-module fallback"""
+    if request.param == 'numpy':
+        if geo_service.np is None:
+            pytest.skip('NumPy not installed')
+    else:
+        monkeypatch.setattr(geo_service, 'np', None)
+    return request.param
+
+
+def test_calculate_distances_matches_scalar(backend):
+    """Batch results agree with the scalar haversine; missing coordinates give NaN"""
+    distances = calculate_distances(ORIGIN, LATS, LONS)
+    assert len(distances) == len(LATS)
+    for lat, lon, distance in zip(LATS, LONS, distances):
+        if lat is None:
+            assert distance != distance  # NaN
+        else:
+            assert distance == pytest.approx(calculate_distance(ORIGIN[0], ORIGIN[1], lat, lon))
+
+
+def test_top_k_within_radius(backend):
+    """Only points inside the radius come back, closest first, capped at k"""
+    assert [i for i, _ in top_k_within_radius(ORIGIN, LATS, LONS, 25)] == [0, 1, 3]
+    assert [i for i, _ in top_k_within_radius(ORIGIN, LATS, LONS, 25, k=2)] == [0, 1]
+    assert top_k_within_radius(ORIGIN, LATS, LONS, 0.01) == []
+
+
+def test_distance_endpoint_batch(client, auth_headers):
+    """POST /api/geo/distance accepts a list of points"""
+    response = client.post('/api/geo/distance', headers=auth_headers(), json={
+        'lat1': ORIGIN[0], 'lon1': ORIGIN[1],
+        'points': [{'lat': lat, 'lon': lon} for lat, lon in zip(LATS, LONS)]
+    })
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert len(data['distances_km']) == len(LATS)
+    assert data['distances_km'][2] is None
+    assert data['distances_km'][0] == round(calculate_distance(ORIGIN[0], ORIGIN[1], LATS[0], LONS[0]), 2)
+
+
+def test_distance_endpoint_single_pair(client, auth_headers):
+    """The original single pair request still works"""
+    response = client.post('/api/geo/distance', headers=auth_headers(), json={
+        'lat1': -1.286389, 'lon1': 36.817223, 'lat2': -1.292066, 'lon2': 36.821946
+    })
+    assert response.status_code == 200
+    assert response.get_json()['distance_km'] == pytest.approx(0.82, abs=0.01)
+
+
+@pytest.mark.parametrize('body', [
+    {'lat1': 'north', 'lon1': 36.8, 'lat2': -1.29, 'lon2': 36.82},
+    {'lat1': -1.28, 'lon1': 36.8, 'lat2': 95, 'lon2': 36.82},
+    {'lat1': -1.28, 'lon1': 36.8, 'lat2': -1.29},
+    {'lat1': -1.28, 'lon1': 36.8, 'points': ['-1.29,36.82']},
+    {'lat1': -1.28, 'lon1': 36.8, 'points': [{'lat': 'x', 'lon': 36.82}]},
+    {'lat1': -1.28, 'lon1': 200, 'points': [{'lat': -1.29, 'lon': 36.82}]},
+])
+def test_distance_endpoint_rejects_invalid_coordinates(client, auth_headers, body):
+    """Malformed or out-of-range coordinates are a 400, not a 500"""
+    response = client.post('/api/geo/distance', headers=auth_headers(), json=body)
+    assert response.status_code == 400
+
+
+def test_distance_matrix_endpoint(client, auth_headers):
+    """distances_km[i][j] is the distance from origin i to destination j"""
+    origins = [{'lat': ORIGIN[0], 'lon': ORIGIN[1]}, {'lat': LATS[4], 'lon': LONS[4]}]
+    destinations = [{'lat': lat, 'lon': lon} for lat, lon in zip(LATS, LONS) if lat is not None]
+    response = client.post('/api/geo/distance-matrix', headers=auth_headers(),
+                           json={'origins': origins, 'destinations': destinations})
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert len(data['distances_km']) == 2
+    assert all(len(row) == len(destinations) for row in data['distances_km'])
+    assert data['distances_km'][1][-1] == 0
+    assert data['distances_km'][0][0] == pytest.approx(
+        calculate_distance(ORIGIN[0], ORIGIN[1], LATS[0], LONS[0]), abs=0.001)
+
+
+def test_distance_matrix_streams_large_results(app, client, auth_headers):
+    """Above the threshold the same document is streamed"""
+    app.config['GEO_MATRIX_STREAM_THRESHOLD'] = 4
+    points = [{'lat': -1.0 - i / 10, 'lon': 36.0 + i / 10} for i in range(5)]
+    response = client.post('/api/geo/distance-matrix', headers=auth_headers(),
+                           json={'origins': points, 'destinations': points})
+
+    assert response.status_code == 200
+    assert response.is_streamed
+    data = response.get_json()
+    assert len(data['distances_km']) == 5
+    assert [data['distances_km'][i][i] for i in range(5)] == [0] * 5
+
+
+def test_distance_matrix_limits(app, client, auth_headers):
+    """Requests above the N x M limit and malformed points are rejected"""
+    app.config['GEO_MATRIX_MAX_CELLS'] = 10
+    points = [{'lat': 0, 'lon': i} for i in range(4)]
+    response = client.post('/api/geo/distance-matrix', headers=auth_headers(),
+                           json={'origins': points, 'destinations': points})
+    assert response.status_code == 413
+
+    response = client.post('/api/geo/distance-matrix', headers=auth_headers(),
+                           json={'origins': [{'lat': 95, 'lon': 0}], 'destinations': points})
+    assert response.status_code == 400
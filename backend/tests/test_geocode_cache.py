@@ -0,0 +1,108 @@
+"""
+Tests for the two-tier geocoding cache
+"""
+import pytest
+from app.utils.geocode_cache import GeocodeCache, GeocodingUnavailable, LRUCache, normalize_address, _MISSING
+
+WESTLANDS = {'latitude': -1.2676, 'longitude': 36.8108}
+
+
+class CountingResolver:
+    """Fake geocoder that records how often it was called"""
+
+    def __init__(self, result=WESTLANDS, error=False):
+        self.result = result
+        self.error = error
+        self.calls = 0
+
+    def __call__(self, address):
+        self.calls += 1
+        if self.error:
+            raise GeocodingUnavailable('network down')
+        return self.result
+
+
+@pytest.fixture
+def cache(app):
+    with app.app_context():
+        yield GeocodeCache()
+
+
+def test_normalize_address():
+    assert normalize_address('  Westlands ,  NAIROBI. ') == 'westlands, nairobi'
+    assert normalize_address('Westlands, Nairobi') == normalize_address('westlands,nairobi')
+    assert normalize_address(None) == ''
+
+
+def test_long_addresses_keep_distinct_keys():
+    prefix = 'plot 12, ' * 40
+    first, second = normalize_address(prefix + 'westlands'), normalize_address(prefix + 'kilimani')
+    assert first != second
+    assert len(first) == len(second) == 255
+    assert first.startswith(normalize_address(prefix)[:200])
+    assert normalize_address(prefix.upper() + 'Westlands.') == first
+
+
+def test_lru_evicts_least_recently_used():
+    lru = LRUCache(max_size=2)
+    lru.set('a', 1, ttl=60)
+    lru.set('b', 2, ttl=60)
+    lru.get('a')            # a is now the most recently used
+    lru.set('c', 3, ttl=60)
+    assert lru.get('b') is _MISSING
+    assert lru.get('a') == 1
+    assert lru.get('c') == 3
+
+
+def test_lru_expires_entries():
+    lru = LRUCache(max_size=2)
+    lru.set('a', 1, ttl=-1)
+    assert lru.get('a') is _MISSING
+
+
+def test_repeat_address_resolved_once(cache):
+    """Variants of the same address hit the memory tier after the first lookup"""
+    resolver = CountingResolver()
+    assert cache.lookup('Westlands, Nairobi', resolver) == WESTLANDS
+    assert cache.lookup('westlands,  nairobi', resolver) == WESTLANDS
+    assert resolver.calls == 1
+    assert cache.get_stats()['memory_hits'] == 1
+    assert cache.get_stats()['misses'] == 1
+
+
+def test_database_tier_shared_between_processes(cache):
+    """A fresh process (empty memory tier) is served from the table"""
+    resolver = CountingResolver()
+    cache.lookup('Westlands, Nairobi', resolver)
+
+    other_worker = GeocodeCache()
+    assert other_worker.lookup('Westlands, Nairobi', resolver) == WESTLANDS
+    assert resolver.calls == 1
+    assert other_worker.get_stats()['db_hits'] == 1
+
+
+def test_failed_lookups_are_cached(cache):
+    """Unknown addresses are cached as negative entries"""
+    resolver = CountingResolver(result=None)
+    assert cache.lookup('Nowhere Street', resolver) is None
+    assert cache.lookup('Nowhere Street', resolver) is None
+    assert resolver.calls == 1
+    assert cache.get_stats()['negative_hits'] == 1
+
+
+def test_transient_errors_are_not_cached(cache):
+    """Network errors are retried on the next lookup"""
+    resolver = CountingResolver(error=True)
+    assert cache.lookup('Westlands, Nairobi', resolver) is None
+    resolver.error = False
+    assert cache.lookup('Westlands, Nairobi', resolver) == WESTLANDS
+    assert resolver.calls == 2
+
+
+def test_cache_stats_endpoint(client, auth_headers):
+    response = client.get('/api/geo/geocode/cache-stats', headers=auth_headers(role='admin'))
+    assert response.status_code == 200
+    assert 'hit_rate' in response.get_json()['geocode_cache']
+
+    response = client.get('/api/geo/geocode/cache-stats', headers=auth_headers(role='client'))
+    assert response.status_code == 403
@@ -0,0 +1,108 @@
+"""
+Tests for the pluggable geocoding backends and batch geocoding
+"""
+import pytest
+import requests
+from app.utils import geocoders
+from app.utils.geocoders import GazetteerGeocoder, GoogleGeocoder
+from app.utils.geocode_cache import GeocodingUnavailable, geocode_cache
+from app.utils.geo_service import geocode_addresses
+
+
+@pytest.fixture
+def gazetteer_app(app):
+    """App configured for the offline gazetteer backend with an empty memory cache"""
+    app.config['GEOCODER_BACKEND'] = 'gazetteer'
+    geocode_cache.clear()
+    yield app
+    geocode_cache.clear()
+
+
+class FakeResponse:
+    def __init__(self, payload):
+        self.payload = payload
+
+    def json(self):
+        return self.payload
+
+
+def test_gazetteer_matches_normalized_names():
+    gazetteer = GazetteerGeocoder()
+    assert gazetteer.geocode('WESTLANDS') == {'latitude': -1.2676, 'longitude': 36.8108}
+    # Trailing components are dropped until a listed place matches
+    assert gazetteer.geocode('Kilimani, Nairobi, Kenya') == gazetteer.geocode('kilimani')
+    # Unlisted leading components (street, plot) are dropped before the area
+    assert gazetteer.geocode('12 Ngong Road, Kilimani, Nairobi') == gazetteer.geocode('kilimani')
+    assert gazetteer.geocode('Plot 7, Unknown Estate, Nairobi') == gazetteer.geocode('nairobi')
+    assert gazetteer.geocode('Atlantis') is None
+
+
+def test_google_geocoder_statuses(monkeypatch):
+    google = GoogleGeocoder(api_key='test-key', timeout=2)
+    calls = []
+
+    def fake_get(url, params=None, timeout=None):
+        calls.append(timeout)
+        return FakeResponse(payload)
+
+    monkeypatch.setattr(google.session, 'get', fake_get)
+
+    payload = {'status': 'OK', 'results': [{'geometry': {'location': {'lat': -1.2, 'lng': 36.8}}}]}
+    assert google.geocode('Westlands') == {'latitude': -1.2, 'longitude': 36.8}
+    assert calls == [2]  # the timeout is always passed
+
+    payload = {'status': 'ZERO_RESULTS', 'results': []}
+    assert google.geocode('Atlantis') is None
+
+    payload = {'status': 'OVER_QUERY_LIMIT'}
+    with pytest.raises(GeocodingUnavailable):
+        google.geocode('Westlands')
+
+
+def test_google_geocoder_network_error(monkeypatch):
+    google = GoogleGeocoder(api_key='test-key')
+
+    def fail(*args, **kwargs):
+        raise requests.ConnectionError('offline')
+
+    monkeypatch.setattr(google.session, 'get', fail)
+    with pytest.raises(GeocodingUnavailable):
+        google.geocode('Westlands')
+
+
+def test_geocode_addresses_deduplicates(gazetteer_app, monkeypatch):
+    """Addresses with the same normalized key are looked up once"""
+    calls = []
+    real_geocode = geocoders.get_geocoder
+
+    class Recording:
+        def geocode(self, address):
+            calls.append(address)
+            return real_geocode().geocode(address)
+
+    with gazetteer_app.app_context():
+        recording = Recording()
+        monkeypatch.setattr('app.utils.geo_service.get_geocoder', lambda: recording)
+        results = geocode_addresses(['Westlands', 'westlands.', 'Karen', 'Atlantis'], max_workers=4)
+
+    assert len(calls) == 3
+    assert results['Westlands'] == results['westlands.']
+    assert results['Karen']['longitude'] == 36.7073
+    assert results['Atlantis'] is None
+
+
+def test_batch_geocode_endpoint(gazetteer_app, client, auth_headers):
+    response = client.post('/api/geo/geocode', headers=auth_headers(),
+                           json={'addresses': ['Westlands, Nairobi', 'Mombasa', 'Atlantis']})
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert data['resolved'] == 2
+    assert [r['address'] for r in data['results']] == ['Westlands, Nairobi', 'Mombasa', 'Atlantis']
+    assert data['results'][2]['coordinates'] is None
+
+
+def test_batch_geocode_endpoint_limit(gazetteer_app, client, auth_headers):
+    gazetteer_app.config['GEOCODE_MAX_BATCH'] = 2
+    response = client.post('/api/geo/geocode', headers=auth_headers(), json={'addresses': ['a', 'b', 'c']})
+    assert response.status_code == 413
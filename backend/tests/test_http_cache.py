@@ -0,0 +1,144 @@
+"""
+Tests for conditional GETs (ETag / Last-Modified / 304) on read endpoints
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+
+
+@pytest.fixture(autouse=True)
+def no_response_cache(app):
+    """Exercise the validators themselves, not the response cache in front of them"""
+    app.config['RESPONSE_CACHE_BACKEND'] = 'none'
+
+
+@pytest.fixture
+def provider_data(app):
+    """A client, a provider with one review and a booking between them; returns the ids"""
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        client_user = User(email='client@example.com', first_name='Cate', last_name='Client', role=RoleEnum.CLIENT)
+        provider_user = User(email='provider@example.com', first_name='Paul', last_name='Provider',
+                             role=RoleEnum.PROVIDER)
+        other = User(email='other@example.com', first_name='Otto', last_name='Other', role=RoleEnum.CLIENT)
+        for user in (client_user, provider_user, other):
+            user.password_hash = 'x'
+        db.session.add_all([category, client_user, provider_user, other])
+        db.session.flush()
+        profile = ProviderProfile(user_id=provider_user.id, business_name='Paul Plumbing', hourly_rate=20,
+                                  service_category_id=category.id)
+        db.session.add(profile)
+        db.session.flush()
+        booking = Booking(client_id=client_user.id, provider_id=provider_user.id, provider_profile_id=profile.id,
+                          service_category_id=category.id, scheduled_date=datetime.utcnow() + timedelta(days=1),
+                          duration_hours=2, total_amount=40, status=BookingStatus.COMPLETED, address='Westlands')
+        db.session.add(booking)
+        db.session.flush()
+        db.session.add(Review(booking_id=booking.id, client_id=client_user.id, provider_id=provider_user.id,
+                              provider_profile_id=profile.id, rating=4, comment='Good'))
+        ProviderProfile.apply_rating(profile.id, 4)
+        db.session.commit()
+        return {'profile': profile.id, 'provider': provider_user.id, 'client': client_user.id,
+                'other': other.id, 'booking': booking.id, 'category': category.id}
+
+
+def revalidate(client, url, response, **kwargs):
+    headers = dict(kwargs.pop('headers', {}), **{'If-None-Match': response.headers['ETag']})
+    return client.get(url, headers=headers, **kwargs)
+
+
+def test_provider_304_costs_one_lookup(client, count_queries, provider_data):
+    url = f"/api/providers/{provider_data['profile']}"
+    first = client.get(url)
+
+    with count_queries() as counter:
+        second = revalidate(client, url, first)
+
+    assert first.status_code == 200
+    assert first.get_json()['provider']['business_name'] == 'Paul Plumbing'
+    assert 'Last-Modified' in first.headers
+    assert 'public' in first.headers['Cache-Control']
+    assert second.status_code == 304
+    assert second.data == b''
+    assert counter.count == 1
+
+
+def test_provider_etag_follows_profile_and_owner_changes(app, client, provider_data):
+    url = f"/api/providers/{provider_data['profile']}"
+    first = client.get(url)
+
+    with app.app_context():
+        db.session.get(User, provider_data['provider']).first_name = 'Pauline'
+        db.session.commit()
+
+    response = revalidate(client, url, first)
+    assert response.status_code == 200
+    assert response.get_json()['provider']['user']['first_name'] == 'Pauline'
+    assert client.get('/api/providers/999999').status_code == 404
+
+
+def test_if_modified_since(client, provider_data):
+    url = f"/api/providers/{provider_data['profile']}"
+    last_modified = client.get(url).headers['Last-Modified']
+
+    assert client.get(url, headers={'If-Modified-Since': last_modified}).status_code == 304
+    assert client.get(url, headers={'If-Modified-Since': 'Mon, 01 Jan 2024 00:00:00 GMT'}).status_code == 200
+
+
+def test_provider_reviews_etag_changes_with_new_review_and_page(app, client, provider_data):
+    url = f"/api/reviews/provider/{provider_data['provider']}"
+    first = client.get(url)
+
+    assert revalidate(client, url, first).status_code == 304
+    assert revalidate(client, url + '?per_page=1', first).status_code == 200
+
+    with app.app_context():
+        ProviderProfile.apply_rating(provider_data['profile'], 5)
+        db.session.commit()
+
+    response = revalidate(client, url, first)
+    assert response.status_code == 200
+    assert response.get_json()['rating_summary']['total'] == 2
+
+
+
+def test_provider_reviews_etag_follows_reviewer_renames(app, client, count_queries, provider_data):
+    url = f"/api/reviews/provider/{provider_data['provider']}"
+    first = client.get(url)
+    with count_queries() as counter:
+        assert revalidate(client, url, first).status_code == 304
+    assert counter.count == 1
+
+    with app.app_context():
+        reviewer = db.session.get(User, provider_data['client'])
+        reviewer.first_name = 'Catherine'
+        db.session.commit()
+
+    response = revalidate(client, url, first)
+    assert response.status_code == 200
+    assert response.get_json()['reviews'][0]['client']['first_name'] == 'Catherine'
+
+
+def test_booking_is_private_and_authorized_before_304(client, auth_headers, provider_data):
+    url = f"/api/bookings/{provider_data['booking']}"
+    headers = auth_headers(provider_data['client'], 'client')
+    first = client.get(url, headers=headers)
+
+    assert first.status_code == 200
+    assert first.get_json()['booking']['service_category']['name'] == 'Plumbing'
+    assert 'private' in first.headers['Cache-Control']
+    assert revalidate(client, url, first, headers=headers).status_code == 304
+    assert revalidate(client, url, first, headers=auth_headers(provider_data['other'], 'client')).status_code == 403
+    assert client.get('/api/bookings/999999', headers=headers).status_code == 404
+
+
+def test_swagger_spec_revalidates(client):
+    first = client.get('/api/swagger.json')
+
+    assert first.status_code == 200
+    assert revalidate(client, '/api/swagger.json', first).status_code == 304
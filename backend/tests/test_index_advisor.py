@@ -0,0 +1,29 @@
+"""
+Tests for the index advisor
+"""
+import pytest
+from types import SimpleNamespace
+from sqlalchemy import select
+from sqlalchemy.dialects import mysql
+from app.models.provider_profile import ProviderProfile
+from app.utils.index_advisor import UnsupportedDatabase, analyze_query_shapes, find_sequential_scans
+
+
+def test_hot_query_shapes_use_indexes(app):
+    with app.app_context():
+        findings = analyze_query_shapes()
+
+    assert findings
+    assert [f['query'] for f in findings if f['sequential_scans']] == []
+
+
+def test_unindexed_filter_is_reported(app):
+    with app.app_context():
+        statement = select(ProviderProfile).where(ProviderProfile.business_name == 'Pipes Ltd')
+        assert find_sequential_scans(statement) == ['provider_profiles']
+
+
+def test_other_databases_are_rejected_with_a_plain_error():
+    statement = select(ProviderProfile).where(ProviderProfile.id == 1)
+    with pytest.raises(UnsupportedDatabase, match='Unsupported database mysql'):
+        find_sequential_scans(statement, SimpleNamespace(dialect=mysql.dialect()))
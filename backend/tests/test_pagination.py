@@ -0,0 +1,163 @@
+"""
+Tests for page and cursor (keyset) pagination of list endpoints
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.utils.pagination import encode_cursor, decode_cursor, InvalidCursor
+
+
+@pytest.fixture
+def listing_data(app):
+    """
+    An admin, a client and 12 providers near Nairobi, with 23 bookings of the
+    client; bookings share created_at in pairs to exercise the id tie-breaker.
+    Returns (admin_id, client_id).
+    """
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN)
+        customer = User(email='client@example.com', first_name='Client', last_name='One', role=RoleEnum.CLIENT)
+        providers = [User(email=f'p{i}@example.com', first_name='Provider', last_name=str(i), role=RoleEnum.PROVIDER)
+                     for i in range(12)]
+        for user in [admin, customer] + providers:
+            user.password_hash = 'x'
+        db.session.add_all([category, admin, customer] + providers)
+        db.session.flush()
+
+        profiles = [ProviderProfile(user_id=p.id, business_name=f'Business {i}', hourly_rate=20,
+                                    service_category_id=category.id, latitude=-1.28 + i * 0.01, longitude=36.82)
+                    for i, p in enumerate(providers)]
+        db.session.add_all(profiles)
+        db.session.flush()
+
+        created = datetime(2026, 1, 1)
+        for i in range(23):
+            profile = profiles[i % len(profiles)]
+            db.session.add(Booking(client_id=customer.id, provider_id=profile.user_id,
+                                   provider_profile_id=profile.id, service_category_id=category.id,
+                                   scheduled_date=created + timedelta(days=i), duration_hours=1,
+                                   total_amount=20, status=BookingStatus.PENDING, address='Westlands',
+                                   created_at=created + timedelta(minutes=i // 2)))
+        db.session.commit()
+        return admin.id, customer.id
+
+
+def walk(client, url, key, headers=None):
+    """Follow next_cursor from the first cursor page to the end, return every item id"""
+    separator = '&' if '?' in url else '?'
+    data = client.get(f'{url}{separator}cursor=', headers=headers).get_json()
+    ids = [item['id'] for item in data[key]]
+    while data['pagination']['next_cursor']:
+        data = client.get(f"{url}{separator}cursor={data['pagination']['next_cursor']}", headers=headers).get_json()
+        ids += [item['id'] for item in data[key]]
+    return ids
+
+
+def test_cursor_round_trip(app):
+    with app.test_request_context():
+        values = [datetime(2026, 1, 1, 12, 30), 42]
+        assert decode_cursor(encode_cursor(values, 'a'), 'a') == values
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(values, 'a'), 'b')
+        with pytest.raises(InvalidCursor):
+            decode_cursor(encode_cursor(values, 'a')[:-2] + 'xx', 'a')
+
+
+@pytest.mark.parametrize('url, key, role', [
+    ('/api/bookings?per_page=5', 'bookings', 'client'),
+    ('/api/admin/bookings?per_page=5', 'bookings', 'admin'),
+    ('/api/admin/users?per_page=4', 'users', 'admin'),
+    ('/api/users/?per_page=4', 'users', 'admin'),
+    ('/api/admin/providers?per_page=5', 'providers', 'admin'),
+    ('/api/providers?per_page=5', 'providers', None),
+    ('/api/providers?per_page=5&latitude=-1.28&longitude=36.82&max_distance=50', 'providers', None),
+])
+def test_cursor_mode_matches_page_mode(client, auth_headers, listing_data, url, key, role):
+    admin_id, client_id = listing_data
+    headers = auth_headers(admin_id if role == 'admin' else client_id, role) if role else None
+
+    first = client.get(url, headers=headers).get_json()
+    page_ids = []
+    for page in range(1, first['pagination']['pages'] + 1):
+        page_ids += [item['id'] for item in client.get(f'{url}&page={page}', headers=headers).get_json()[key]]
+
+    assert walk(client, url, key, headers) == page_ids
+    assert len(page_ids) == first['pagination']['total'] > 5
+
+
+def test_cursor_mode_skips_count_unless_asked(client, auth_headers, listing_data):
+    admin_id, _ = listing_data
+    headers = auth_headers(admin_id, 'admin')
+
+    data = client.get('/api/admin/bookings?cursor=', headers=headers).get_json()
+    assert data['pagination']['total'] is None
+
+    data = client.get('/api/admin/bookings?cursor=&with_total=1', headers=headers).get_json()
+    assert data['pagination']['total'] == 23
+
+
+def test_cursor_is_bound_to_its_endpoint(client, auth_headers, listing_data):
+    admin_id, _ = listing_data
+    headers = auth_headers(admin_id, 'admin')
+    cursor = client.get('/api/admin/users?per_page=2&cursor=', headers=headers).get_json()['pagination']['next_cursor']
+
+    response = client.get(f'/api/admin/bookings?cursor={cursor}', headers=headers)
+    assert response.status_code == 400
+
+
+def test_count_none_and_estimate_fallback(client, auth_headers, listing_data):
+    admin_id, _ = listing_data
+    headers = auth_headers(admin_id, 'admin')
+
+    data = client.get('/api/admin/bookings?count=none', headers=headers).get_json()
+    assert data['pagination']['total'] is None
+    assert data['pagination']['count'] == 'none'
+
+    # SQLite has no planner estimate, so the exact count is used
+    data = client.get('/api/admin/bookings?count=estimate', headers=headers).get_json()
+    assert data['pagination']['total'] == 23
+    assert data['pagination']['count'] == 'exact'
+
+
+def test_cached_count_skips_query_until_table_changes(app, client, auth_headers, count_queries, listing_data):
+    admin_id, client_id = listing_data
+    headers = auth_headers(admin_id, 'admin')
+    url = '/api/admin/bookings?count=cached&status=pending'
+    client.get('/api/admin/bookings?count=none', headers=headers)  # load the category catalogue
+
+    with count_queries() as first:
+        assert client.get(url, headers=headers).get_json()['pagination']['total'] == 23
+    with count_queries() as second:
+        data = client.get(url, headers=headers).get_json()
+    assert data['pagination'] == dict(data['pagination'], total=23, count='cached')
+    assert second.count == first.count - 1
+
+    # A different filter is a different cache entry
+    assert client.get('/api/admin/bookings?count=cached&status=completed',
+                      headers=headers).get_json()['pagination']['total'] == 0
+
+    # Any write to bookings invalidates the cached totals
+    with app.app_context():
+        booking = Booking.query.first()
+        db.session.add(Booking(client_id=client_id, provider_id=booking.provider_id,
+                               provider_profile_id=booking.provider_profile_id,
+                               service_category_id=booking.service_category_id,
+                               scheduled_date=datetime(2026, 6, 1), duration_hours=1, total_amount=20,
+                               status=BookingStatus.PENDING, address='Westlands'))
+        db.session.commit()
+    assert client.get(url, headers=headers).get_json()['pagination']['total'] == 24
+
+
+def test_count_strategy_from_config(app, client, auth_headers, listing_data):
+    admin_id, _ = listing_data
+    app.config['PAGINATION_COUNT_STRATEGIES'] = {'admin.get_all_bookings': 'none'}
+
+    data = client.get('/api/admin/bookings', headers=auth_headers(admin_id, 'admin')).get_json()
+    assert data['pagination']['count'] == 'none'
+    data = client.get('/api/admin/users', headers=auth_headers(admin_id, 'admin')).get_json()
+    assert data['pagination']['count'] == 'exact'
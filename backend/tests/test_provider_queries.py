@@ -0,0 +1,119 @@
+"""
+Query-count regression tests for provider listings
+Users and categories are loaded with the page, not one lazy load per provider.
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+from app.utils.provider_queries import provider_query, with_activity_counts
+
+
+@pytest.fixture
+def providers(app):
+    """
+    30 available providers around Nairobi spread over 3 categories
+    Provider i has i % 4 completed bookings, each of them reviewed when i is even.
+    Returns the id of an admin user.
+    """
+    with app.app_context():
+        categories = [ServiceCategory(name=name) for name in ('Plumbing', 'Cleaning', 'Electrical')]
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN)
+        customer = User(email='client@example.com', first_name='Client', last_name='One', role=RoleEnum.CLIENT)
+        users = [User(email=f'provider{i}@example.com', first_name='Provider', last_name=str(i), role=RoleEnum.PROVIDER)
+                 for i in range(30)]
+        for user in [admin, customer] + users:
+            user.set_password('password123')
+        db.session.add_all(categories + [admin, customer] + users)
+        db.session.flush()
+
+        start = datetime.utcnow() - timedelta(days=30)
+        for i, user in enumerate(users):
+            profile = ProviderProfile(user_id=user.id, business_name=f'Business {i}', hourly_rate=20 + i,
+                                      service_category_id=categories[i % len(categories)].id,
+                                      latitude=-1.2864 + i * 0.001, longitude=36.8172, is_available=True)
+            db.session.add(profile)
+            db.session.flush()
+            for j in range(i % 4):
+                booking = Booking(client_id=customer.id, provider_id=user.id, provider_profile_id=profile.id,
+                                  service_category_id=profile.service_category_id,
+                                  scheduled_date=start + timedelta(days=i, hours=j), duration_hours=1,
+                                  total_amount=20, status=BookingStatus.COMPLETED, address='Westlands')
+                db.session.add(booking)
+                db.session.flush()
+                if i % 2 == 0:
+                    db.session.add(Review(booking_id=booking.id, client_id=customer.id, provider_id=user.id,
+                                          provider_profile_id=profile.id, rating=4))
+        db.session.commit()
+        return admin.id
+
+
+def test_get_providers_serializes_relations(client, providers):
+    response = client.get('/api/providers?per_page=5')
+    data = response.get_json()
+
+    assert response.status_code == 200
+    first = data['providers'][0]
+    assert first['user']['role'] == 'provider'
+    assert first['service_category']['name'] in ('Plumbing', 'Cleaning', 'Electrical')
+    assert first['distance_km'] is None
+
+
+@pytest.mark.parametrize('url', [
+    '/api/providers?per_page={n}',
+    '/api/providers/nearby?latitude=-1.2864&longitude=36.8172&max_distance=50&limit={n}',
+])
+def test_provider_listing_query_count_is_constant(client, count_queries, providers, url):
+    """Growing the page from 5 to 30 providers must not add queries"""
+    client.get(url.format(n=1))  # load the category catalogue
+    counts = []
+    for size in (5, 30):
+        with count_queries() as counter:
+            response = client.get(url.format(n=size))
+        assert response.status_code == 200
+        assert len(response.get_json()['providers']) == size
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 3
+
+
+def test_admin_providers_include_activity_counts(client, auth_headers, providers):
+    response = client.get('/api/admin/providers?per_page=100', headers=auth_headers(providers, 'admin'))
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert len(data['providers']) == 30
+    assert data['pagination']['total'] == 30
+    for provider in data['providers']:
+        i = int(provider['business_name'].split()[-1])
+        assert provider['booking_count'] == i % 4
+        assert provider['review_count'] == (i % 4 if i % 2 == 0 else 0)
+
+
+def test_admin_providers_query_count_is_constant(client, auth_headers, count_queries, providers):
+    """per_page=100 must cost the same handful of queries as per_page=5"""
+    headers = auth_headers(providers, 'admin')
+    client.get('/api/admin/providers', headers=headers)  # load the category catalogue
+    counts = []
+    for per_page in (5, 100):
+        with count_queries() as counter:
+            response = client.get(f'/api/admin/providers?per_page={per_page}', headers=headers)
+        assert response.status_code == 200
+        counts.append(counter.count)
+
+    assert counts[0] == counts[1]
+    assert counts[0] <= 4
+
+
+def test_activity_counts_are_correlated_to_the_page(app, providers):
+    """The counts must not group the whole bookings and reviews tables"""
+    with app.app_context():
+        sql = str(with_activity_counts(provider_query()).statement).lower()
+    assert 'group by' not in sql
+    assert 'bookings.provider_id = provider_profiles.user_id' in sql
+    assert 'reviews.provider_id = provider_profiles.user_id' in sql
@@ -0,0 +1,98 @@
+"""
+Tests for the provider full-text search index (SQLite FTS5 backend)
+"""
+import pytest
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from sqlalchemy import inspect
+from app.utils.provider_search import is_index_storage, search_terms
+
+
+@pytest.fixture
+def searchable_providers(app):
+    """Three providers whose names, descriptions and owners overlap on purpose"""
+    with app.app_context():
+        category = ServiceCategory(name='Home')
+        owners = [
+            User(email='jane@example.com', first_name='Jane', last_name='Wanjiru', role=RoleEnum.PROVIDER),
+            User(email='otieno@example.com', first_name='Otieno', last_name='Plumb', role=RoleEnum.PROVIDER),
+            User(email='amina@example.com', first_name='Amina', last_name='Hassan', role=RoleEnum.PROVIDER),
+        ]
+        for user in owners:
+            user.password_hash = 'x'
+        db.session.add_all([category] + owners)
+        db.session.flush()
+        db.session.add_all([
+            ProviderProfile(user_id=owners[0].id, business_name='Plumbing Pros', hourly_rate=20,
+                            service_category_id=category.id, description='Leaking pipes and drains'),
+            ProviderProfile(user_id=owners[1].id, business_name='Otieno Electricals', hourly_rate=25,
+                            service_category_id=category.id, description='Wiring, also some plumbing'),
+            ProviderProfile(user_id=owners[2].id, business_name='Sparkle Cleaners', hourly_rate=15,
+                            service_category_id=category.id, description='Deep cleaning of homes'),
+        ])
+        db.session.commit()
+
+
+def names(response):
+    return [p['business_name'] for p in response.get_json()['providers']]
+
+
+def test_search_terms_strip_query_syntax():
+    assert search_terms('plumb* "OR" NEAR(x)') == ['plumb', 'or', 'near', 'x']
+
+
+
+def test_index_storage_is_recognised_for_migrations(app):
+    """Every table db.create_all adds outside the models must be skipped by autogenerate"""
+    with app.app_context():
+        extra = set(inspect(db.engine).get_table_names()) - set(db.metadata.tables)
+    assert extra and all(is_index_storage('table', name) for name in extra)
+    assert is_index_storage('column', 'search_vector', 'provider_profiles')
+    assert not is_index_storage('column', 'business_name', 'provider_profiles')
+    assert not is_index_storage('table', 'provider_profiles')
+
+
+def test_prefix_search_ranks_business_name_first(client, searchable_providers):
+    response = client.get('/api/providers?search=plumb')
+
+    assert response.status_code == 200
+    assert names(response) == ['Plumbing Pros', 'Otieno Electricals']
+
+
+def test_search_matches_owner_name_and_requires_every_term(client, searchable_providers):
+    assert names(client.get('/api/providers?search=hassan')) == ['Sparkle Cleaners']
+    assert names(client.get('/api/providers?search=deep clean')) == ['Sparkle Cleaners']
+    assert names(client.get('/api/providers?search=deep plumbing')) == []
+
+
+def test_index_follows_profile_and_user_updates(app, client, searchable_providers):
+    with app.app_context():
+        profile = ProviderProfile.query.filter_by(business_name='Sparkle Cleaners').one()
+        profile.business_name = 'Sparkle Gardeners'
+        profile.user.last_name = 'Mwangi'
+        db.session.commit()
+
+    assert names(client.get('/api/providers?search=cleaners')) == []
+    assert names(client.get('/api/providers?search=garden')) == ['Sparkle Gardeners']
+    assert names(client.get('/api/providers?search=mwangi')) == ['Sparkle Gardeners']
+    assert names(client.get('/api/providers?search=hassan')) == []
+
+
+def test_deleted_profile_leaves_index(app, client, searchable_providers):
+    with app.app_context():
+        db.session.delete(ProviderProfile.query.filter_by(business_name='Plumbing Pros').one())
+        db.session.commit()
+
+    assert names(client.get('/api/providers?search=plumb')) == ['Otieno Electricals']
+
+
+def test_search_cursor_pages_follow_relevance(client, searchable_providers):
+    first = client.get('/api/providers?search=plumb&per_page=1&cursor=').get_json()
+    cursor = first['pagination']['next_cursor']
+    second = client.get(f'/api/providers?search=plumb&per_page=1&cursor={cursor}').get_json()
+
+    assert [p['business_name'] for p in first['providers'] + second['providers']] == \
+        ['Plumbing Pros', 'Otieno Electricals']
+    assert second['pagination']['next_cursor'] is None
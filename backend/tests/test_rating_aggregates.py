@@ -0,0 +1,192 @@
+"""
+Tests for the denormalized provider rating aggregates
+"""
+import pytest
+from datetime import datetime, timedelta
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+
+
+@pytest.fixture
+def completed_bookings(app):
+    """A client with 4 completed bookings of one provider; returns (client_id, admin_id, profile_id, booking_ids)"""
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        admin = User(email='admin@example.com', first_name='Ada', last_name='Admin', role=RoleEnum.ADMIN)
+        customer = User(email='client@example.com', first_name='Client', last_name='One', role=RoleEnum.CLIENT)
+        provider = User(email='provider@example.com', first_name='Provider', last_name='One', role=RoleEnum.PROVIDER)
+        for user in (admin, customer, provider):
+            user.set_password('password123')
+        db.session.add_all([category, admin, customer, provider])
+        db.session.flush()
+
+        profile = ProviderProfile(user_id=provider.id, business_name='Pipes Ltd', hourly_rate=20,
+                                  service_category_id=category.id)
+        db.session.add(profile)
+        db.session.flush()
+
+        start = datetime.utcnow() - timedelta(days=10)
+        bookings = [Booking(client_id=customer.id, provider_id=provider.id, provider_profile_id=profile.id,
+                            service_category_id=category.id, scheduled_date=start + timedelta(days=i),
+                            duration_hours=1, total_amount=20, status=BookingStatus.COMPLETED,
+                            address='Westlands') for i in range(4)]
+        db.session.add_all(bookings)
+        db.session.commit()
+        return customer.id, admin.id, profile.id, [b.id for b in bookings]
+
+
+def test_new_review_updates_aggregates(app, client, auth_headers, completed_bookings):
+    client_id, _, profile_id, booking_ids = completed_bookings
+    for booking_id, rating in zip(booking_ids, (5, 4, 5, 2)):
+        response = client.post('/api/reviews', headers=auth_headers(client_id, 'client'),
+                               json={'booking_id': booking_id, 'rating': rating, 'comment': 'ok'})
+        assert response.status_code == 201
+
+    with app.app_context():
+        profile = db.session.get(ProviderProfile, profile_id)
+        assert profile.rating_sum == 16
+        assert profile.rating_count == 4
+        assert profile.average_rating == 4.0
+        assert profile.rating_breakdown() == {'1': 0, '2': 1, '3': 0, '4': 1, '5': 2}
+        assert ProviderProfile.rating_summary(profile.user_id)['rating_avg'] == 4.0
+
+
+
+@pytest.mark.parametrize('path', ['/api/admin/users/{id}', '/api/users/{id}'])
+def test_deleting_a_client_removes_their_ratings(app, client, auth_headers, completed_bookings, path):
+    client_id, admin_id, profile_id, booking_ids = completed_bookings
+    with app.app_context():
+        profile = db.session.get(ProviderProfile, profile_id)
+        other = User(email='other@example.com', first_name='Other', last_name='Client', role=RoleEnum.CLIENT,
+                     password_hash='x')
+        db.session.add(other)
+        db.session.flush()
+        for booking_id, author, rating in zip(booking_ids, (client_id, client_id, other.id), (5, 3, 4)):
+            db.session.add(Review(booking_id=booking_id, client_id=author, provider_id=profile.user_id,
+                                  provider_profile_id=profile_id, rating=rating))
+            ProviderProfile.apply_rating(profile_id, rating)
+        db.session.commit()
+
+    response = client.delete(path.format(id=client_id), headers=auth_headers(admin_id, 'admin'))
+    assert response.status_code == 200
+
+    with app.app_context():
+        assert Review.query.count() == 1
+        profile = db.session.get(ProviderProfile, profile_id)
+        assert (profile.rating_sum, profile.rating_count) == (4, 1)
+        assert profile.rating_breakdown() == {'1': 0, '2': 0, '3': 0, '4': 1, '5': 0}
+
+
+def test_recompute_repairs_drift(app, completed_bookings):
+    client_id, _, profile_id, booking_ids = completed_bookings
+    with app.app_context():
+        profile = db.session.get(ProviderProfile, profile_id)
+        # Reviews written behind the aggregates' back, plus stale counters
+        for booking_id, rating in zip(booking_ids[:3], (3, 3, 1)):
+            db.session.add(Review(booking_id=booking_id, client_id=client_id, provider_id=profile.user_id,
+                                  provider_profile_id=profile_id, rating=rating))
+        profile.rating_sum = 99
+        profile.rating_5_count = 7
+        db.session.commit()
+
+        assert ProviderProfile.recompute_rating_aggregates() == 1
+        db.session.commit()
+        db.session.refresh(profile)
+        assert (profile.rating_sum, profile.rating_count) == (7, 3)
+        assert profile.rating_breakdown() == {'1': 1, '2': 0, '3': 2, '4': 0, '5': 0}
+
+
+def test_top_providers_orders_by_stored_average(app, client, auth_headers, completed_bookings):
+    client_id, admin_id, profile_id, booking_ids = completed_bookings
+    with app.app_context():
+        ProviderProfile.apply_rating(profile_id, 4)
+        ProviderProfile.apply_rating(profile_id, 5)
+        db.session.commit()
+
+    response = client.get('/api/admin/analytics/top-providers', headers=auth_headers(admin_id, 'admin'))
+    assert response.status_code == 200
+    top = response.get_json()['top_by_rating']
+    assert top == [{'provider_id': top[0]['provider_id'], 'name': 'Provider One', 'business_name': 'Pipes Ltd',
+                    'average_rating': 4.5, 'review_count': 2}]
+
+
+@pytest.fixture
+def many_reviews(app):
+    """One provider with 25 reviews from 5 clients, created one minute apart; returns the provider user id"""
+    with app.app_context():
+        category = ServiceCategory(name='Cleaning')
+        provider = User(email='cleaner@example.com', first_name='Clean', last_name='Co', role=RoleEnum.PROVIDER)
+        customers = [User(email=f'c{i}@example.com', first_name='Client', last_name=str(i), role=RoleEnum.CLIENT)
+                     for i in range(5)]
+        for user in [provider] + customers:
+            user.password_hash = 'x'
+        db.session.add_all([category, provider] + customers)
+        db.session.flush()
+        profile = ProviderProfile(user_id=provider.id, business_name='Clean Co', hourly_rate=15,
+                                  service_category_id=category.id)
+        db.session.add(profile)
+        db.session.flush()
+
+        start = datetime.utcnow() - timedelta(days=60)
+        for i in range(25):
+            customer = customers[i % len(customers)]
+            booking = Booking(client_id=customer.id, provider_id=provider.id, provider_profile_id=profile.id,
+                              service_category_id=category.id, scheduled_date=start + timedelta(days=i),
+                              duration_hours=1, total_amount=15, status=BookingStatus.COMPLETED, address='Kilimani')
+            db.session.add(booking)
+            db.session.flush()
+            review = Review(booking_id=booking.id, client_id=customer.id, provider_id=provider.id,
+                            provider_profile_id=profile.id, rating=i % 5 + 1, comment=f'review {i}',
+                            created_at=start + timedelta(minutes=i))
+            db.session.add(review)
+            ProviderProfile.apply_rating(profile.id, review.rating)
+        db.session.commit()
+        return provider.id
+
+
+def test_provider_reviews_summary_and_clients(client, many_reviews):
+    response = client.get(f'/api/reviews/provider/{many_reviews}?per_page=10')
+    data = response.get_json()
+
+    assert response.status_code == 200
+    assert [r['comment'] for r in data['reviews']] == [f'review {i}' for i in range(24, 14, -1)]
+    assert data['reviews'][0]['client']['first_name'] == 'Client'
+    assert data['pagination']['total'] == 25
+    assert data['pagination']['pages'] == 3
+    assert data['rating_summary'] == {'average': 3.0, 'total': 25,
+                                      'breakdown': {'1': 5, '2': 5, '3': 5, '4': 5, '5': 5}}
+
+
+def test_provider_reviews_cursor_walks_every_review_once(client, many_reviews):
+    seen = []
+    response = client.get(f'/api/reviews/provider/{many_reviews}?per_page=10')
+    cursor = response.get_json()['pagination']['next_cursor']
+    seen += [r['id'] for r in response.get_json()['reviews']]
+    while cursor:
+        data = client.get(f'/api/reviews/provider/{many_reviews}?per_page=10&cursor={cursor}').get_json()
+        seen += [r['id'] for r in data['reviews']]
+        cursor = data['pagination']['next_cursor']
+
+    assert len(seen) == 25
+    assert len(set(seen)) == 25
+
+
+def test_provider_reviews_rejects_bad_cursor(client, many_reviews):
+    response = client.get(f'/api/reviews/provider/{many_reviews}?cursor=not-a-cursor')
+    assert response.status_code == 400
+
+
+def test_provider_reviews_query_count_is_constant(client, count_queries, many_reviews):
+    """Profile, review page and one batch of clients - whatever the page size"""
+    counts = []
+    for per_page in (2, 25):
+        with count_queries() as counter:
+            response = client.get(f'/api/reviews/provider/{many_reviews}?per_page={per_page}')
+        assert response.status_code == 200
+        counts.append(counter.count)
+
+    assert counts == [3, 3]
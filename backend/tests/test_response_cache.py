@@ -0,0 +1,159 @@
+"""
+Tests for the shared response cache of anonymous public endpoints
+"""
+import pytest
+from datetime import datetime
+from app import db
+from app.models.user import User, RoleEnum
+from app.models.provider_profile import ProviderProfile
+from app.models.service_category import ServiceCategory
+from app.models.booking import Booking, BookingStatus
+from app.models.reviews import Review
+from app.utils.response_cache import ResponseCache, SQLiteStore
+
+
+@pytest.fixture
+def public_data(app):
+    """Two providers in one category; returns {'profile': id, 'provider': user id}"""
+    with app.app_context():
+        category = ServiceCategory(name='Plumbing')
+        owners = [User(email=f'p{i}@example.com', first_name='Pat', last_name=str(i), role=RoleEnum.PROVIDER)
+                  for i in range(2)]
+        for user in owners:
+            user.password_hash = 'x'
+        db.session.add_all([category] + owners)
+        db.session.flush()
+        profiles = [ProviderProfile(user_id=user.id, business_name=f'Pipes {user.id}', hourly_rate=20,
+                                    service_category_id=category.id) for user in owners]
+        db.session.add_all(profiles)
+        db.session.commit()
+        return {'profile': profiles[0].id, 'provider': owners[0].id}
+
+
+@pytest.mark.parametrize('url', [
+    '/api/providers?per_page=5',
+    '/api/providers/{profile}',
+    '/api/reviews/provider/{provider}',
+    '/api/services/',
+])
+def test_repeated_anonymous_request_is_served_without_queries(client, count_queries, public_data, url):
+    url = url.format(**public_data)
+    first = client.get(url)
+
+    with count_queries() as counter:
+        second = client.get(url)
+
+    assert first.headers['X-Cache'] == 'MISS'
+    assert second.headers['X-Cache'] == 'HIT-local'
+    assert second.get_json() == first.get_json()
+    assert second.headers.get('ETag') == first.headers.get('ETag')
+    assert counter.count == 0
+
+
+def test_key_ignores_argument_order_and_blank_arguments(client, public_data):
+    client.get('/api/providers?per_page=5&page=1')
+
+    assert client.get('/api/providers?page=1&per_page=5&search=').headers['X-Cache'] == 'HIT-local'
+    assert client.get('/api/providers?page=2&per_page=5').headers['X-Cache'] == 'MISS'
+
+
+def test_cached_hit_answers_if_none_match(client, public_data):
+    first = client.get('/api/services/')
+    response = client.get('/api/services/', headers={'If-None-Match': first.headers['ETag']})
+
+    assert response.status_code == 304
+    assert response.headers['X-Cache'] == 'HIT-local'
+
+
+def test_authenticated_requests_bypass_the_cache(client, auth_headers, public_data):
+    headers = auth_headers(public_data['provider'], 'provider')
+    client.get('/api/providers', headers=headers)
+
+    assert 'X-Cache' not in client.get('/api/providers', headers=headers).headers
+
+
+def test_writes_invalidate_tagged_responses(app, client, public_data):
+    detail = f"/api/providers/{public_data['profile']}"
+    client.get(detail)
+    client.get('/api/providers')
+    client.get('/api/services/')
+
+    with app.app_context():
+        db.session.get(ProviderProfile, public_data['profile']).business_name = 'Renamed Pipes'
+        db.session.commit()
+
+    response = client.get(detail)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['provider']['business_name'] == 'Renamed Pipes'
+    assert client.get('/api/providers').headers['X-Cache'] == 'MISS'
+    # Categories were not touched
+    assert client.get('/api/services/').headers['X-Cache'] == 'HIT-local'
+
+    with app.app_context():
+        db.session.add(ServiceCategory(name='Painting'))
+        db.session.commit()
+
+    assert client.get('/api/services/').headers['X-Cache'] == 'MISS'
+
+
+
+def test_reviewer_rename_invalidates_reviews_pages(app, client, public_data):
+    with app.app_context():
+        profile = db.session.get(ProviderProfile, public_data['profile'])
+        reviewer = User(email='c@example.com', first_name='Cate', last_name='Client', role=RoleEnum.CLIENT,
+                        password_hash='x')
+        db.session.add(reviewer)
+        db.session.flush()
+        booking = Booking(client_id=reviewer.id, provider_id=profile.user_id, provider_profile_id=profile.id,
+                          service_category_id=profile.service_category_id, scheduled_date=datetime.utcnow(),
+                          duration_hours=1, total_amount=20, status=BookingStatus.COMPLETED, address='Westlands')
+        db.session.add(booking)
+        db.session.flush()
+        db.session.add(Review(booking_id=booking.id, client_id=reviewer.id, provider_id=profile.user_id,
+                              provider_profile_id=profile.id, rating=5))
+        db.session.commit()
+        reviewer_id = reviewer.id
+
+    reviews = f"/api/reviews/provider/{public_data['provider']}"
+    client.get(reviews)
+    client.get('/api/providers')
+
+    with app.app_context():
+        db.session.get(User, reviewer_id).first_name = 'Catherine'
+        db.session.commit()
+
+    response = client.get(reviews)
+    assert response.headers['X-Cache'] == 'MISS'
+    assert response.get_json()['reviews'][0]['client']['first_name'] == 'Catherine'
+    # The reviewer owns no profile, provider listings are untouched
+    assert client.get('/api/providers').headers['X-Cache'] == 'HIT-local'
+
+
+def test_rolled_back_writes_do_not_invalidate(app, client, public_data):
+    client.get('/api/providers')
+
+    with app.app_context():
+        db.session.get(ProviderProfile, public_data['profile']).business_name = 'Never saved'
+        db.session.flush()
+        db.session.rollback()
+
+    assert client.get('/api/providers').headers['X-Cache'] == 'HIT-local'
+
+
+def test_sqlite_store_is_shared_between_workers(tmp_path):
+    path = str(tmp_path / 'response_cache.sqlite3')
+    worker_a = ResponseCache(SQLiteStore(path), ttl=60, local_ttl=5)
+    worker_b = ResponseCache(SQLiteStore(path), ttl=60, local_ttl=5)
+    entry = {'body': '{"ok": true}', 'status': 200, 'headers': [['Content-Type', 'application/json']]}
+
+    worker_a.set('key', entry, worker_a.versions(['providers', 'provider:1']))
+    cached, tier = worker_b.get('key')
+    assert tier == 'shared'
+    assert cached['body'] == entry['body']
+    assert worker_b.get('key')[1] == 'local'
+
+    worker_a.invalidate(['provider:1'])
+    assert worker_a.get('key') == (None, None)
+    # Worker B's local copy lives out its short TTL; the shared copy is stale at once
+    worker_b.local.clear()
+    assert worker_b.get('key') == (None, None)